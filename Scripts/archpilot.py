@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+ArchPilot 统一检查入口
+
+功能：在单一进程内以子命令方式运行各检查脚本；check-all 模式共享一次目录
+扫描与一份解析后的索引，依次完成命名检查、追溯验证与质量评分，并按各脚本
+现有 JSON 格式分别输出结果；batch 模式用常驻进程池对多个项目并行执行
+check-all，输出汇总报告与各项目结果
+
+Usage:
+    python3 archpilot.py check-all --version v1.0.0
+    python3 archpilot.py batch --version v1.0.0 --projects "projects/*" --jobs 8
+    python3 archpilot.py batch --version v1.0.0 --manifest projects.txt
+    python3 archpilot.py naming --all-layers --strict
+    python3 archpilot.py trace --full-chain
+    python3 archpilot.py score --version v1.0.0
+    python3 archpilot.py impact --id FR_core_001 --direction downstream
+    python3 archpilot.py backfill --tags "v*" --jobs 8
+    python3 archpilot.py trace-diff --base v1.2.0 --head v1.3.0
+    python3 archpilot.py links --paths Governance Guides Agents
+    python3 archpilot.py serve --project-root .
+    python3 archpilot.py query validate_trace --full-chain
+
+Subcommands:
+    check-all   一次扫描内运行 naming + trace + score
+    batch       对多个项目根目录并行运行 check-all
+    naming      等价于 check_naming.py（参数相同）
+    trace       等价于 validate_trace.py（参数相同）
+    score       等价于 calculate_score.py（参数相同）
+    impact      等价于 trace_impact.py（参数相同）
+    backfill    等价于 backfill_scores.py（参数相同）
+    trace-diff  等价于 trace_diff.py（参数相同）
+    links       等价于 check_links.py（参数相同）
+    serve       等价于 query_server.py（常驻查询服务）
+    query       等价于 query_client.py（向查询服务发送请求）
+
+Arguments (check-all):
+    --version VERSION   版本号（必需，用于质量评分）
+    --output-dir DIR    输出目录（默认 ./out/）
+    --strict            命名检查严格模式
+    --project-root DIR  项目根目录
+    --history DB        将三项检查结果作为一次运行追加到 SQLite 历史库
+    --help              显示帮助
+
+Arguments (batch):
+    --version VERSION   版本号（必需）
+    --projects GLOB ... 项目根目录通配符（支持 **）
+    --manifest PATH     项目清单文件（每行一个根目录，# 开头为注释，相对路径相对清单所在目录）
+    --output-dir DIR    输出目录（默认 ./out/batch/），各项目结果位于 <DIR>/<项目名>/
+    --jobs N            并行进程数（默认 0 = 自动使用 CPU 核数）
+    --strict            命名检查严格模式
+    --history DB        各项目结果追加到 SQLite 历史库（全部项目完成后由主进程写入）
+
+Exit Codes:
+    0 - 成功
+    1 - 参数错误
+    2 - 依赖错误
+    3 - 检查失败（任一检查未通过）
+
+Author: ArchPilot Core Framework
+Date: 2026-10-18
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import re
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import backfill_scores
+import calculate_score
+import check_links
+import check_naming
+import query_client
+import query_server
+import trace_diff
+import trace_impact
+import validate_trace
+from history_store import HistoryStore
+from repo_index import drop_index, resolve_jobs
+
+
+# ============ 配置常量 ============
+
+SUBCOMMANDS = {
+    "naming": check_naming.main,
+    "trace": validate_trace.main,
+    "score": calculate_score.main,
+    "impact": trace_impact.main,
+    "backfill": backfill_scores.main,
+    "trace-diff": trace_diff.main,
+    "links": check_links.main,
+    "serve": query_server.main,
+    "query": query_client.main
+}
+
+USAGE = """
+Usage: archpilot.py <subcommand> [options]
+
+Subcommands:
+    check-all   一次扫描内运行 naming + trace + score
+    batch       对多个项目根目录并行运行 check-all
+    naming      等价于 check_naming.py（参数相同）
+    trace       等价于 validate_trace.py（参数相同）
+    score       等价于 calculate_score.py（参数相同）
+    impact      等价于 trace_impact.py（参数相同）
+    backfill    等价于 backfill_scores.py（参数相同）
+    trace-diff  等价于 trace_diff.py（参数相同）
+    links       等价于 check_links.py（参数相同）
+    serve       等价于 query_server.py（常驻查询服务）
+    query       等价于 query_client.py（向查询服务发送请求）
+
+使用 archpilot.py <subcommand> --help 查看子命令参数。
+"""
+
+# check-all 各检查的输出文件名（与各脚本默认输出一致）
+CHECK_ALL_OUTPUTS = {
+    "naming": "naming_check.json",
+    "trace": "trace_validation.json",
+    "score": "quality_score.json"
+}
+
+BATCH_REPORT = "batch_report.json"
+
+
+# ============ 核心功能 ============
+
+def check_all(version: str, output_dir: str, project_root: str,
+              strict: bool = False, cache_dir: str = None, jobs: int = None) -> dict:
+    """共享同一项目索引，依次运行全部检查
+
+    cache_dir 指定时追溯元数据缓存与评分缓存写入该目录；jobs 为追溯验证与 D5 代码分析的进程数。
+    """
+    output_dir = Path(output_dir)
+    outputs = {name: str(output_dir / filename)
+               for name, filename in CHECK_ALL_OUTPUTS.items()}
+    common = ['--project-root', project_root]
+    trace_options = []
+    score_options = []
+    if cache_dir:
+        trace_options += ['--cache', os.path.join(cache_dir, "trace_metadata_cache.json")]
+        score_options += ['--cache', os.path.join(cache_dir, "score_cache.json"),
+                          '--code-cache', os.path.join(cache_dir, "code_metrics_cache.json")]
+    if jobs:
+        trace_options += ['--jobs', str(jobs)]
+        score_options += ['--jobs', str(jobs)]
+
+    runs = [
+        ("naming", check_naming.main,
+         ['--all-layers', '--output', outputs["naming"]] + common + (['--strict'] if strict else [])),
+        ("trace", validate_trace.main,
+         ['--full-chain', '--output', outputs["trace"]] + common + trace_options),
+        ("score", calculate_score.main,
+         ['--version', version, '--output', outputs["score"]] + common + score_options)
+    ]
+
+    checks = {}
+    for name, entry, argv in runs:
+        exit_code = entry(argv)
+        try:
+            with open(outputs[name], 'r', encoding='utf-8') as f:
+                status = json.load(f).get("status")
+        except (OSError, ValueError):
+            status = None
+        checks[name] = {
+            "status": status,
+            "exit_code": exit_code,
+            "output": outputs[name]
+        }
+    return checks
+
+
+def record_history(db_path: str, checks: dict, project_root: str, version: str) -> int:
+    """将 check-all 各检查输出作为一次运行写入历史库，失败时返回 None"""
+    results = {}
+    for name, check in checks.items():
+        try:
+            with open(check["output"], 'r', encoding='utf-8') as f:
+                results[name] = json.load(f)
+        except (OSError, ValueError):
+            results[name] = None
+    try:
+        with HistoryStore(db_path) as store:
+            return store.record_run(results.get("score"), results.get("trace"),
+                                    results.get("naming"),
+                                    project_root=os.path.abspath(project_root), version=version)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Warning: Cannot record history: {e}", file=sys.stderr)
+        return None
+
+
+def overall_status(checks: dict) -> str:
+    """汇总各检查状态"""
+    statuses = [check["status"] for check in checks.values()]
+    if (any(check["exit_code"] != 0 for check in checks.values()) or
+            "failed" in statuses or "failure" in statuses):
+        return "failure"
+    if "warning" in statuses:
+        return "warning"
+    return "success"
+
+
+# ============ 批量模式 ============
+
+def discover_projects(patterns=None, manifest: str = None) -> list:
+    """由通配符与清单文件收集项目根目录（去重，保持出现顺序）"""
+    roots = []
+    for pattern in patterns or []:
+        roots.extend(sorted(path for path in glob.glob(pattern, recursive=True)
+                            if os.path.isdir(path)))
+    if manifest:
+        base = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    roots.append(os.path.join(base, line))
+
+    seen = set()
+    result = []
+    for root in roots:
+        root = os.path.abspath(root)
+        if root not in seen:
+            seen.add(root)
+            result.append(root)
+    return result
+
+
+def project_names(roots: list) -> list:
+    """各项目输出子目录名：相对公共父目录的路径（分隔符替换为 __）"""
+    if len(roots) == 1:
+        return [os.path.basename(roots[0]) or "project"]
+    common = os.path.commonpath(roots)
+    return [re.sub(r'[^A-Za-z0-9_.-]', '_', os.path.relpath(root, common).replace(os.sep, "__"))
+            for root in roots]
+
+
+def check_project(task: tuple) -> dict:
+    """进程池任务：对单个项目运行 check-all（工作进程复用，不为每个项目启动解释器）"""
+    name, project_root, version, output_dir, strict, jobs = task
+    result = {
+        "name": name,
+        "project_root": project_root,
+        "output_dir": output_dir
+    }
+    log = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+            checks = check_all(version, output_dir, project_root, strict, output_dir, jobs)
+    except Exception as e:  # 单个项目异常不影响其他项目
+        result.update({"status": "error", "exit_code": 2, "error": str(e), "checks": {}})
+        return result
+    finally:
+        drop_index(project_root)
+
+    result["status"] = overall_status(checks)
+    result["exit_code"] = max(check["exit_code"] for check in checks.values())
+    result["checks"] = checks
+    try:
+        with open(checks["score"]["output"], 'r', encoding='utf-8') as f:
+            result["total_score"] = json.load(f).get("total_score")
+    except (OSError, ValueError):
+        result["total_score"] = None
+    if result["exit_code"] not in (0, 3):
+        result["log"] = log.getvalue()[-2000:]
+    return result
+
+
+def run_batch(roots: list, version: str, output_dir: str, jobs: int = 1,
+              strict: bool = False) -> list:
+    """用常驻进程池并行检查多个项目，结果按输入顺序返回
+
+    项目间并行时各项目内部串行解析，避免嵌套进程池超额占用 CPU；
+    只有一个项目时把全部进程数交给该项目的追溯验证。
+    """
+    names = project_names(roots)
+    if jobs <= 1 or len(roots) <= 1:
+        return [check_project((name, root, version, os.path.join(output_dir, name), strict, jobs))
+                for name, root in zip(names, roots)]
+    tasks = [(name, root, version, os.path.join(output_dir, name), strict, 1)
+             for name, root in zip(names, roots)]
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+        return list(pool.map(check_project, tasks))
+
+
+def parse_batch_args(argv=None):
+    """解析 batch 参数"""
+    parser = argparse.ArgumentParser(
+        prog='archpilot.py batch',
+        description='对多个项目根目录并行运行 check-all'
+    )
+    parser.add_argument('--version', required=True,
+                        help='版本号')
+    parser.add_argument('--projects', nargs='+', metavar='GLOB',
+                        help='项目根目录通配符')
+    parser.add_argument('--manifest',
+                        help='项目清单文件（每行一个根目录）')
+    parser.add_argument('--output-dir', default='./out/batch',
+                        help='输出目录')
+    parser.add_argument('--jobs', type=int, default=0,
+                        help='并行进程数（默认 0 = 自动使用 CPU 核数）')
+    parser.add_argument('--strict', action='store_true',
+                        help='命名检查严格模式')
+    parser.add_argument('--history',
+                        help='追加各项目结果的 SQLite 历史库路径')
+    return parser.parse_args(argv)
+
+
+def batch_main(argv=None) -> int:
+    """batch 子命令"""
+    args = parse_batch_args(argv)
+    if not args.projects and not args.manifest:
+        print("Error: Must specify --projects or --manifest", file=sys.stderr)
+        return 1
+
+    try:
+        roots = discover_projects(args.projects, args.manifest)
+    except OSError as e:
+        print(f"Error: Cannot read manifest: {e}", file=sys.stderr)
+        return 2
+    missing = [root for root in roots if not os.path.isdir(root)]
+    if missing:
+        print(f"Error: Project root not found: {missing[0]}", file=sys.stderr)
+        return 2
+    if not roots:
+        print("Error: No project roots matched", file=sys.stderr)
+        return 1
+
+    output_dir = os.path.abspath(args.output_dir)
+    projects = run_batch(roots, args.version, output_dir, resolve_jobs(args.jobs), args.strict)
+    if args.history:
+        # SQLite 单写者：由主进程统一写入，避免工作进程争用写锁
+        for project in projects:
+            if project["checks"]:
+                project["history_run_id"] = record_history(
+                    args.history, project["checks"], project["project_root"], args.version)
+
+    counts = {status: sum(1 for p in projects if p["status"] == status)
+              for status in ("success", "warning", "failure", "error")}
+    if counts["failure"] or counts["error"]:
+        status = "failure"
+    elif counts["warning"]:
+        status = "warning"
+    else:
+        status = "success"
+
+    output = {
+        "script": "archpilot_batch",
+        "version": args.version,
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "status": status,
+        "projects": projects,
+        "summary": dict(total=len(projects), **counts)
+    }
+
+    output_path = Path(output_dir) / BATCH_REPORT
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+
+    print(f"Batch completed: {len(projects)} projects. Report written to: {output_path}")
+    for project in projects:
+        score = project.get("total_score")
+        score_text = f", score {score}" if score is not None else ""
+        print(f"  {project['name']}: {project['status']} (exit {project['exit_code']}{score_text})")
+    print(f"Status: {status}")
+
+    return max(project["exit_code"] for project in projects)
+
+
+def parse_args(argv=None):
+    """解析 check-all 参数"""
+    parser = argparse.ArgumentParser(
+        prog='archpilot.py check-all',
+        description='在一次目录扫描内运行命名检查、追溯验证与质量评分'
+    )
+    parser.add_argument('--version', required=True,
+                        help='版本号')
+    parser.add_argument('--output-dir', default='./out',
+                        help='输出目录')
+    parser.add_argument('--strict', action='store_true',
+                        help='命名检查严格模式')
+    parser.add_argument('--project-root', default='.',
+                        help='项目根目录')
+    parser.add_argument('--history',
+                        help='追加本次结果的 SQLite 历史库路径')
+    return parser.parse_args(argv)
+
+
+def print_usage():
+    """打印子命令用法"""
+    print(USAGE.strip())
+
+
+def main(argv=None):
+    """主函数"""
+    argv = sys.argv[1:] if argv is None else argv
+
+    if not argv or argv[0] in ('-h', '--help'):
+        print_usage()
+        return 0 if argv else 1
+
+    command, rest = argv[0], argv[1:]
+    if command in SUBCOMMANDS:
+        return SUBCOMMANDS[command](rest)
+    if command == "batch":
+        return batch_main(rest)
+    if command != "check-all":
+        print(f"Error: Unknown subcommand: {command}", file=sys.stderr)
+        print_usage()
+        return 1
+
+    args = parse_args(rest)
+    checks = check_all(args.version, args.output_dir, args.project_root, args.strict)
+
+    exit_code = max(check["exit_code"] for check in checks.values())
+    status = overall_status(checks)
+
+    output = {
+        "script": "archpilot",
+        "version": args.version,
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "status": status,
+        "project_root": os.path.abspath(args.project_root),
+        "checks": checks
+    }
+    if args.history:
+        output["history_run_id"] = record_history(args.history, checks, args.project_root,
+                                                  args.version)
+
+    output_path = Path(args.output_dir) / "check_all.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+
+    print(f"All checks completed. Summary written to: {output_path}")
+    for name, check in checks.items():
+        print(f"  {name}: {check['status']} (exit {check['exit_code']})")
+    print(f"Status: {status}")
+
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
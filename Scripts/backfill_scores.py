@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+历史版本回溯评分脚本
+
+功能：对 git 标签（rules_tag.md 约定的 v{VERSION} 发布标签）逐个计算质量评分
+与追溯验证结果，不检出工作区。每个工作进程持有一个常驻 `git cat-file --batch`
+读取流，直接从对象库遍历标签对应的树，只展开 L1-L5 层级目录：
+
+    1. 文件内容按对象 ID 写入共享内容库（<work-dir>/objects，同一内容只写一次，
+       修改时间由对象 ID 决定）
+    2. 以硬链接在工作进程的固定目录下组装该标签的层级目录（与上一个标签相比
+       只增删对象 ID 变化的文件）
+    3. 在进程内直接调用 calculate_score / validate_trace；两者的缓存按
+       路径 + 修改时间 + 大小命中，相邻标签间未变化的文档不重复解析
+
+多个标签由进程池并行处理，每个工作进程分到一段连续标签以提高缓存命中；
+每个标签输出一份结果，汇总写入 backfill_report.json
+
+Usage:
+    python3 backfill_scores.py --tags "v*" --jobs 8
+    python3 backfill_scores.py --tags "v1.*" "v2.*" --history out/history.sqlite
+
+Arguments:
+    --tags PATTERN ...  标签通配符（默认 v*）
+    --project-root DIR  git 仓库根目录（默认 .）
+    --output-dir DIR    输出目录（默认 ./out/backfill/），各标签结果位于 <DIR>/<标签>/
+    --work-dir DIR      内容库与工作目录（默认 <output-dir>/.work，保留以便下次复用）
+    --jobs N            并行进程数（默认 0 = 自动使用 CPU 核数）
+    --history DB        按标签创建时间将结果追加到 SQLite 历史库
+    --help              显示帮助
+
+Exit Codes:
+    0 - 成功
+    1 - 参数错误
+    2 - 依赖错误（不在 git 仓库内、标签不存在或读取失败）
+
+Author: ArchPilot Core Framework
+Date: 2026-10-18
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import shutil
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import calculate_score
+import validate_trace
+from git_changes import GitError
+from git_objects import MODE_TREE, ObjectReader, list_tags
+from history_store import HistoryStore
+from repo_index import LAYER_DIRECTORIES, drop_index, resolve_jobs
+
+
+# ============ 配置常量 ============
+
+BACKFILL_REPORT = "backfill_report.json"
+
+SCORE_OUTPUT = "quality_score.json"
+TRACE_OUTPUT = "trace_validation.json"
+
+# 每个工作进程内的状态（进程池 initializer 设置）
+_WORKER = {}
+
+
+# ============ 树组装 ============
+
+def blob_mtime_ns(oid: str) -> int:
+    """由对象 ID 决定内容库文件的修改时间：内容相同则一致，内容不同几乎不会相同"""
+    return int(oid[:15], 16)
+
+
+def store_blob(reader: ObjectReader, store_dir: str, oid: str) -> str:
+    """将文件内容写入内容库（已存在则跳过），返回库内路径"""
+    path = os.path.join(store_dir, oid[:2], oid)
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(reader.read_blob(oid))
+    mtime_ns = blob_mtime_ns(oid)
+    os.utime(tmp_path, ns=(mtime_ns, mtime_ns))
+    os.replace(tmp_path, path)
+    return path
+
+
+def remove_file(tree_dir: str, target: str) -> None:
+    """删除文件并清理由此变空的上级目录（不超出 tree_dir）"""
+    os.unlink(target)
+    parent = os.path.dirname(target)
+    while parent != tree_dir:
+        try:
+            os.rmdir(parent)
+        except OSError:
+            break
+        parent = os.path.dirname(parent)
+
+
+def materialize(reader: ObjectReader, revision: str, tree_dir: str, store_dir: str,
+                previous: dict = None) -> dict:
+    """在 tree_dir 下组装 revision 的层级目录，返回 {相对路径: 对象 ID}
+
+    previous 为同一目录上次组装的结果，只增删对象 ID 变化的文件；
+    其他顶层目录（如 Governance）只创建空目录，供存在性检查使用。
+    """
+    if previous is None:
+        if os.path.isdir(tree_dir):
+            shutil.rmtree(tree_dir)
+        os.makedirs(tree_dir)
+        previous = {}
+
+    layer_dirs = set(LAYER_DIRECTORIES.values())
+    files = {}
+    for rel_path, mode, oid in reader.walk_tree(revision, layer_dirs):
+        if mode == MODE_TREE:
+            files[rel_path + "/"] = oid
+        elif "/" in rel_path:  # 顶层文件不参与检查
+            files[rel_path] = oid
+
+    for rel_path, oid in previous.items():
+        if files.get(rel_path) != oid:
+            target = os.path.join(tree_dir, *rel_path.rstrip("/").split("/"))
+            if rel_path.endswith("/"):
+                shutil.rmtree(target, ignore_errors=True)
+            elif os.path.lexists(target):
+                remove_file(tree_dir, target)
+
+    for rel_path, oid in files.items():
+        if previous.get(rel_path) == oid:
+            continue
+        target = os.path.join(tree_dir, *rel_path.rstrip("/").split("/"))
+        if rel_path.endswith("/"):
+            os.makedirs(target, exist_ok=True)
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        source = store_blob(reader, store_dir, oid)
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copy2(source, target)
+    return files
+
+
+# ============ 工作进程 ============
+
+def init_worker(project_root: str, work_dir: str) -> None:
+    """进程池 initializer：打开读取流，分配固定工作目录"""
+    worker_dir = os.path.join(work_dir, f"worker-{os.getpid()}")
+    os.makedirs(worker_dir, exist_ok=True)
+    _WORKER.update({
+        "reader": ObjectReader(project_root),
+        "store_dir": os.path.join(work_dir, "objects"),
+        "tree_dir": os.path.join(worker_dir, "tree"),
+        "worker_dir": worker_dir,
+        "files": None
+    })
+
+
+def close_worker() -> None:
+    """关闭读取流并清理工作目录（内容库保留）"""
+    reader = _WORKER.pop("reader", None)
+    if reader is not None:
+        reader.close()
+    worker_dir = _WORKER.pop("worker_dir", None)
+    if worker_dir:
+        shutil.rmtree(worker_dir, ignore_errors=True)
+
+
+def read_output(path: str) -> dict:
+    """读取检查脚本输出（不可读时返回空字典）"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def annotate_output(path: str, project_root: str, tag: str, commit: str) -> dict:
+    """改写检查输出的项目根目录并附加版本来源，返回输出内容"""
+    data = read_output(path)
+    if data:
+        data["project_root"] = project_root
+        data["revision"] = {"tag": tag, "commit": commit}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+    return data
+
+
+def score_revision(task: tuple) -> dict:
+    """对单个标签组装树并运行评分与追溯验证"""
+    tag, date, output_dir = task
+    reader = _WORKER["reader"]
+    tree_dir = _WORKER["tree_dir"]
+    worker_dir = _WORKER["worker_dir"]
+    outputs = {"score": os.path.join(output_dir, SCORE_OUTPUT),
+               "trace": os.path.join(output_dir, TRACE_OUTPUT)}
+    result = {"tag": tag, "date": date, "output_dir": output_dir}
+
+    previous = _WORKER["files"]
+    log = io.StringIO()
+    try:
+        result["commit"] = reader.read(tag + "^{commit}")[0]
+        _WORKER["files"] = None  # 组装中途失败时下次重新组装
+        files = materialize(reader, result["commit"], tree_dir, _WORKER["store_dir"], previous)
+        _WORKER["files"] = files
+        result["files"] = sum(1 for rel_path in files if not rel_path.endswith("/"))
+        with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+            score_exit = calculate_score.main(
+                ['--version', tag, '--output', outputs["score"], '--project-root', tree_dir,
+                 '--cache', os.path.join(worker_dir, "score_cache.json"),
+                 '--code-cache', os.path.join(worker_dir, "code_metrics_cache.json"),
+                 '--jobs', '1'])
+            trace_exit = validate_trace.main(
+                ['--full-chain', '--output', outputs["trace"], '--project-root', tree_dir,
+                 '--cache', os.path.join(worker_dir, "trace_metadata_cache.json"),
+                 '--jobs', '1'])
+    except (GitError, OSError) as e:  # 单个标签失败不影响其他标签
+        result.update({"status": "error", "error": str(e)})
+        return result
+    finally:
+        drop_index(tree_dir)
+
+    # 输出中的项目根目录指向仓库本身，并记录对应的标签与提交
+    score = annotate_output(outputs["score"], reader.project_root, tag, result["commit"])
+    trace = annotate_output(outputs["trace"], reader.project_root, tag, result["commit"])
+    result.update({
+        "status": "success" if score_exit in (0, 3) and trace_exit in (0, 3) else "error",
+        "total_score": score.get("total_score"),
+        "score_status": score.get("status"),
+        "trace_status": trace.get("status"),
+        "completeness_percentage": trace.get("completeness_percentage"),
+        "outputs": outputs
+    })
+    if result["status"] == "error":
+        result["log"] = log.getvalue()[-2000:]
+    return result
+
+
+def _run_chunk(tasks: list) -> list:
+    return [score_revision(task) for task in tasks]
+
+
+# ============ 核心功能 ============
+
+def tag_directory(tag: str) -> str:
+    """标签输出子目录名（分隔符替换为 __）"""
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', tag.replace("/", "__"))
+
+
+def run_backfill(project_root: str, tags: list, output_dir: str, work_dir: str,
+                 jobs: int = 1) -> list:
+    """并行回溯各标签，结果按标签顺序返回
+
+    每个工作进程分到一段连续标签：相邻版本大部分文档相同，进程内缓存命中率更高。
+    """
+    tasks = [(t["tag"], t["date"], os.path.join(output_dir, tag_directory(t["tag"])))
+             for t in tags]
+    if jobs <= 1 or len(tasks) <= 1:
+        init_worker(project_root, work_dir)
+        try:
+            return _run_chunk(tasks)
+        finally:
+            close_worker()
+
+    workers = min(jobs, len(tasks))
+    size = max(1, -(-len(tasks) // (workers * 4)))
+    chunks = [tasks[i:i + size] for i in range(0, len(tasks), size)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(project_root, work_dir)) as pool:
+        results = [result for chunk in pool.map(_run_chunk, chunks) for result in chunk]
+    # 工作进程退出时不会执行清理，统一移除各工作目录
+    for path in Path(work_dir).glob("worker-*"):
+        shutil.rmtree(path, ignore_errors=True)
+    return results
+
+
+def record_history(db_path: str, project_root: str, results: list) -> None:
+    """将各标签结果按标签创建时间写入历史库"""
+    with HistoryStore(db_path) as store:
+        for result in results:
+            if result["status"] != "success":
+                continue
+            result["history_run_id"] = store.record_run(
+                read_output(result["outputs"]["score"]) or None,
+                read_output(result["outputs"]["trace"]) or None,
+                project_root=project_root, version=result["tag"], timestamp=result["date"])
+
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(
+        description='按 git 标签回溯计算质量评分与追溯验证结果（不检出工作区）',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--tags', nargs='+', default=['v*'], metavar='PATTERN',
+                        help='标签通配符')
+    parser.add_argument('--project-root', default='.',
+                        help='git 仓库根目录')
+    parser.add_argument('--output-dir', default='./out/backfill',
+                        help='输出目录')
+    parser.add_argument('--work-dir',
+                        help='内容库与工作目录（默认 <output-dir>/.work）')
+    parser.add_argument('--jobs', type=int, default=0,
+                        help='并行进程数（默认 0 = 自动使用 CPU 核数）')
+    parser.add_argument('--history',
+                        help='追加结果的 SQLite 历史库路径')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+
+    project_root = os.path.abspath(args.project_root)
+    output_dir = os.path.abspath(args.output_dir)
+    work_dir = os.path.abspath(args.work_dir or os.path.join(output_dir, ".work"))
+
+    try:
+        tags = list_tags(project_root, args.tags)
+    except GitError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    if not tags:
+        print(f"Error: No tags matched: {' '.join(args.tags)}", file=sys.stderr)
+        return 2
+
+    try:
+        results = run_backfill(project_root, tags, output_dir, work_dir, resolve_jobs(args.jobs))
+    except GitError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    if args.history:
+        try:
+            record_history(args.history, project_root, results)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Warning: Cannot record history: {e}", file=sys.stderr)
+
+    errors = sum(1 for r in results if r["status"] == "error")
+    output = {
+        "script": "backfill_scores",
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "status": "failure" if errors else "success",
+        "project_root": project_root,
+        "tag_patterns": args.tags,
+        "tags": results,
+        "summary": {
+            "total": len(results),
+            "succeeded": len(results) - errors,
+            "errors": errors
+        }
+    }
+
+    output_path = Path(output_dir) / BACKFILL_REPORT
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+
+    print(f"Backfill completed: {len(results)} tags. Report written to: {output_path}")
+    for result in results:
+        if result["status"] == "error":
+            print(f"  {result['tag']}: error ({result.get('error', 'check failed')})")
+        else:
+            print(f"  {result['tag']}: score {result['total_score']}, "
+                  f"trace {result['trace_status']} ({result['completeness_percentage']}%)")
+
+    return 2 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+检查脚本基准测试
+
+功能：在不同规模的合成项目上运行 check_naming、validate_trace、calculate_score，
+记录端到端耗时、各阶段耗时与峰值内存（RSS），结果以 JSON 保存，
+可与基线结果对比发现性能回退
+
+阶段划分（单独子进程内测量）：
+    walk      - 目录遍历建索引（repo_index）
+    parse     - front matter 解析
+    naming    - 全层级命名检查
+    trace     - 追溯链验证（含追溯图分析）
+    score     - 五维度评分
+
+front matter 解析吞吐量（文档数/秒，不含文件读取）：同一批头部行分别用纯 Python
+受限解析器、libyaml（已安装时）与默认解析入口解析；除生成项目中的行内列表写法
+外，另将其改写为块列表写法各测一次
+
+Usage:
+    python3 benchmark_scripts.py --sizes 1000 10000 --work-dir /tmp/archpilot_bench
+    python3 benchmark_scripts.py --sizes 100000 --baseline out/benchmark_prev.json
+
+Arguments:
+    --sizes N [N ...]     项目规模（文档数，默认 1000 10000）
+    --work-dir DIR        合成项目存放目录（默认 ./out/bench_projects）
+    --repeat N            每个脚本重复次数，取最小耗时（默认 1）
+    --baseline PATH       基线结果文件，用于回退对比
+    --threshold R         回退判定阈值（耗时比值，默认 1.2）
+    --output PATH         输出路径（默认 ./out/benchmark.json）
+    --help                显示帮助
+
+Exit Codes:
+    0 - 成功
+    1 - 参数错误
+    2 - 依赖错误（基线文件不可读等）
+    3 - 检测到性能回退
+
+Author: ArchPilot Core Framework
+Date: 2026-10-18
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import calculate_score
+import check_naming
+import front_matter
+import validate_trace
+from generate_bench_project import ensure_project
+from repo_index import LAYER_ORDER, get_index
+
+
+# ============ 配置常量 ============
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# 端到端基准：名称 -> (脚本, 参数)
+BENCH_RUNS = {
+    "check_naming": ("check_naming.py", ["--all-layers"]),
+    "validate_trace_cold": ("validate_trace.py", ["--full-chain", "--no-cache", "--jobs", "1"]),
+    "validate_trace_warm": ("validate_trace.py", ["--full-chain"]),
+    "calculate_score": ("calculate_score.py", ["--version", "v0.0.0-bench"]),
+    "check_all": ("archpilot.py", ["check-all", "--version", "v0.0.0-bench"])
+}
+
+
+# front matter 解析吞吐量：每个后端重复次数，取最快一次
+PARSER_REPEAT = 3
+
+INLINE_LIST_PATTERN = re.compile(r"^([\w-]+):\s*\[(.*)\]\s*$")
+
+
+# ============ 测量 ============
+
+def rss_to_kb(value: int) -> int:
+    """ru_maxrss 单位：Linux 为 KB，macOS 为字节"""
+    return value // 1024 if sys.platform == "darwin" else value
+
+
+def run_process(command: list, cwd: str) -> dict:
+    """运行子进程，返回耗时、峰值 RSS 与退出码"""
+    with tempfile.TemporaryFile() as stderr:
+        start = time.perf_counter()
+        process = subprocess.Popen(command, cwd=cwd, stdout=subprocess.DEVNULL,
+                                   stderr=stderr)
+        _, status, usage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        stderr.seek(0)
+        message = stderr.read().decode("utf-8", "replace")
+    return {
+        "wall_seconds": round(elapsed, 4),
+        "peak_rss_kb": rss_to_kb(usage.ru_maxrss),
+        "exit_code": process.returncode,
+        "stderr": message[-500:] if process.returncode not in (0, 3) else ""
+    }
+
+
+def measure_phases(project_root: str) -> dict:
+    """在当前进程内按阶段测量（由子进程调用，保证冷启动）"""
+    phases = {}
+
+    start = time.perf_counter()
+    index = get_index(project_root, refresh=True)
+    phases["walk"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    documents = [entry for layer in LAYER_ORDER for entry in index.documents(layer)]
+    index.prefetch_front_matter(documents, jobs=1)
+    phases["parse"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for layer in LAYER_ORDER:
+        check_naming.check_layer_naming(layer, project_root)
+    phases["naming"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    validate_trace.validate_trace_chain(project_root)
+    phases["trace"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for calculate in (calculate_score.calculate_d1_score, calculate_score.calculate_d2_score,
+                      calculate_score.calculate_d3_score, calculate_score.calculate_d4_score,
+                      calculate_score.calculate_d5_score):
+        calculate(project_root)
+    phases["score"] = time.perf_counter() - start
+    peak_rss_kb = rss_to_kb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+    return {
+        "seconds": {name: round(value, 4) for name, value in phases.items()},
+        "files_indexed": sum(len(index.files(layer)) for layer in LAYER_ORDER),
+        "peak_rss_kb": peak_rss_kb,
+        "parsers": measure_parsers(documents)
+    }
+
+
+def block_style(lines: list) -> list:
+    """将行内列表 key: [a, b] 改写为块列表写法"""
+    result = []
+    for line in lines:
+        match = INLINE_LIST_PATTERN.match(line)
+        if match:
+            items = [item.strip() for item in match.group(2).split(",") if item.strip()]
+            result.append(f"{match.group(1)}:" if items else line)
+            result.extend(f"  - {item}" for item in items)
+        else:
+            result.append(line)
+    return result
+
+
+def measure_parsers(entries) -> dict:
+    """各 front matter 解析后端的吞吐量（文档数/秒）"""
+    headers = []
+    for entry in entries:
+        try:
+            lines = front_matter.read_front_matter_lines(entry.path)
+        except (OSError, UnicodeDecodeError):
+            continue
+        if lines is not None:
+            headers.append(lines)
+
+    backends = {"python": front_matter.parse_simple_yaml,
+                "default": front_matter.parse_front_matter_lines}
+    if front_matter.yaml is not None:
+        backends["libyaml"] = front_matter.parse_with_libyaml
+
+    corpora = {"inline": headers, "block": [block_style(lines) for lines in headers]}
+    throughput = {}
+    for corpus_name, corpus in corpora.items():
+        throughput[corpus_name] = {}
+        for backend, parse in backends.items():
+            best = None
+            for _ in range(PARSER_REPEAT):
+                start = time.perf_counter()
+                for lines in corpus:
+                    parse(lines)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            throughput[corpus_name][backend] = round(len(corpus) / best) if best else None
+    return {
+        "documents": len(headers),
+        "backend": front_matter.PARSER_BACKEND,
+        "docs_per_second": throughput
+    }
+
+
+def benchmark_size(size: int, work_dir: str, repeat: int = 1) -> dict:
+    """生成（或复用）指定规模项目并运行全部基准"""
+    project_root = os.path.join(work_dir, f"bench_{size}")
+    manifest = ensure_project(project_root, size)
+    out_dir = os.path.join(project_root, "out")
+
+    scripts = {}
+    for name, (script, script_args) in BENCH_RUNS.items():
+        command = [sys.executable, str(SCRIPT_DIR / script)] + script_args
+        if script == "archpilot.py":
+            command += ["--output-dir", out_dir]
+        else:
+            command += ["--output", os.path.join(out_dir, f"bench_{name}.json")]
+        if name == "validate_trace_warm":
+            # 预热元数据缓存，测量增量运行
+            run_process(command, project_root)
+        runs = [run_process(command, project_root) for _ in range(max(1, repeat))]
+        best = min(runs, key=lambda r: r["wall_seconds"])
+        best["peak_rss_kb"] = max(r["peak_rss_kb"] for r in runs)
+        scripts[name] = best
+
+    phase_run = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--phases-only", project_root],
+        capture_output=True, text=True, check=True)
+    phases = json.loads(phase_run.stdout)
+
+    return {
+        "documents": size,
+        "project_root": project_root,
+        "generate_seconds": manifest.get("generate_seconds"),
+        "reused_project": manifest["reused"],
+        "injected": {
+            "broken_links": manifest["injected_broken_links"],
+            "bad_names": manifest["injected_bad_names"]
+        },
+        "scripts": scripts,
+        "phases": phases
+    }
+
+
+def compare_with_baseline(results: list, baseline: dict, threshold: float) -> list:
+    """按规模对比端到端与阶段耗时，返回超过阈值的回退项"""
+    regressions = []
+    baseline_by_size = {r["documents"]: r for r in baseline.get("results", [])}
+    for result in results:
+        base = baseline_by_size.get(result["documents"])
+        if not base:
+            continue
+        pairs = [(f"script:{name}", data["wall_seconds"],
+                  base.get("scripts", {}).get(name, {}).get("wall_seconds"))
+                 for name, data in result["scripts"].items()]
+        pairs += [(f"phase:{name}", value,
+                   base.get("phases", {}).get("seconds", {}).get(name))
+                  for name, value in result["phases"]["seconds"].items()]
+        for metric, current, previous in pairs:
+            if previous and current / previous > threshold:
+                regressions.append({
+                    "documents": result["documents"],
+                    "metric": metric,
+                    "baseline_seconds": previous,
+                    "current_seconds": current,
+                    "ratio": round(current / previous, 3)
+                })
+    return regressions
+
+
+def git_revision() -> str:
+    """当前代码版本（非 Git 仓库时返回空字符串）"""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=SCRIPT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(
+        description='检查脚本基准测试',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000],
+                        help='项目规模（文档数）')
+    parser.add_argument('--work-dir', default='./out/bench_projects',
+                        help='合成项目存放目录')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='每个脚本重复次数')
+    parser.add_argument('--baseline',
+                        help='基线结果文件')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='回退判定阈值')
+    parser.add_argument('--output', default='./out/benchmark.json',
+                        help='输出路径')
+    parser.add_argument('--phases-only', metavar='PROJECT_ROOT',
+                        help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+
+    if args.phases_only:
+        print(json.dumps(measure_phases(args.phases_only)))
+        return 0
+
+    if any(size <= 0 for size in args.sizes):
+        print("Error: --sizes must be positive", file=sys.stderr)
+        return 1
+
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error: Cannot read baseline: {e}", file=sys.stderr)
+            return 2
+
+    work_dir = os.path.abspath(args.work_dir)
+    results = []
+    for size in args.sizes:
+        print(f"Benchmarking {size} documents...")
+        result = benchmark_size(size, work_dir, args.repeat)
+        results.append(result)
+        for name, data in result["scripts"].items():
+            print(f"  {name}: {data['wall_seconds']}s, peak RSS {data['peak_rss_kb']} KB")
+        for corpus, throughput in result["phases"]["parsers"]["docs_per_second"].items():
+            print(f"  front matter ({corpus}): " +
+                  ", ".join(f"{backend} {value} docs/s" for backend, value in throughput.items()))
+
+    regressions = compare_with_baseline(results, baseline, args.threshold) if baseline else []
+    status = "warning" if regressions else "success"
+
+    output = {
+        "script": "benchmark_scripts",
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "status": status,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "git_revision": git_revision()
+        },
+        "results": results,
+        "regressions": regressions
+    }
+
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+
+    print(f"Benchmark completed. Results written to: {output_path}")
+    for regression in regressions:
+        print(f"  Regression ({regression['documents']} docs) {regression['metric']}: "
+              f"{regression['baseline_seconds']}s -> {regression['current_seconds']}s "
+              f"(x{regression['ratio']})")
+
+    if regressions:
+        return 3
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
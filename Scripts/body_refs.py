@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+正文引用扫描模块
+
+功能：在文档正文（front matter 之后）中查找提到的已知文档 ID，与 front matter
+中声明的 traces_from / traces_to 比对，找出"正文提到但未声明"的追溯关系与
+"已声明但正文从未提到"的追溯关系，供 validate_trace.py --body-refs 使用
+
+匹配方式：
+    全部已知 ID 构建一个多模式匹配器：ID 前缀（前 LEAD_LENGTH 个字节）合并为
+    一个编译正则，找到候选位置后取出完整的 ID 字符串（由 ID 字符组成的最长
+    片段）查哈希表。每个文档只扫描一遍，耗时与语料总字节数成正比，与 ID 数量
+    无关；ID 必须作为完整片段出现（FR_core_001 不匹配 FR_core_0011）。
+    大于 MMAP_THRESHOLD 的文件以 mmap 方式扫描，不整体读入内存
+
+Usage:
+    from body_refs import IdMatcher, check_body_references
+
+    matcher = IdMatcher(all_documents)
+    matcher.scan(b"see FR_core_001 and SA_core_002")   # -> {"FR_core_001", "SA_core_002"}
+    issues = []
+    stats = check_body_references(project_root, documents, all_documents, issues.append)
+
+Author: ArchPilot Core Framework
+Date: 2026-10-18
+"""
+
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import metrics
+from front_matter import DELIMITER_BYTES, MAX_HEADER_BYTES
+
+
+# ============ 配置常量 ============
+
+# 候选前缀长度（字节，短于此长度的 ID 取其全长）
+LEAD_LENGTH = 3
+
+# 不小于此大小的文件使用 mmap 扫描（字节）
+MMAP_THRESHOLD = 256 * 1024
+
+# 并行扫描时每个任务的文档数
+SCAN_CHUNK_SIZE = 256
+
+# ID 字符（字母、数字、"_"、"-"，以及已知 ID 中出现的其他字符）
+BASE_ID_CHARS = frozenset(b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-")
+
+
+# ============ 核心功能 ============
+
+class IdMatcher:
+    """已知文档 ID 的多模式匹配器"""
+
+    def __init__(self, ids):
+        self.ids = {}   # ID 字节串 -> ID
+        for doc_id in ids:
+            self.ids[doc_id.encode('utf-8')] = doc_id
+        chars = set(BASE_ID_CHARS)
+        for raw in self.ids:
+            chars.update(raw)
+        # 按字节值建表，边界判断只做一次下标访问
+        self.id_chars = bytes(1 if byte in chars else 0 for byte in range(256))
+        char_class = b"".join(re.escape(bytes([byte])) for byte in sorted(chars))
+        leads = sorted({raw[:LEAD_LENGTH] for raw in self.ids},
+                       key=lambda lead: (-len(lead), lead))
+        self.pattern = None
+        if leads:
+            alternatives = b"|".join(re.escape(lead) for lead in leads)
+            self.pattern = re.compile(b"(?:" + alternatives + b")[" + char_class + b"]*")
+
+    def scan(self, data, start: int = 0) -> set:
+        """扫描 data[start:]（bytes 或 mmap），返回提到的已知 ID 集合"""
+        found = set()
+        if self.pattern is None:
+            return found
+        ids = self.ids
+        id_chars = self.id_chars
+        for match in self.pattern.finditer(data, start):
+            position = match.start()
+            # 候选前缀位于更长片段中间时不算提到（左边界）
+            if position > start and id_chars[data[position - 1]]:
+                continue
+            doc_id = ids.get(match.group())
+            if doc_id is not None:
+                found.add(doc_id)
+        return found
+
+
+def body_start(data) -> int:
+    """正文起始位置：front matter 结束分隔符所在行之后（无 front matter 时为 0）"""
+    if data[:len(DELIMITER_BYTES)] != DELIMITER_BYTES:
+        return 0
+    position = data.find(b"\n", 0, MAX_HEADER_BYTES)
+    while position != -1 and position < MAX_HEADER_BYTES:
+        line_start = position + 1
+        if data[line_start:line_start + len(DELIMITER_BYTES)] == DELIMITER_BYTES:
+            end = data.find(b"\n", line_start)
+            return len(data) if end == -1 else end + 1
+        position = data.find(b"\n", line_start, MAX_HEADER_BYTES)
+    return 0
+
+
+def scan_file(path: str, matcher: IdMatcher) -> tuple:
+    """扫描单个文档正文，返回 (提到的 ID 集合, 扫描字节数)；读取失败返回 (None, 0)"""
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return set(), 0
+            if size < MMAP_THRESHOLD:
+                data = f.read()
+                return matcher.scan(data, body_start(data)), len(data)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return matcher.scan(data, body_start(data)), size
+    except OSError:
+        return None, 0
+
+
+_WORKER_MATCHER = None
+
+
+def _init_worker(ids) -> None:
+    global _WORKER_MATCHER
+    _WORKER_MATCHER = IdMatcher(ids)
+
+
+def _scan_in_worker(path: str) -> tuple:
+    return scan_file(path, _WORKER_MATCHER)
+
+
+def scan_documents(project_root: str, documents: list, ids, jobs: int = 1):
+    """扫描文档正文，按 documents 顺序逐个产生 (提到的 ID 集合, 扫描字节数)
+
+    jobs > 1 且文档足够多时用进程池并行扫描（每个工作进程构建一次匹配器）。
+    """
+    paths = [os.path.join(project_root, doc.file) for doc in documents]
+    if jobs <= 1 or len(paths) < SCAN_CHUNK_SIZE * 2:
+        matcher = IdMatcher(ids)
+        for path in paths:
+            yield scan_file(path, matcher)
+        return
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(list(ids),)) as pool:
+        yield from pool.map(_scan_in_worker, paths, chunksize=SCAN_CHUNK_SIZE)
+
+
+@metrics.timed("check_body_references")
+def check_body_references(project_root: str, documents: list, all_documents: dict,
+                          report, jobs: int = 1) -> dict:
+    """比对正文提到的 ID 与声明的追溯关系，问题逐条交给 report(问题)，返回统计
+
+    正文提到其他层级的已知文档但 traces_from / traces_to 均未声明时记为警告；
+    已声明且目标文档存在、但正文从未提到时记为提示（info）。同层文档之间的
+    提及与文档对自身 ID 的提及不计入。问题不在内存中汇总。
+    """
+    documents = list(documents)
+    scanned = scan_documents(project_root, documents, all_documents.keys(), jobs)
+
+    stats = {
+        "documents_scanned": 0,
+        "bytes_scanned": 0,
+        "mentions": 0,
+        "undeclared_mentions": 0,
+        "unmentioned_traces": 0
+    }
+    for doc, (mentioned, size) in zip(documents, scanned):
+        if mentioned is None:
+            continue
+        stats["documents_scanned"] += 1
+        stats["bytes_scanned"] += size
+        mentioned.discard(doc.id)
+        stats["mentions"] += len(mentioned)
+        declared = set(doc.traces_from)
+        declared.update(doc.traces_to)
+
+        for ref in sorted(mentioned - declared):
+            target = all_documents[ref]
+            if target.layer == doc.layer:
+                continue
+            stats["undeclared_mentions"] += 1
+            report({
+                "document": doc.id,
+                "layer": doc.layer,
+                "issue": f"Mentioned in body but not declared: {ref}",
+                "severity": "warning",
+                "reference": ref,
+                "reference_layer": target.layer
+            })
+        for ref in sorted(declared - mentioned):
+            if ref not in all_documents:
+                continue
+            stats["unmentioned_traces"] += 1
+            report({
+                "document": doc.id,
+                "layer": doc.layer,
+                "issue": f"Declared but not mentioned in body: {ref}",
+                "severity": "info",
+                "reference": ref
+            })
+
+    metrics.count("body_bytes_scanned", stats["bytes_scanned"])
+    return stats
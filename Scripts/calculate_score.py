@@ -4,6 +4,14 @@
 
 功能：计算五维度质量评分
 
+结果缓存：每个维度按其读取的输入（层级目录、文件名，需读取内容的文件另含
+大小与修改时间）逐层计算 Merkle 指纹：文件 → 层级 → 维度。指纹未变的维度
+直接使用本地缓存结果，只有输入发生变化的维度重新计算
+
+D5 代码质量：用标准库 ast 分析 L4 Python 源文件（圈复杂度、函数长度、嵌套
+深度、头部追溯注释与公共 API 文档注释，规则见 rules_coding.md），按违规比例
+扣分。每个文件的分析结果按内容哈希缓存，D5 重新计算时只解析内容变化的文件
+
 Usage:
     python3 calculate_score.py --version v1.0.0 --output result.json
 
@@ -11,6 +19,13 @@ Arguments:
     --version VERSION   版本号（必需）
     --output PATH       输出路径（默认 ./out/quality_score.json）
     --detailed          输出详细分析
+    --cache PATH        维度结果缓存路径（默认 ./out/score_cache.json）
+    --no-cache          禁用结果缓存，全部维度重新计算
+    --code-cache PATH   D5 代码分析结果缓存路径（默认 ./out/code_metrics_cache.json）
+    --jobs N            D5 并行分析进程数（默认 0 = 自动使用 CPU 核数）
+    --history DB        将本次评分追加到 SQLite 历史库（见 run_history.py）
+    --profile           输出中附加 metrics 块（各维度耗时、文件数、读取字节数、峰值内存）
+    --profile-output PATH  同时用 cProfile 记录并导出 pstats 文件
     --help              显示帮助
 
 Exit Codes:
@@ -24,12 +39,23 @@ Date: 2026-02-01
 """
 
 import argparse
+import hashlib
 import json
 import os
+import sqlite3
 import sys
 from datetime import datetime
+from fnmatch import fnmatchcase
 from pathlib import Path
 
+import code_metrics
+import front_matter
+import metrics
+from code_metrics import (MAX_COMPLEXITY, MAX_EXAMPLES, MAX_FUNCTION_LINES, MAX_NESTING_DEPTH,
+                          CodeMetricsCache, analyze_entries, summarize)
+from history_store import HistoryStore
+from repo_index import LAYER_DIRECTORIES, get_index, resolve_jobs
+
 
 # ============ 配置常量 ============
 
@@ -50,33 +76,45 @@ GRADE_THRESHOLDS = {
     "fail": 0
 }
 
-# 层级目录
-LAYER_DIRECTORIES = {
-    "L1": "L1_Requirements",
-    "L2": "L2_Architecture",
-    "L3": "L3_DetailDesign",
-    "L4": "L4_Implementation",
-    "L5": "L5_Verification"
+# D3 统计的实现文件扩展名
+CODE_EXTENSIONS = (".cpp", ".py", ".js", ".ts")
+
+# D4 统计的测试文件名模式
+TEST_FILE_PATTERNS = ("TC_*.md", "test_*.py", "*_test.cpp")
+
+# D5 扣分权重：违规比例（文件级按文件数，函数级按函数数）× 权重
+D5_PENALTIES = {
+    "syntax_errors": 2.0,  # 无法解析的文件
+    "header": 1.0,         # 头部追溯注释不完整的文件
+    "complex": 1.0,        # 圈复杂度超限的函数
+    "long": 0.5,           # 过长的函数
+    "deep": 0.5,           # 嵌套过深的函数
+    "undocumented": 0.5    # 缺少文档注释的公共函数/类
 }
 
+# 维度结果缓存
+SCORE_CACHE_VERSION = 1
+DEFAULT_CACHE_PATH = "./out/score_cache.json"
+
 
 # ============ 评分计算函数 ============
 
+@metrics.timed("calculate_d1_score")
 def calculate_d1_score(project_root: str) -> dict:
     """计算 D1: 文档完整性评分"""
     score = 5.0
     deductions = []
     details = []
+    index = get_index(project_root)
 
     # 检查各层级文档
-    for layer, directory in LAYER_DIRECTORIES.items():
+    for layer in LAYER_DIRECTORIES:
         if layer in ["L1", "L2", "L3"]:  # D1 只检查设计文档
-            dir_path = Path(project_root) / directory
-            if not dir_path.exists():
+            if not index.layer_exists(layer):
                 score -= 1.0
                 deductions.append(f"{layer} directory not found")
             else:
-                doc_count = len(list(dir_path.glob("*.md")))
+                doc_count = len(index.files(layer, pattern="*.md", recursive=False))
                 details.append(f"{layer}: {doc_count} documents")
                 if doc_count == 0:
                     score -= 0.5
@@ -101,25 +139,24 @@ def calculate_d1_score(project_root: str) -> dict:
     }
 
 
+@metrics.timed("calculate_d2_score")
 def calculate_d2_score(project_root: str) -> dict:
     """计算 D2: 追溯关系评分"""
-    # 简化实现：检查文档是否包含追溯字段
+    # 简化实现：检查文档头部是否包含追溯字段（仅读取 front matter）
     score = 5.0
     deductions = []
     details = []
 
     total_docs = 0
     docs_with_trace = 0
+    index = get_index(project_root)
 
-    for layer, directory in LAYER_DIRECTORIES.items():
-        dir_path = Path(project_root) / directory
-        if dir_path.exists():
-            for md_file in dir_path.glob("*.md"):
-                if md_file.name not in ["README.md", "INDEX.md"]:
-                    total_docs += 1
-                    content = md_file.read_text(encoding='utf-8')
-                    if "traces_from:" in content or "traces_to:" in content:
-                        docs_with_trace += 1
+    for layer in LAYER_DIRECTORIES:
+        for md_file in index.documents(layer, recursive=False):
+            total_docs += 1
+            metadata = md_file.release_front_matter()
+            if "traces_from" in metadata or "traces_to" in metadata:
+                docs_with_trace += 1
 
     if total_docs > 0:
         trace_ratio = docs_with_trace / total_docs
@@ -149,22 +186,21 @@ def calculate_d2_score(project_root: str) -> dict:
     }
 
 
+@metrics.timed("calculate_d3_score")
 def calculate_d3_score(project_root: str) -> dict:
     """计算 D3: 功能实现评分"""
     score = 5.0
     deductions = []
     details = []
 
-    l4_dir = Path(project_root) / LAYER_DIRECTORIES["L4"]
-    if not l4_dir.exists():
+    index = get_index(project_root)
+    if not index.layer_exists("L4"):
         score = 1.0
         deductions.append("L4 Implementation directory not found")
     else:
         # 统计实现文件
-        code_files = list(l4_dir.rglob("*.cpp")) + \
-                     list(l4_dir.rglob("*.py")) + \
-                     list(l4_dir.rglob("*.js")) + \
-                     list(l4_dir.rglob("*.ts"))
+        code_files = [entry for entry in index.files("L4")
+                      if os.path.splitext(entry.name)[1] in CODE_EXTENSIONS]
 
         details.append(f"Code files found: {len(code_files)}")
 
@@ -186,20 +222,20 @@ def calculate_d3_score(project_root: str) -> dict:
     }
 
 
+@metrics.timed("calculate_d4_score")
 def calculate_d4_score(project_root: str) -> dict:
     """计算 D4: 测试验证评分"""
     score = 5.0
     deductions = []
     details = []
 
-    l5_dir = Path(project_root) / LAYER_DIRECTORIES["L5"]
-    if not l5_dir.exists():
+    index = get_index(project_root)
+    if not index.layer_exists("L5"):
         score = 1.0
         deductions.append("L5 Verification directory not found")
     else:
-        test_files = list(l5_dir.rglob("TC_*.md")) + \
-                     list(l5_dir.rglob("test_*.py")) + \
-                     list(l5_dir.rglob("*_test.cpp"))
+        test_files = [entry for entry in index.files("L5")
+                      if any(fnmatchcase(entry.name, p) for p in TEST_FILE_PATTERNS)]
 
         details.append(f"Test files found: {len(test_files)}")
 
@@ -221,15 +257,60 @@ def calculate_d4_score(project_root: str) -> dict:
     }
 
 
-def calculate_d5_score(project_root: str) -> dict:
-    """计算 D5: 代码质量评分"""
-    # 简化实现：基于基本检查
-    score = 4.0  # 默认良好
+@metrics.timed("calculate_d5_score")
+def calculate_d5_score(project_root: str, code_cache: CodeMetricsCache = None,
+                       jobs: int = 1) -> dict:
+    """计算 D5: 代码质量评分（L4 Python 源文件的 AST 度量，见 code_metrics）"""
+    score = 5.0
     deductions = []
     details = []
 
-    details.append("Basic code quality check (simplified)")
-    details.append("Full static analysis requires external tools")
+    index = get_index(project_root)
+    sources = python_sources(index)
+    if not sources:
+        # 无可分析的 Python 源文件：保持中性评分
+        score = 4.0
+        details.append("No Python sources in L4 (AST analysis skipped)")
+    else:
+        summary = summarize(analyze_entries(sources, code_cache, jobs))
+        counts = summary["counts"]
+        functions = summary["functions"]
+        average = summary["complexity_total"] / functions if functions else 0.0
+        details.append(f"Python files analyzed: {summary['files']}")
+        details.append(f"Functions: {functions} (average complexity {average:.1f}, "
+                       f"max {summary['max_complexity']})")
+        compliant = (summary["files"] - len(summary["syntax_errors"]) -
+                     len(summary["header_incomplete"]))
+        details.append(f"Header compliant files: {compliant}/{summary['files']}")
+
+        # 按违规比例扣分：文件级问题按文件数、函数级问题按函数数
+        ratios = {
+            "syntax_errors": len(summary["syntax_errors"]) / summary["files"],
+            "header": len(summary["header_incomplete"]) / summary["files"]
+        }
+        for key in ("complex", "long", "deep", "undocumented"):
+            ratios[key] = counts[key] / functions if functions else 0.0
+        for key, ratio in ratios.items():
+            score -= D5_PENALTIES[key] * min(ratio, 1.0)
+
+        if summary["syntax_errors"]:
+            deductions.append(f"{len(summary['syntax_errors'])} files cannot be parsed: "
+                              f"{', '.join(summary['syntax_errors'][:MAX_EXAMPLES])}")
+        if summary["header_incomplete"]:
+            deductions.append(f"{len(summary['header_incomplete'])} files missing "
+                              f"traceability header fields: "
+                              f"{', '.join(summary['header_incomplete'][:MAX_EXAMPLES])}")
+        messages = {
+            "complex": f"functions exceed complexity {MAX_COMPLEXITY}",
+            "long": f"functions exceed {MAX_FUNCTION_LINES} lines",
+            "deep": f"functions exceed nesting depth {MAX_NESTING_DEPTH}",
+            "undocumented": "public functions/classes without docstring"
+        }
+        for key, message in messages.items():
+            if counts[key]:
+                deductions.append(f"{counts[key]} {message}: "
+                                  f"{'; '.join(summary['examples'][key])}")
+        score = max(score, 1.0)
 
     return {
         "dimension": "D5",
@@ -242,6 +323,164 @@ def calculate_d5_score(project_root: str) -> dict:
     }
 
 
+def python_sources(index) -> list:
+    """D5 分析对象：L4 下的 Python 源文件"""
+    return [entry for entry in index.files("L4") if entry.extension == ".py"]
+
+
+# ============ 维度输入指纹 ============
+
+def _digest(parts) -> str:
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part.encode("utf-8", "surrogateescape"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def layer_fingerprint(index, layer: str, entries, with_stat: bool = False) -> str:
+    """层级节点指纹：层级是否存在 + 各文件叶子（相对路径，读取内容时另含大小与修改时间）"""
+    parts = [layer, "1" if index.layer_exists(layer) else "0"]
+    for entry in entries:
+        if with_stat:
+            parts.append(f"{entry.rel_path}|{entry.size}|{entry.mtime!r}")
+        else:
+            parts.append(entry.rel_path)
+    return _digest(parts)
+
+
+def fingerprint_d1(index, project_root: str) -> list:
+    """D1 输入：L1-L3 顶层 .md 文件名、Governance 目录是否存在"""
+    parts = [layer_fingerprint(index, layer, index.files(layer, pattern="*.md", recursive=False))
+             for layer in ("L1", "L2", "L3")]
+    parts.append("Governance:" + str(os.path.isdir(os.path.join(project_root, "Governance"))))
+    return parts
+
+
+def fingerprint_d2(index, project_root: str) -> list:
+    """D2 输入：各层级顶层文档（读取 front matter，计入大小与修改时间）"""
+    return [layer_fingerprint(index, layer, index.documents(layer, recursive=False), True)
+            for layer in LAYER_DIRECTORIES]
+
+
+def fingerprint_d3(index, project_root: str) -> list:
+    """D3 输入：L4 实现文件名"""
+    return [layer_fingerprint(index, "L4", [entry for entry in index.files("L4")
+                                            if os.path.splitext(entry.name)[1] in CODE_EXTENSIONS])]
+
+
+def fingerprint_d4(index, project_root: str) -> list:
+    """D4 输入：L5 测试文件名"""
+    return [layer_fingerprint(index, "L5", [entry for entry in index.files("L5")
+                                            if any(fnmatchcase(entry.name, p)
+                                                   for p in TEST_FILE_PATTERNS)])]
+
+
+def fingerprint_d5(index, project_root: str) -> list:
+    """D5 输入：L4 Python 源文件（读取内容，计入大小与修改时间）"""
+    return [layer_fingerprint(index, "L4", python_sources(index), True)]
+
+
+# 维度 -> (计算函数, 输入指纹函数)
+DIMENSIONS = {
+    "D1": (calculate_d1_score, fingerprint_d1),
+    "D2": (calculate_d2_score, fingerprint_d2),
+    "D3": (calculate_d3_score, fingerprint_d3),
+    "D4": (calculate_d4_score, fingerprint_d4),
+    "D5": (calculate_d5_score, fingerprint_d5)
+}
+
+
+def _code_fingerprint() -> str:
+    """评分逻辑指纹：脚本自身、D5 分析模块或 front matter 解析变化时缓存整体失效"""
+    digest = hashlib.sha1(front_matter.PARSER_BACKEND.encode("ascii"))
+    for path in (__file__, code_metrics.__file__, front_matter.__file__):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+@metrics.timed("dimension_fingerprint")
+def dimension_fingerprint(dimension: str, project_root: str, code: str = "") -> str:
+    """维度根指纹：评分逻辑 + 维度 + 各层级节点指纹"""
+    index = get_index(project_root)
+    return _digest([code, dimension] + DIMENSIONS[dimension][1](index, project_root))
+
+
+class ScoreCache:
+    """按维度输入指纹缓存评分结果"""
+
+    def __init__(self, cache_path: str, project_root: str):
+        self.cache_path = Path(cache_path)
+        self.project_root = os.path.abspath(project_root)
+        self.dimensions = {}
+        self._dirty = False
+
+    def load(self) -> "ScoreCache":
+        """读取缓存文件；格式不兼容或项目不一致时丢弃"""
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self
+        if (data.get("cache_version") == SCORE_CACHE_VERSION and
+                data.get("project_root") == self.project_root):
+            self.dimensions = data.get("dimensions", {})
+        return self
+
+    def get(self, dimension: str, fingerprint: str) -> dict:
+        cached = self.dimensions.get(dimension)
+        if cached and cached.get("fingerprint") == fingerprint:
+            return cached["result"]
+        return None
+
+    def put(self, dimension: str, fingerprint: str, result: dict) -> None:
+        self.dimensions[dimension] = {"fingerprint": fingerprint, "result": result}
+        self._dirty = True
+
+    def save(self) -> None:
+        """有变更时原子写回缓存文件"""
+        if not self._dirty:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({
+                "cache_version": SCORE_CACHE_VERSION,
+                "project_root": self.project_root,
+                "dimensions": self.dimensions
+            }, ensure_ascii=False, separators=(",", ":")))
+        os.replace(tmp_path, self.cache_path)
+        self._dirty = False
+
+
+def score_dimensions(project_root: str, cache: ScoreCache = None,
+                     code_cache: CodeMetricsCache = None, jobs: int = 1) -> tuple:
+    """计算五个维度，返回 (结果字典, 命中缓存的维度列表)
+
+    code_cache / jobs 仅用于 D5：按文件内容哈希缓存 AST 分析结果、并行分析进程数。
+    """
+    results = {}
+    cached = []
+    code = _code_fingerprint() if cache else ""
+    for dimension, (calculate, _) in DIMENSIONS.items():
+        fingerprint = dimension_fingerprint(dimension, project_root, code) if cache else None
+        result = cache.get(dimension, fingerprint) if cache else None
+        if result is not None:
+            cached.append(dimension)
+            metrics.count("score_cache_hits")
+        else:
+            if dimension == "D5":
+                result = calculate(project_root, code_cache, jobs)
+            else:
+                result = calculate(project_root)
+            if cache:
+                cache.put(dimension, fingerprint, result)
+                metrics.count("score_cache_misses")
+        results[dimension] = result
+    return results, cached
+
+
 def determine_grade(total_score: float) -> tuple:
     """确定质量评级"""
     if total_score >= GRADE_THRESHOLDS["excellent"]:
@@ -266,33 +505,9 @@ def determine_recommendation(total_score: float, grade: str) -> str:
         return "❌ 禁止发布"
 
 
-def parse_args():
-    """解析命令行参数"""
-    parser = argparse.ArgumentParser(
-        description='计算五维度质量评分',
-        formatter_class=argparse.RawDescriptionHelpFormatter
-    )
-    parser.add_argument('--version', required=True,
-                        help='版本号')
-    parser.add_argument('--output', default='./out/quality_score.json',
-                        help='输出路径')
-    parser.add_argument('--detailed', action='store_true',
-                        help='输出详细分析')
-    parser.add_argument('--project-root', default='.',
-                        help='项目根目录')
-    return parser.parse_args()
-
-
-def main():
-    """主函数"""
-    args = parse_args()
-
-    # 计算各维度评分
-    d1 = calculate_d1_score(args.project_root)
-    d2 = calculate_d2_score(args.project_root)
-    d3 = calculate_d3_score(args.project_root)
-    d4 = calculate_d4_score(args.project_root)
-    d5 = calculate_d5_score(args.project_root)
+def build_output(args, results: dict, cached: list = None) -> dict:
+    """由各维度结果计算总分、评级与发布建议，构建脚本 JSON 输出"""
+    d1, d2, d3, d4, d5 = (results[dimension] for dimension in DIMENSIONS)
 
     dimensions = [d1, d2, d3, d4, d5]
 
@@ -332,6 +547,72 @@ def main():
         "weights": SCORE_WEIGHTS,
         "thresholds": GRADE_THRESHOLDS
     }
+    if cached is not None:
+        output["cached_dimensions"] = cached
+    return output
+
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(
+        description='计算五维度质量评分',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--version', required=True,
+                        help='版本号')
+    parser.add_argument('--output', default='./out/quality_score.json',
+                        help='输出路径')
+    parser.add_argument('--detailed', action='store_true',
+                        help='输出详细分析')
+    parser.add_argument('--project-root', default='.',
+                        help='项目根目录')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH,
+                        help='维度结果缓存路径')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='禁用结果缓存（含 D5 代码分析缓存）')
+    parser.add_argument('--code-cache', default=code_metrics.DEFAULT_CACHE_PATH,
+                        help='D5 代码分析结果缓存路径（按文件内容哈希）')
+    parser.add_argument('--jobs', type=int, default=0,
+                        help='D5 并行分析进程数（默认 0 = 自动使用 CPU 核数）')
+    parser.add_argument('--history',
+                        help='追加本次评分的 SQLite 历史库路径')
+    parser.add_argument('--profile', action='store_true',
+                        help='输出中附加运行指标（耗时、文件数、读取字节数、峰值内存）')
+    parser.add_argument('--profile-output',
+                        help='将 cProfile 统计写入指定 pstats 文件')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+
+    if args.profile or args.profile_output:
+        metrics.enable()
+    profiler = metrics.start_profiler(args.profile_output)
+
+    # 计算各维度评分（输入指纹未变的维度直接取缓存）
+    cache = None if args.no_cache else ScoreCache(args.cache, args.project_root).load()
+    code_cache = None if args.no_cache else CodeMetricsCache(args.code_cache).load()
+    results, cached = score_dimensions(args.project_root, cache, code_cache,
+                                       resolve_jobs(args.jobs))
+    if cache:
+        cache.save()
+    if code_cache and "D5" not in cached:
+        code_cache.prune()
+        code_cache.save()
+        metrics.count("code_cache_hits", code_cache.hits)
+        metrics.count("code_cache_misses", code_cache.misses)
+    output = build_output(args, results, cached if cache else None)
+    dimensions = list(output["dimensions"].values())
+    total_score = output["total_score"]
+    grade_cn, grade_en = output["grade"]["chinese"], output["grade"]["english"]
+    recommendation = output["recommendation"]
+    status = output["status"]
+
+    metrics.stop_profiler(profiler, args.profile_output)
+    if args.profile:
+        output["metrics"] = metrics.snapshot()
 
     # 输出结果
     output_path = Path(args.output)
@@ -340,6 +621,13 @@ def main():
     with open(output_path, 'w', encoding='utf-8') as f:
         json.dump(output, f, indent=2, ensure_ascii=False)
 
+    if args.history:
+        try:
+            with HistoryStore(args.history) as store:
+                store.record_run(score=output)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Warning: Cannot record history: {e}", file=sys.stderr)
+
     # 打印摘要
     print(f"Quality Score Calculation - {args.version}")
     print("=" * 50)
@@ -350,6 +638,8 @@ def main():
     print(f"  Grade: {grade_cn} ({grade_en})")
     print(f"  Recommendation: {recommendation}")
     print("=" * 50)
+    if cached:
+        print(f"Cached dimensions: {', '.join(cached)}")
     print(f"Results written to: {output_path}")
 
     # 返回退出码
@@ -0,0 +1,591 @@
+#!/usr/bin/env python3
+"""
+Markdown 链接检查脚本
+
+功能：检查项目中 Markdown 文档的相对链接与标题锚点（Governance/、Guides/、
+Agents/ 及 L1-L5 等全部文档）。每个文件单遍流式读取，同时计算内容哈希、
+提取链接与标题锚点；全部文件的路径与锚点组成共享索引，链接逐条在索引中
+解析。提取结果按内容哈希缓存（路径 + 修改时间 + 大小未变的文件不重新读取），
+重复运行只处理变更文件
+
+检查内容：
+    - 相对路径链接（文件或目录）不存在
+    - 锚点（#heading、file.md#heading）不是目标文档中的标题或 HTML 锚点
+      （锚点按 GitHub 规则由标题生成：小写、去除标点、空格转为 "-"，重复标题
+      依次追加 -1、-2）
+    外部链接（http:、mailto: 等）与模板占位符（含 "{{" 的链接）不检查；
+    代码块与行内代码中的链接忽略
+
+Usage:
+    python3 check_links.py --output result.json
+    python3 check_links.py --paths Governance Guides Agents
+    python3 check_links.py --project-root ../my_project --jobs 8
+
+Arguments:
+    --paths PATH ...    只报告这些文件或目录中的链接（默认整个项目；锚点索引
+                        始终覆盖整个项目）
+    --project-root DIR  项目根目录（默认当前目录）
+    --output PATH       输出路径（默认 ./out/link_check.json）
+    --cache PATH        提取结果缓存路径（默认 ./out/link_check_cache.json）
+    --no-cache          禁用缓存
+    --jobs N            并行提取进程数（默认自动检测 CPU 核数）
+    --profile           输出中附加 metrics 块（各阶段耗时、文件数、峰值内存）
+    --profile-output PATH  同时用 cProfile 记录并导出 pstats 文件
+    --help              显示帮助
+
+Exit Codes:
+    0 - 成功，无失效链接
+    1 - 参数错误
+    2 - 依赖错误（项目目录或指定路径不存在）
+    3 - 检查失败（存在失效链接或锚点）
+
+Author: ArchPilot Core Framework
+Date: 2026-10-18
+"""
+
+import argparse
+import difflib
+import hashlib
+import json
+import os
+import posixpath
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import unquote
+
+import metrics
+from repo_index import resolve_jobs
+
+
+# ============ 配置常量 ============
+
+DEFAULT_OUTPUT = "./out/link_check.json"
+DEFAULT_CACHE_PATH = "./out/link_check_cache.json"
+
+CACHE_VERSION = 1
+
+MARKDOWN_EXTENSIONS = (".md", ".markdown")
+
+# 不进入的目录（另外跳过全部隐藏目录）
+EXCLUDED_DIRS = {"out", "node_modules", "__pycache__"}
+
+# 并行提取的分块大小；待提取文件少于两块时不启用进程池
+EXTRACT_CHUNK_SIZE = 64
+
+# 失效锚点最多给出的相近锚点数
+MAX_SUGGESTIONS = 3
+
+FENCE_PATTERN = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+HEADING_PATTERN = re.compile(r"^ {0,3}(#{1,6})[ \t]+(.*?)(?:[ \t]+#+)?[ \t]*$")
+# setext 标题：段落行之后的 "===" / "---" 下划线行；列表项与引用块不作为标题段落起始
+SETEXT_UNDERLINE_PATTERN = re.compile(r"^ {0,3}(?:=+|-+)[ \t]*$")
+NON_PARAGRAPH_PATTERN = re.compile(r"^(?: {4}|\t| {0,3}(?:[-*+>]|\d{1,9}[.)])(?:[ \t]|$))")
+INLINE_CODE_PATTERN = re.compile(r"(`+)(?:(?!\1).)+?\1")
+INLINE_LINK_PATTERN = re.compile(r"!?\[(?:[^\[\]]|\[[^\[\]]*\])*\]\(\s*(<[^>]*>|[^\s()]+)"
+                                 r"(?:\s+(?:\"[^\"]*\"|'[^']*'|\([^)]*\)))?\s*\)")
+REFERENCE_PATTERN = re.compile(r"^ {0,3}\[[^\]]+\]:\s*(<[^>]*>|\S+)")
+HTML_ANCHOR_PATTERN = re.compile(r"<a\s[^>]*?\b(?:name|id)\s*=\s*[\"']([^\"']+)[\"']",
+                                 re.IGNORECASE)
+SCHEME_PATTERN = re.compile(r"^[A-Za-z][A-Za-z0-9+.-]*:")
+
+# 标题转锚点：去除内联链接目标、HTML 标签，再去除字母数字、"_"、"-"、空格以外的字符
+HEADING_LINK_PATTERN = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+HTML_TAG_PATTERN = re.compile(r"<[^>]+>")
+SLUG_STRIP_PATTERN = re.compile(r"[^\w\- ]")
+
+
+# ============ 提取 ============
+
+def heading_slug(text: str) -> str:
+    """按 GitHub 规则由标题文本生成锚点（不含重复标题后缀）"""
+    text = HEADING_LINK_PATTERN.sub(r"\1", text)
+    text = HTML_TAG_PATTERN.sub("", text)
+    return SLUG_STRIP_PATTERN.sub("", text.strip().lower()).replace(" ", "-")
+
+
+def extract_stream(f) -> tuple:
+    """单遍读取二进制流：返回 (内容哈希, {"anchors": [...], "links": [[行号, 目标], ...]})"""
+    digest = hashlib.sha1()
+    anchors = []
+    slug_counts = {}
+    links = []
+    paragraph = []
+    fence = None
+    in_front_matter = False
+
+    def add_heading(text: str) -> None:
+        slug = heading_slug(text)
+        count = slug_counts.get(slug, 0)
+        slug_counts[slug] = count + 1
+        anchors.append(slug if count == 0 else f"{slug}-{count}")
+
+    for number, raw in enumerate(f, 1):
+        digest.update(raw)
+        line = raw.decode('utf-8', errors='replace').rstrip('\r\n')
+
+        # 文档头部 YAML front matter
+        if number == 1 and line.startswith("---"):
+            in_front_matter = True
+            continue
+        if in_front_matter:
+            if line.startswith("---"):
+                in_front_matter = False
+            continue
+
+        # 代码块
+        fence_match = FENCE_PATTERN.match(line)
+        if fence:
+            # 结束标记：同种字符、长度不小于开始标记且其后无其他内容
+            marker = fence_match.group(1) if fence_match else ""
+            if marker[:1] == fence[0] and len(marker) >= len(fence) and line.strip() == marker:
+                fence = None
+            continue
+        if fence_match:
+            fence = fence_match.group(1)
+            paragraph = []
+            continue
+
+        # 标题：ATX（# 标题）或 setext（段落 + 下划线行，段落多行时合并为一个标题）
+        heading = HEADING_PATTERN.match(line)
+        if heading:
+            add_heading(heading.group(2))
+            paragraph = []
+        elif paragraph and SETEXT_UNDERLINE_PATTERN.match(line):
+            add_heading(" ".join(paragraph))
+            paragraph = []
+            continue
+        elif not line.strip():
+            paragraph = []
+        elif paragraph or not NON_PARAGRAPH_PATTERN.match(line):
+            paragraph.append(line.strip())
+
+        if "<" in line:
+            anchors.extend(HTML_ANCHOR_PATTERN.findall(line))
+        if "](" not in line and "]:" not in line:
+            continue
+        text = INLINE_CODE_PATTERN.sub("", line) if "`" in line else line
+        for match in INLINE_LINK_PATTERN.finditer(text):
+            links.append([number, match.group(1)])
+        reference = REFERENCE_PATTERN.match(text)
+        if reference:
+            links.append([number, reference.group(1)])
+
+    for link in links:
+        target = link[1]
+        if target.startswith("<") and target.endswith(">"):
+            link[1] = target[1:-1]
+    return digest.hexdigest(), {"anchors": anchors, "links": links}
+
+
+def extract_file(path: str) -> tuple:
+    """提取单个文件的链接与锚点；读取失败返回 (None, None)"""
+    try:
+        with open(path, 'rb') as f:
+            return extract_stream(f)
+    except OSError:
+        return None, None
+
+
+def _extractor_fingerprint() -> str:
+    """提取逻辑指纹：本脚本内容变化时全部结果失效"""
+    with open(__file__, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+# ============ 结果缓存 ============
+
+class LinkCache:
+    """按内容哈希缓存的提取结果（路径 + 修改时间 + 大小映射到内容哈希）"""
+
+    def __init__(self, cache_path: str, project_root: str):
+        self.cache_path = Path(cache_path)
+        self.project_root = os.path.abspath(project_root)
+        self.extractor = _extractor_fingerprint()
+        self.files = {}
+        self.results = {}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+
+    def load(self) -> "LinkCache":
+        """读取缓存文件；格式、项目或提取逻辑不一致时丢弃"""
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self
+        if (data.get("cache_version") == CACHE_VERSION and
+                data.get("project_root") == self.project_root and
+                data.get("extractor") == self.extractor):
+            self.files = data.get("files", {})
+            self.results = data.get("results", {})
+        return self
+
+    def lookup(self, entry) -> dict:
+        """文件状态未变时返回缓存结果，否则返回 None"""
+        cached = self.files.get(entry.rel_path)
+        if cached and cached["mtime"] == entry.mtime and cached["size"] == entry.size:
+            return self.results.get(cached["hash"])
+        return None
+
+    def put(self, entry, content_hash: str, result: dict) -> None:
+        self.files[entry.rel_path] = {"mtime": entry.mtime, "size": entry.size,
+                                      "hash": content_hash}
+        self.results[content_hash] = result
+        self._dirty = True
+
+    def prune(self, seen: set) -> int:
+        """清理本次运行未出现的文件记录及不再被引用的结果"""
+        stale = [path for path in self.files if path not in seen]
+        for path in stale:
+            del self.files[path]
+        referenced = {cached["hash"] for cached in self.files.values()}
+        orphaned = [key for key in self.results if key not in referenced]
+        for key in orphaned:
+            del self.results[key]
+        if stale or orphaned:
+            self._dirty = True
+        return len(stale)
+
+    def save(self) -> None:
+        """有变更时原子写回缓存文件"""
+        if not self._dirty:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({
+                "cache_version": CACHE_VERSION,
+                "project_root": self.project_root,
+                "extractor": self.extractor,
+                "files": self.files,
+                "results": self.results
+            }, ensure_ascii=False, separators=(",", ":")))
+        os.replace(tmp_path, self.cache_path)
+        self._dirty = False
+
+
+# ============ 路径与锚点索引 ============
+
+class MarkdownFile:
+    """待提取的 Markdown 文件"""
+
+    __slots__ = ("path", "rel_path", "mtime", "size")
+
+    def __init__(self, path: str, rel_path: str, mtime: float, size: int):
+        self.path = path
+        self.rel_path = rel_path
+        self.mtime = mtime
+        self.size = size
+
+
+@metrics.timed("scan_project")
+def scan_project(project_root: str) -> tuple:
+    """单次遍历项目目录：返回 (文件相对路径集合, 目录相对路径集合, Markdown 文件列表)
+
+    相对路径统一使用 "/" 分隔，与链接写法一致。
+    """
+    files = set()
+    dirs = {""}
+    markdown = []
+    stack = [(project_root, "")]
+    while stack:
+        directory, prefix = stack.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            rel_path = prefix + entry.name
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+            if is_dir:
+                if entry.name.startswith(".") or entry.name in EXCLUDED_DIRS:
+                    continue
+                dirs.add(rel_path)
+                stack.append((entry.path, rel_path + "/"))
+                continue
+            files.add(rel_path)
+            if entry.name.lower().endswith(MARKDOWN_EXTENSIONS):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                markdown.append(MarkdownFile(entry.path, rel_path, st.st_mtime, st.st_size))
+    markdown.sort(key=lambda item: item.rel_path)
+    metrics.count("markdown_files", len(markdown))
+    return files, dirs, markdown
+
+
+@metrics.timed("extract_links")
+def extract_all(markdown: list, cache: LinkCache = None, jobs: int = 1) -> dict:
+    """提取全部 Markdown 文件，返回 相对路径 -> 提取结果（缓存命中的文件不读取）"""
+    extracted = {}
+    pending = []
+    for item in markdown:
+        cached = cache.lookup(item) if cache else None
+        if cached is not None:
+            extracted[item.rel_path] = cached
+        else:
+            pending.append(item)
+    if cache:
+        cache.hits += len(markdown) - len(pending)
+        cache.misses += len(pending)
+    metrics.count("files_extracted", len(pending))
+
+    paths = [item.path for item in pending]
+    if jobs <= 1 or len(paths) < EXTRACT_CHUNK_SIZE * 2:
+        results = map(extract_file, paths)
+        _store(pending, results, extracted, cache)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = pool.map(extract_file, paths, chunksize=EXTRACT_CHUNK_SIZE)
+            _store(pending, results, extracted, cache)
+    return extracted
+
+
+def _store(pending: list, results, extracted: dict, cache: LinkCache) -> None:
+    """回填提取结果（读取失败的文件不记录）"""
+    for item, (content_hash, result) in zip(pending, results):
+        if result is None:
+            continue
+        extracted[item.rel_path] = result
+        if cache:
+            cache.put(item, content_hash, result)
+
+
+# ============ 链接解析 ============
+
+def classify_target(target: str) -> str:
+    """链接类型：external / placeholder / local"""
+    if SCHEME_PATTERN.match(target) or target.startswith("//"):
+        return "external"
+    if "{{" in target or "}}" in target:
+        return "placeholder"
+    return "local"
+
+
+def resolve_target(source: str, target: str) -> tuple:
+    """解析本地链接：返回 (目标相对路径或 None（本文档内锚点）, 锚点或 None)
+
+    以 "/" 开头的链接相对项目根目录；其余相对源文件所在目录。
+    """
+    path, _, anchor = target.partition("#")
+    path = unquote(path.split("?", 1)[0])
+    anchor = unquote(anchor) if anchor else None
+    if not path:
+        return None, anchor
+    if path.startswith("/"):
+        resolved = posixpath.normpath(path.lstrip("/"))
+    else:
+        resolved = posixpath.normpath(posixpath.join(posixpath.dirname(source), path))
+    return ("" if resolved == "." else resolved), anchor
+
+
+def anchor_issue(source: str, number: int, target: str, anchor: str,
+                 anchors: set, target_file: str) -> dict:
+    """锚点检查：锚点不存在时返回问题记录"""
+    if anchor in anchors or anchor.lower() in anchors:
+        return None
+    issue = {
+        "file": source,
+        "line": number,
+        "link": target,
+        "issue": f"Anchor not found in {target_file}: #{anchor}",
+        "severity": "error"
+    }
+    suggestions = difflib.get_close_matches(anchor.lower(), sorted(anchors), MAX_SUGGESTIONS)
+    if suggestions:
+        issue["suggestions"] = suggestions
+    return issue
+
+
+def check_file_links(source: str, result: dict, project_root: str, files: set,
+                     dirs: set, extracted: dict, anchor_sets: dict, counts: dict) -> list:
+    """解析单个文档中的全部链接，返回问题列表"""
+    issues = []
+    for number, target in result["links"]:
+        counts["links"] += 1
+        kind = classify_target(target)
+        if kind != "local":
+            counts[kind] += 1
+            continue
+
+        resolved, anchor = resolve_target(source, target)
+        if resolved is None:
+            target_file = source
+        elif resolved == ".." or resolved.startswith("../"):
+            # 项目根目录以外的链接直接检查文件系统，不检查锚点
+            counts["outside_project"] += 1
+            if not os.path.exists(os.path.join(project_root, resolved)):
+                issues.append({"file": source, "line": number, "link": target,
+                               "issue": f"Link target not found: {resolved}",
+                               "severity": "error"})
+            continue
+        elif resolved in files:
+            target_file = resolved
+        elif resolved in dirs:
+            continue
+        else:
+            issues.append({"file": source, "line": number, "link": target,
+                           "issue": f"Link target not found: {resolved}",
+                           "severity": "error"})
+            continue
+
+        if anchor and target_file in extracted:
+            anchors = anchor_sets.get(target_file)
+            if anchors is None:
+                anchors = anchor_sets[target_file] = set(extracted[target_file]["anchors"])
+            issue = anchor_issue(source, number, target, anchor, anchors, target_file)
+            if issue:
+                issues.append(issue)
+    return issues
+
+
+def in_scope(rel_path: str, scopes: list) -> bool:
+    """文件是否位于 --paths 指定的范围内"""
+    if scopes is None:
+        return True
+    return any(scope == "" or rel_path == scope or rel_path.startswith(scope + "/")
+               for scope in scopes)
+
+
+@metrics.timed("check_links")
+def check_links(project_root: str, scopes: list = None, cache: LinkCache = None,
+                jobs: int = 1) -> dict:
+    """检查项目文档链接；scopes 为相对项目根目录的报告范围（None 表示整个项目）"""
+    files, dirs, markdown = scan_project(project_root)
+    extracted = extract_all(markdown, cache, jobs)
+    if cache:
+        cache.prune(set(extracted))
+
+    counts = {"links": 0, "external": 0, "placeholder": 0, "outside_project": 0}
+    issues = []
+    anchor_sets = {}
+    files_checked = 0
+    for rel_path in sorted(extracted):
+        if not in_scope(rel_path, scopes):
+            continue
+        files_checked += 1
+        issues.extend(check_file_links(rel_path, extracted[rel_path], project_root, files,
+                                       dirs, extracted, anchor_sets, counts))
+
+    broken_anchors = sum(1 for issue in issues if issue["issue"].startswith("Anchor"))
+    return {
+        "status": "failed" if issues else "passed",
+        "statistics": {
+            "markdown_files": len(markdown),
+            "files_checked": files_checked,
+            "links": counts["links"],
+            "external_skipped": counts["external"],
+            "placeholders_skipped": counts["placeholder"],
+            "outside_project": counts["outside_project"],
+            "broken_links": len(issues) - broken_anchors,
+            "broken_anchors": broken_anchors
+        },
+        "issues": issues
+    }
+
+
+# ============ 命令行 ============
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(
+        description='检查 Markdown 文档的相对链接与标题锚点',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例:
+    python3 check_links.py
+    python3 check_links.py --paths Governance Guides Agents
+    python3 check_links.py --project-root ../my_project --jobs 8
+        """
+    )
+    parser.add_argument('--paths', nargs='+', metavar='PATH',
+                        help='只报告这些文件或目录中的链接（相对项目根目录）')
+    parser.add_argument('--project-root', default='.',
+                        help='项目根目录')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT,
+                        help='输出路径')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH,
+                        help='提取结果缓存路径')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='禁用缓存')
+    parser.add_argument('--jobs', type=int, default=0,
+                        help='并行提取进程数（默认 0 = 自动使用 CPU 核数）')
+    parser.add_argument('--profile', action='store_true',
+                        help='输出中附加运行指标（耗时、文件数、峰值内存）')
+    parser.add_argument('--profile-output',
+                        help='将 cProfile 统计写入指定 pstats 文件')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+
+    if not os.path.isdir(args.project_root):
+        print(f"Error: Project root not found: {args.project_root}", file=sys.stderr)
+        return 2
+
+    scopes = None
+    if args.paths:
+        scopes = []
+        for path in args.paths:
+            if not os.path.exists(os.path.join(args.project_root, path)):
+                print(f"Error: Path not found: {path}", file=sys.stderr)
+                return 2
+            scope = posixpath.normpath(path.replace(os.sep, "/")).strip("/")
+            scopes.append("" if scope == "." else scope)
+
+    if args.profile or args.profile_output:
+        metrics.enable()
+    profiler = metrics.start_profiler(args.profile_output)
+
+    cache = None if args.no_cache else LinkCache(args.cache, args.project_root).load()
+    result = check_links(args.project_root, scopes, cache, resolve_jobs(args.jobs))
+    if cache:
+        cache.save()
+    metrics.stop_profiler(profiler, args.profile_output)
+
+    output = {
+        "script": "check_links",
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "status": result["status"],
+        "project_root": os.path.abspath(args.project_root),
+        "paths": scopes,
+        "statistics": result["statistics"],
+        "issues": result["issues"],
+        "summary": {
+            "total_issues": len(result["issues"]),
+            "files_with_issues": len({issue["file"] for issue in result["issues"]})
+        }
+    }
+    if cache:
+        output["cache"] = {"hits": cache.hits, "misses": cache.misses}
+    if args.profile:
+        output["metrics"] = metrics.snapshot()
+
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+
+    print(f"Link check completed. Results written to: {output_path}")
+    print(f"Status: {result['status']}")
+    stats = result["statistics"]
+    print(f"Links: {stats['links']} checked, {stats['broken_links']} broken, "
+          f"{stats['broken_anchors']} broken anchors")
+
+    if result["status"] == "failed":
+        return 3
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,24 +2,38 @@
 """
 命名规范检查脚本模板
 
-功能：检查项目文件命名是否符合 rules_naming.md 定义的规范
+功能：检查项目文件命名是否符合 rules_naming.md 定义的规范。规则从项目的
+naming_rules.json 加载（见 naming_rules.py，未找到时使用内置默认规则），
+每个文件只做一次组合正则匹配，同时得到命中的规则与模块、编号、类型等字段；
+编号字段用于检测层级内的重复编号（规则 unique 字段组合相同的多个文件）
 
 Usage:
     python3 check_naming.py --layer L1 --output result.json
     python3 check_naming.py --all-layers --strict
+    python3 check_naming.py --staged
+    python3 check_naming.py --changed-since origin/main
+    python3 check_naming.py --all-layers --rules config/naming_rules.json
 
 Arguments:
     --layer LAYER   指定检查层级（L1/L2/L3/L4/L5）
     --all-layers    检查所有层级
     --strict        严格模式，警告也视为错误
+    --rules PATH    命名规则配置文件（默认查找 Governance/rules/naming_rules.json）
     --output PATH   输出路径（默认 ./out/naming_check.json）
+    --watch         常驻监听模式，文件变更时仅检查变更文件并输出单行 JSON
+    --poll          监听模式强制使用轮询（默认优先 inotify）
+    --changed-since REF  只检查工作区相对 REF 变更的文件（未指定层级时检查全部层级；
+                         重复编号仍与层级内全部文件比较，只报告在变更文件上）
+    --staged        只检查暂存区中变更的文件（pre-commit 使用）
+    --profile       输出中附加 metrics 块（各阶段耗时、文件数、读取字节数、峰值内存）
+    --profile-output PATH  同时用 cProfile 记录并导出 pstats 文件
     --help          显示帮助
 
 Exit Codes:
     0 - 成功，无错误
     1 - 参数错误
-    2 - 依赖错误（目录不存在等）
-    3 - 检查失败（发现命名问题）
+    2 - 依赖错误（目录不存在、规则配置无效等）
+    3 - 检查失败（发现命名问题或重复编号）
 
 Author: ArchPilot Core Framework
 Date: 2026-02-01
@@ -28,54 +42,95 @@ Date: 2026-02-01
 import argparse
 import json
 import os
-import re
 import sys
+import time
 from datetime import datetime
 from pathlib import Path
 
+import metrics
+from git_changes import GitError, changed_files, listed_files
+from naming_rules import RuleConfigError, RuleSet, load_rules
+from repo_index import LAYER_DIRECTORIES, LAYER_ORDER, get_index, index_listed, index_paths
+from watch_mode import emit_event, run_watch
 
-# ============ 配置常量（根据项目调整） ============
-
-# 层级目录配置
-LAYER_CONFIG = {
-    "L1": {
-        "directory": "L1_Requirements",
-        "prefix_pattern": r"^FR_[a-z]+_\d{3}_[a-z_]+\.md$",
-        "description": "需求文档"
-    },
-    "L2": {
-        "directory": "L2_Architecture",
-        "prefix_pattern": r"^SA_[a-z]+_\d{3}_[a-z_]+\.md$",
-        "description": "架构文档"
-    },
-    "L3": {
-        "directory": "L3_DetailDesign",
-        "prefix_pattern": r"^DD_[a-z]+_\d{3}_[a-z_]+\.md$",
-        "description": "设计文档"
-    },
-    "L4": {
-        "directory": "L4_Implementation",
-        "prefix_pattern": r"^[a-z]+_\d{3}_[a-z_]+\.(cpp|h|py|js|ts)$",
-        "description": "实现代码"
-    },
-    "L5": {
-        "directory": "L5_Verification",
-        "prefix_pattern": r"^TC_[a-z]+_\d{3}_[a-z]+_[a-z_]+\.md$",
-        "description": "测试用例"
-    }
-}
+
+# ============ 配置常量 ============
+
+# 重复编号错误中最多列出的冲突文件数
+MAX_CONFLICTS = 5
 
 
 # ============ 核心功能 ============
 
-def check_layer_naming(layer: str, project_root: str, strict: bool = False) -> dict:
-    """检查指定层级的命名规范"""
-    config = LAYER_CONFIG.get(layer)
-    if not config:
+def check_file_naming(layer: str, entry, rules: RuleSet) -> tuple:
+    """检查单个文件的命名规范，返回 (错误记录或 None, 规则匹配结果或 None)"""
+    if not rules.is_checked(entry):
+        return None, None
+
+    match = rules.classify(layer, entry.name)
+    if match is None:
+        error = {
+            "file": entry.rel_path,
+            "issue": "Naming pattern mismatch",
+            "expected_pattern": rules.expected_pattern(layer)
+        }
+        other = rules.classify_any(entry.name)
+        if other is not None:
+            error["matches_layer"] = other.rule.layer
+        return error, None
+    return None, match
+
+
+def length_warning(entry, rules: RuleSet) -> dict:
+    """文件名超长警告记录"""
+    return {
+        "file": entry.rel_path,
+        "issue": "Filename too long",
+        "length": len(entry.name),
+        "max_length": rules.max_length
+    }
+
+
+def duplicate_errors(sequences: dict, reported: set = None) -> list:
+    """重复编号错误：sequences 为 重复检测键 -> 文件相对路径列表
+
+    提供 reported 时只为其中的文件生成错误（冲突文件仍完整列出）。
+    """
+    errors = []
+    for key, paths in sequences.items():
+        if len(paths) < 2:
+            continue
+        paths = sorted(paths)
+        for path in paths:
+            if reported is not None and path not in reported:
+                continue
+            errors.append({
+                "file": path,
+                "issue": "Duplicate sequence",
+                "fields": dict(zip(*key)),
+                "occurrences": len(paths),
+                "conflicts_with": [other for other in paths if other != path][:MAX_CONFLICTS]
+            })
+    errors.sort(key=lambda error: error["file"])
+    return errors
+
+
+@metrics.timed("check_layer_naming")
+def check_layer_naming(layer: str, project_root: str, strict: bool = False,
+                       index=None, rules: RuleSet = None, full_index=None) -> dict:
+    """检查指定层级的命名规范
+
+    index 为部分索引（变更范围模式）时只检查其中的文件；同时提供 full_index
+    （层级内全部文件的索引，可只含文件名，见 repo_index.index_listed）时，变更
+    文件还与层级内其余文件比较编号（不读取内容），重复编号只报告在变更文件上。
+    """
+    if layer not in LAYER_ORDER:
         return {"error": f"Unknown layer: {layer}"}
 
-    directory = Path(project_root) / config["directory"]
-    if not directory.exists():
+    rules = rules or load_rules(project_root)
+    index = index or get_index(project_root)
+    directory = index.layer_path(layer)
+    if not index.layer_exists(layer):
         return {
             "layer": layer,
             "directory": str(directory),
@@ -86,28 +141,39 @@ def check_layer_naming(layer: str, project_root: str, strict: bool = False) -> d
             "warnings": []
         }
 
-    pattern = re.compile(config["prefix_pattern"])
     errors = []
     warnings = []
     files_checked = 0
+    classified = {rule.name: 0 for rule in rules.rules.get(layer, ())}
+    sequences = {}
+    max_length = rules.max_length or float("inf")
 
-    for file_path in directory.rglob("*"):
-        if file_path.is_file() and not file_path.name.startswith("."):
+    for entry in index.files(layer):
+        if not entry.name.startswith("."):
             files_checked += 1
-            filename = file_path.name
-
-            # 跳过特殊文件
-            if filename in ["README.md", "INDEX.md", ".gitkeep"]:
+            error, match = check_file_naming(layer, entry, rules)
+            if error:
+                errors.append(error)
+            elif match is not None:
+                classified[match.rule.name] += 1
+                key = match.key
+                if key is not None:
+                    sequences.setdefault(key, []).append(entry.rel_path)
+                if len(entry.name) > max_length:
+                    warnings.append(length_warning(entry, rules))
+    reported = None
+    if full_index is not None and full_index is not index:
+        # 变更范围模式：登记层级内未变更文件的编号，重复只报告在变更文件上
+        reported = {path for paths in sequences.values() for path in paths}
+        for entry in full_index.files(layer):
+            if entry.rel_path in reported or not rules.is_checked(entry):
                 continue
-
-            # 检查命名规范
-            if not pattern.match(filename):
-                if filename.endswith(".md") or filename.endswith((".cpp", ".h", ".py", ".js", ".ts")):
-                    errors.append({
-                        "file": str(file_path.relative_to(project_root)),
-                        "issue": "Naming pattern mismatch",
-                        "expected_pattern": config["prefix_pattern"]
-                    })
+            match = rules.classify(layer, entry.name)
+            key = match.key if match is not None else None
+            if key is not None and key in sequences:
+                sequences[key].append(entry.rel_path)
+    errors.extend(duplicate_errors(sequences, reported))
+    metrics.count("files_checked", files_checked)
 
     status = "passed"
     if errors:
@@ -122,12 +188,140 @@ def check_layer_naming(layer: str, project_root: str, strict: bool = False) -> d
         "directory": str(directory),
         "status": status,
         "files_checked": files_checked,
+        "classified": classified,
+        "duplicate_sequences": sum(1 for paths in sequences.values() if len(paths) > 1),
         "errors": errors,
         "warnings": warnings
     }
 
 
-def parse_args():
+def watch_naming(project_root: str, layers: list, rules: RuleSet,
+                 polling: bool = False) -> int:
+    """监听模式：保持索引与编号登记常驻，文件变更时仅重新检查变更文件"""
+    index = get_index(project_root)
+    errors = {}
+    sequences = {}   # (层级, 重复检测键) -> 文件相对路径集合
+    keys = {}        # 文件相对路径 -> (层级, 重复检测键)
+
+    def register(layer, entry):
+        error, match = check_file_naming(layer, entry, rules)
+        if error:
+            errors[entry.rel_path] = error
+        elif match is not None and match.key is not None:
+            key = (layer, match.key)
+            sequences.setdefault(key, set()).add(entry.rel_path)
+            keys[entry.rel_path] = key
+        return error
+
+    def unregister(rel_path):
+        errors.pop(rel_path, None)
+        key = keys.pop(rel_path, None)
+        if key is not None:
+            sequences[key].discard(rel_path)
+            if not sequences[key]:
+                del sequences[key]
+        return key
+
+    def file_record(layer, rel_path):
+        """文件当前检查状态（含重复编号）"""
+        error = errors.get(rel_path)
+        record = {
+            "file": rel_path,
+            "layer": layer,
+            "status": "failed" if error else "passed",
+            "error": error
+        }
+        key = keys.get(rel_path)
+        if key is not None and len(sequences[key]) > 1:
+            record["status"] = "failed"
+            record["duplicate_of"] = sorted(sequences[key] - {rel_path})[:MAX_CONFLICTS]
+        return record
+
+    for layer in layers:
+        for entry in index.files(layer):
+            register(layer, entry)
+
+    def on_change(paths):
+        start = time.perf_counter()
+        changed = []
+        touched = set()   # 编号登记发生变化的 (层级, 重复检测键)
+        for old, new in index.update_paths(paths):
+            layer = (new or old).layer
+            if layer not in layers:
+                continue
+            if old is not None:
+                touched.add(unregister(old.rel_path))
+            if new is None:
+                changed.append({"file": old.rel_path, "layer": layer, "status": "deleted"})
+                continue
+            register(layer, new)
+            touched.add(keys.get(new.rel_path))
+            changed.append(file_record(layer, new.rel_path))
+        if not changed:
+            return
+
+        # 同编号的其他文件状态随之变化（出现或解除重复），一并输出
+        reported = {record["file"] for record in changed}
+        for key in sorted(key for key in touched if key is not None and key in sequences):
+            for rel_path in sorted(sequences[key] - reported):
+                changed.append(file_record(key[0], rel_path))
+                reported.add(rel_path)
+
+        duplicates = sum(1 for paths in sequences.values() if len(paths) > 1)
+        emit_event({
+            "script": "check_naming",
+            "event": "update",
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "status": "failed" if errors or duplicates else "passed",
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+            "changed": changed,
+            "summary": {"errors": len(errors), "duplicate_sequences": duplicates}
+        })
+
+    # 尚未创建的层级目录同样监听，创建后其中的文件自动纳入
+    roots = [index.layer_root(layer) for layer in layers]
+    return run_watch(roots, on_change, polling)
+
+
+def selected_layers(args) -> list:
+    """要检查的层级：--all-layers 或未指定 --layer 时为全部层级"""
+    if args.all_layers or not args.layer:
+        return list(LAYER_ORDER)
+    return [args.layer]
+
+
+def build_output(args, layers: list, results: list, scope: dict = None,
+                 rules: RuleSet = None) -> dict:
+    """汇总各层级检查结果，构建脚本 JSON 输出"""
+    overall_status = "passed"
+    for result in results:
+        if result.get("status") == "failed":
+            overall_status = "failed"
+        elif result.get("status") == "warning" and overall_status != "failed":
+            overall_status = "warning"
+
+    output = {
+        "script": "check_naming",
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "status": overall_status,
+        "strict_mode": args.strict,
+        "naming_rules": (rules or load_rules(args.project_root, args.rules)).source,
+        "layers_checked": layers,
+        "results": results,
+        "summary": {
+            "total_layers": len(layers),
+            "passed": sum(1 for r in results if r.get("status") == "passed"),
+            "failed": sum(1 for r in results if r.get("status") == "failed"),
+            "warnings": sum(1 for r in results if r.get("status") == "warning"),
+            "skipped": sum(1 for r in results if r.get("status") == "skipped")
+        }
+    }
+    if scope is not None:
+        output["scope"] = scope
+    return output
+
+
+def parse_args(argv=None):
     """解析命令行参数"""
     parser = argparse.ArgumentParser(
         description='检查项目文件命名是否符合规范',
@@ -145,57 +339,90 @@ def parse_args():
                         help='检查所有层级')
     parser.add_argument('--strict', action='store_true',
                         help='严格模式')
+    parser.add_argument('--rules', metavar='PATH',
+                        help='命名规则配置文件（默认查找 Governance/rules/naming_rules.json）')
     parser.add_argument('--output', default='./out/naming_check.json',
                         help='输出路径')
     parser.add_argument('--project-root', default='.',
                         help='项目根目录')
-    return parser.parse_args()
-
-
-def main():
+    parser.add_argument('--watch', action='store_true',
+                        help='常驻监听模式')
+    parser.add_argument('--poll', action='store_true',
+                        help='监听模式强制使用轮询')
+    scope = parser.add_mutually_exclusive_group()
+    scope.add_argument('--changed-since', metavar='REF',
+                       help='只检查相对 REF 变更的文件')
+    scope.add_argument('--staged', action='store_true',
+                       help='只检查暂存区中变更的文件')
+    parser.add_argument('--profile', action='store_true',
+                        help='输出中附加运行指标（耗时、文件数、读取字节数、峰值内存）')
+    parser.add_argument('--profile-output',
+                        help='将 cProfile 统计写入指定 pstats 文件')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """主函数"""
-    args = parse_args()
+    args = parse_args(argv)
+
+    scoped = bool(args.changed_since or args.staged)
 
     # 参数验证
-    if not args.layer and not args.all_layers:
+    if not args.layer and not args.all_layers and not scoped:
         print("Error: Must specify --layer or --all-layers", file=sys.stderr)
         return 1
+    if scoped and args.watch:
+        print("Error: --watch cannot be combined with --changed-since/--staged",
+              file=sys.stderr)
+        return 1
 
     # 确定要检查的层级
-    layers_to_check = []
-    if args.all_layers:
-        layers_to_check = list(LAYER_CONFIG.keys())
-    else:
-        layers_to_check = [args.layer]
+    layers_to_check = selected_layers(args)
+
+    try:
+        rules = load_rules(args.project_root, args.rules)
+    except RuleConfigError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    # 变更范围模式：只为 git 报告的变更文件建索引；重复编号比较所需的同层文件名
+    # 取自 git 文件列表，且只列出含变更文件的层级，不遍历层级目录
+    index = None
+    full_index = None
+    scope = None
+    if scoped:
+        try:
+            changed = changed_files(args.project_root, args.changed_since, args.staged)
+            index = index_paths(args.project_root,
+                                [os.path.join(args.project_root, path) for path in changed])
+            directories = [LAYER_DIRECTORIES[layer] for layer in layers_to_check
+                           if index.files(layer)]
+            listed = (listed_files(args.project_root, directories, args.staged)
+                      if directories else [])
+        except GitError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+        full_index = index_listed(args.project_root, listed)
+        scope = {
+            "mode": "staged" if args.staged else "changed_since",
+            "ref": args.changed_since,
+            "changed_files": len(changed)
+        }
 
-    # 执行检查
-    results = []
-    overall_status = "passed"
+    if args.profile or args.profile_output:
+        metrics.enable()
+    profiler = metrics.start_profiler(args.profile_output)
 
-    for layer in layers_to_check:
-        result = check_layer_naming(layer, args.project_root, args.strict)
-        results.append(result)
-        if result.get("status") == "failed":
-            overall_status = "failed"
-        elif result.get("status") == "warning" and overall_status != "failed":
-            overall_status = "warning"
+    # 执行检查
+    results = [check_layer_naming(layer, args.project_root, args.strict, index, rules,
+                                  full_index)
+               for layer in layers_to_check]
+    output = build_output(args, layers_to_check, results, scope, rules)
+    overall_status = output["status"]
 
-    # 构建输出
-    output = {
-        "script": "check_naming",
-        "timestamp": datetime.utcnow().isoformat() + "Z",
-        "status": overall_status,
-        "strict_mode": args.strict,
-        "layers_checked": layers_to_check,
-        "results": results,
-        "summary": {
-            "total_layers": len(layers_to_check),
-            "passed": sum(1 for r in results if r.get("status") == "passed"),
-            "failed": sum(1 for r in results if r.get("status") == "failed"),
-            "warnings": sum(1 for r in results if r.get("status") == "warning"),
-            "skipped": sum(1 for r in results if r.get("status") == "skipped")
-        }
-    }
+    metrics.stop_profiler(profiler, args.profile_output)
+    if args.profile:
+        output["metrics"] = metrics.snapshot()
 
     # 输出结果
     output_path = Path(args.output)
@@ -207,6 +434,9 @@ def main():
     print(f"Check completed. Results written to: {output_path}")
     print(f"Status: {overall_status}")
 
+    if args.watch:
+        return watch_naming(args.project_root, layers_to_check, rules, args.poll)
+
     # 返回退出码
     if overall_status == "failed":
         return 3
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+代码质量度量模块
+
+功能：使用标准库 ast 分析 L4 Python 源文件，计算每个函数的圈复杂度、
+函数长度、最大嵌套深度，并按 `rules_coding.md` 检查文件头部追溯注释
+（Traceability / Author / Date / Version）与公共函数、类的文档注释，
+供 calculate_score.py 的 D5 代码质量评分使用
+
+缓存：每个文件的分析结果按内容哈希（SHA-1）缓存，路径 + 修改时间 + 大小
+未变的文件不重新读取；内容相同的文件（如回溯不同标签）共享同一结果。
+待分析文件较多时按分块分发到进程池并行解析
+
+缓存文件格式（JSON）：
+    {
+      "cache_version": 1,
+      "analyzer": "<code_metrics.py 内容哈希>",
+      "files": {"L4_Implementation/app.py": {"mtime": ..., "size": ..., "hash": "..."}},
+      "results": {"<内容哈希>": {"functions": 3, "complex": [...], ...}}
+    }
+
+Usage:
+    from code_metrics import CodeMetricsCache, analyze_entries
+
+    cache = CodeMetricsCache("./out/code_metrics_cache.json").load()
+    results = analyze_entries(entries, cache, jobs=4)
+    cache.prune()
+    cache.save()
+
+Author: ArchPilot Core Framework
+Date: 2026-10-18
+"""
+
+import ast
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import metrics
+
+
+# ============ 配置常量 ============
+
+# 函数级阈值（超过即计为违规）
+MAX_COMPLEXITY = 10
+MAX_FUNCTION_LINES = 50
+MAX_NESTING_DEPTH = 4
+
+# rules_coding.md 2.1：Python 文件头部 docstring 必需字段
+HEADER_FIELDS = ("Traceability", "Requirement", "Architecture", "Design", "Testcase",
+                 "Author", "Date", "Version")
+
+# 违规示例的保留条数（每个文件、每类）
+MAX_EXAMPLES = 5
+
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_PATH = "./out/code_metrics_cache.json"
+
+# 并行分析的分块大小；待分析文件少于两块时不启用进程池
+ANALYZE_CHUNK_SIZE = 64
+
+HEADER_FIELD_PATTERN = re.compile(r"^\s*(?:-\s*)?([A-Za-z]+)\s*:", re.MULTILINE)
+
+# 增加圈复杂度的分支节点（布尔运算、推导式、match 分支另行计算）
+BRANCH_NODES = (ast.If, ast.IfExp, ast.For, ast.AsyncFor, ast.While, ast.ExceptHandler)
+
+# 增加嵌套深度的复合语句
+NESTING_NODES = tuple(getattr(ast, name) for name in
+                      ("If", "For", "AsyncFor", "While", "With", "AsyncWith",
+                       "Try", "TryStar", "Match") if hasattr(ast, name))
+
+SCOPE_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+MATCH_CASE = getattr(ast, "match_case", ())
+
+
+# ============ AST 分析 ============
+
+class FunctionStats:
+    """单个函数的度量（嵌套定义的函数单独统计）"""
+
+    __slots__ = ("complexity", "depth")
+
+    def __init__(self):
+        self.complexity = 1
+        self.depth = 0
+
+    def count(self, node) -> None:
+        if isinstance(node, BRANCH_NODES):
+            self.complexity += 1
+        elif isinstance(node, ast.BoolOp):
+            self.complexity += len(node.values) - 1
+        elif isinstance(node, ast.comprehension):
+            self.complexity += 1 + len(node.ifs)
+        elif MATCH_CASE and isinstance(node, MATCH_CASE):
+            self.complexity += 1
+
+    def measure(self, node, depth: int = 0) -> None:
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, SCOPE_NODES):
+                continue
+            self.count(child)
+            if isinstance(child, NESTING_NODES):
+                # elif 与所属 if 处于同一嵌套层级
+                is_elif = (isinstance(node, ast.If) and isinstance(child, ast.If) and
+                           node.orelse == [child] and child.col_offset == node.col_offset)
+                level = depth if is_elif else depth + 1
+                self.depth = max(self.depth, level)
+                self.measure(child, level)
+            else:
+                self.measure(child, depth)
+
+
+def header_missing(tree) -> list:
+    """文件头部 docstring 缺少的必需字段（无 docstring 时返回 ["docstring"]）"""
+    docstring = ast.get_docstring(tree, clean=False)
+    if not docstring:
+        return ["docstring"]
+    present = set(HEADER_FIELD_PATTERN.findall(docstring))
+    return [field for field in HEADER_FIELDS if field not in present]
+
+
+def _collect(node, prefix: str, public: bool, result: dict) -> None:
+    """递归收集函数度量与缺少文档注释的公共定义"""
+    for child in ast.iter_child_nodes(node):
+        if not isinstance(child, SCOPE_NODES):
+            if not isinstance(child, (ast.Lambda, ast.expr)):
+                _collect(child, prefix, public, result)
+            continue
+
+        name = prefix + child.name
+        is_public = public and not child.name.startswith("_")
+        if is_public and ast.get_docstring(child) is None:
+            result["undocumented"].append([name, child.lineno])
+
+        if isinstance(child, ast.ClassDef):
+            # 公共类的公共方法需要文档注释；函数内部定义不要求
+            _collect(child, name + ".", is_public, result)
+            continue
+
+        stats = FunctionStats()
+        stats.measure(child)
+        length = (getattr(child, "end_lineno", None) or child.lineno) - child.lineno + 1
+        result["functions"] += 1
+        result["complexity_total"] += stats.complexity
+        result["max_complexity"] = max(result["max_complexity"], stats.complexity)
+        if stats.complexity > MAX_COMPLEXITY:
+            result["complex"].append([name, child.lineno, stats.complexity])
+        if length > MAX_FUNCTION_LINES:
+            result["long"].append([name, child.lineno, length])
+        if stats.depth > MAX_NESTING_DEPTH:
+            result["deep"].append([name, child.lineno, stats.depth])
+        _collect(child, name + ".", False, result)
+
+
+def analyze_source(data: bytes) -> dict:
+    """分析单个 Python 源文件内容
+
+    返回各类违规计数与前 MAX_EXAMPLES 条示例（[名称, 行号, 度量值]）；
+    无法解析时只返回 syntax_error。
+    """
+    try:
+        tree = ast.parse(data)
+    except (SyntaxError, ValueError, RecursionError) as e:
+        return {"syntax_error": f"{type(e).__name__}: {e}"}
+
+    result = {
+        "functions": 0,
+        "complexity_total": 0,
+        "max_complexity": 0,
+        "complex": [],
+        "long": [],
+        "deep": [],
+        "undocumented": [],
+        "header_missing": header_missing(tree)
+    }
+    _collect(tree, "", True, result)
+    for key in ("complex", "long", "deep", "undocumented"):
+        result[key + "_count"] = len(result[key])
+        del result[key][MAX_EXAMPLES:]
+    return result
+
+
+def analyze_file(path: str, known=()) -> tuple:
+    """读取并分析文件，返回 (内容哈希, 分析结果, 读取字节数)
+
+    内容哈希已在 known 中（已有缓存结果）时不解析，分析结果为 None。
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    content_hash = hashlib.sha1(data).hexdigest()
+    if content_hash in known:
+        return content_hash, None, len(data)
+    return content_hash, analyze_source(data), len(data)
+
+
+_WORKER_KNOWN = frozenset()
+
+
+def _init_worker(known) -> None:
+    global _WORKER_KNOWN
+    _WORKER_KNOWN = known
+
+
+def _analyze_in_worker(path: str) -> tuple:
+    return analyze_file(path, _WORKER_KNOWN)
+
+
+def _analyzer_fingerprint() -> str:
+    """分析逻辑指纹：本模块内容变化时全部结果失效"""
+    with open(__file__, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+# ============ 结果缓存 ============
+
+class CodeMetricsCache:
+    """按内容哈希缓存的文件分析结果（路径 + 修改时间 + 大小映射到内容哈希）"""
+
+    def __init__(self, cache_path: str):
+        self.cache_path = Path(cache_path)
+        self.analyzer = _analyzer_fingerprint()
+        self.files = {}
+        self.results = {}
+        self.hits = 0
+        self.misses = 0
+        self._seen = set()
+        self._dirty = False
+
+    def load(self) -> "CodeMetricsCache":
+        """读取缓存文件；格式或分析逻辑不一致时丢弃"""
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self
+        if (data.get("cache_version") == CACHE_VERSION and
+                data.get("analyzer") == self.analyzer):
+            self.files = data.get("files", {})
+            self.results = data.get("results", {})
+        return self
+
+    def lookup(self, entry) -> dict:
+        """文件状态未变时返回缓存结果，否则返回 None"""
+        self._seen.add(entry.rel_path)
+        cached = self.files.get(entry.rel_path)
+        if cached and cached["mtime"] == entry.mtime and cached["size"] == entry.size:
+            return self.results.get(cached["hash"])
+        return None
+
+    def lookup_hash(self, content_hash: str) -> dict:
+        return self.results.get(content_hash)
+
+    def put(self, entry, content_hash: str, result: dict) -> None:
+        self._seen.add(entry.rel_path)
+        self.files[entry.rel_path] = {"mtime": entry.mtime, "size": entry.size,
+                                      "hash": content_hash}
+        self.results[content_hash] = result
+        self._dirty = True
+
+    def prune(self) -> int:
+        """清理本次运行未访问到的文件记录及不再被引用的结果"""
+        stale = [path for path in self.files if path not in self._seen]
+        for path in stale:
+            del self.files[path]
+        referenced = {cached["hash"] for cached in self.files.values()}
+        orphaned = [key for key in self.results if key not in referenced]
+        for key in orphaned:
+            del self.results[key]
+        if stale or orphaned:
+            self._dirty = True
+        return len(stale)
+
+    def save(self) -> None:
+        """有变更时原子写回缓存文件"""
+        if not self._dirty:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({
+                "cache_version": CACHE_VERSION,
+                "analyzer": self.analyzer,
+                "files": self.files,
+                "results": self.results
+            }, ensure_ascii=False, separators=(",", ":")))
+        os.replace(tmp_path, self.cache_path)
+        self._dirty = False
+
+
+# ============ 批量分析 ============
+
+@metrics.timed("analyze_code")
+def analyze_entries(entries, cache: CodeMetricsCache = None, jobs: int = 1) -> list:
+    """分析索引条目，返回与输入顺序一致的 [(相对路径, 分析结果)]
+
+    缓存命中（文件状态未变）的条目不读取；其余条目的读取、哈希与解析都在
+    同一次调用中完成（待分析文件足够多时由进程池并行执行），内容哈希已有
+    缓存结果的条目只读取不解析。
+    """
+    entries = list(entries)
+    results = [None] * len(entries)
+    pending = []
+    for position, entry in enumerate(entries):
+        cached = cache.lookup(entry) if cache else None
+        if cached is not None:
+            results[position] = cached
+        else:
+            pending.append(position)
+
+    known = frozenset(cache.results) if cache else frozenset()
+    paths = [entries[position].path for position in pending]
+    if jobs <= 1 or len(paths) < ANALYZE_CHUNK_SIZE * 2:
+        analyzed = [analyze_file(path, known) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(known,)) as pool:
+            analyzed = list(pool.map(_analyze_in_worker, paths, chunksize=ANALYZE_CHUNK_SIZE))
+
+    parsed = 0
+    for position, (content_hash, result, size) in zip(pending, analyzed):
+        metrics.count("bytes_read", size)
+        if result is None:
+            result = cache.lookup_hash(content_hash)
+        else:
+            parsed += 1
+        results[position] = result
+        if cache:
+            cache.put(entries[position], content_hash, result)
+
+    if cache:
+        cache.hits += len(entries) - parsed
+        cache.misses += parsed
+    metrics.count("code_files_analyzed", parsed)
+
+    return [(entry.rel_path, result) for entry, result in zip(entries, results)]
+
+
+def summarize(files: list) -> dict:
+    """汇总各文件分析结果，违规示例附带文件路径（"路径:行号 名称 (度量值)"）"""
+    summary = {
+        "files": len(files),
+        "syntax_errors": [],
+        "header_incomplete": [],
+        "functions": 0,
+        "complexity_total": 0,
+        "max_complexity": 0
+    }
+    examples = {key: [] for key in ("complex", "long", "deep", "undocumented")}
+    counts = dict.fromkeys(examples, 0)
+
+    for rel_path, result in files:
+        if "syntax_error" in result:
+            summary["syntax_errors"].append(rel_path)
+            continue
+        if result["header_missing"]:
+            summary["header_incomplete"].append(rel_path)
+        summary["functions"] += result["functions"]
+        summary["complexity_total"] += result["complexity_total"]
+        summary["max_complexity"] = max(summary["max_complexity"], result["max_complexity"])
+        for key in examples:
+            counts[key] += result[key + "_count"]
+            for item in result[key]:
+                if len(examples[key]) < MAX_EXAMPLES:
+                    suffix = f" ({item[2]})" if len(item) > 2 else ""
+                    examples[key].append(f"{rel_path}:{item[1]} {item[0]}{suffix}")
+
+    summary["counts"] = counts
+    summary["examples"] = examples
+    return summary
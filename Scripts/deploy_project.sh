@@ -150,6 +150,7 @@ copy_core_files() {
 
     # 规则文件
     cp "$CORE_ROOT/Governance/rules/"*.md "$project_path/archpilot/Governance/rules/"
+    cp "$CORE_ROOT/Governance/rules/"*.json "$project_path/archpilot/Governance/rules/"
 
     # 检查清单
     cp "$CORE_ROOT/Governance/checklists/"*.md "$project_path/archpilot/Governance/checklists/"
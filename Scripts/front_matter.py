@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+YAML Front Matter 读取模块
+
+功能：逐行流式读取 Markdown 文档头部的 front matter 块，读到结束分隔符
+`---` 即停止，I/O 量只与头部大小相关，与正文大小（大表格、内嵌 base64
+图片等）无关
+
+解析：front matter 几乎都是平铺的 `key: value`，由纯 Python 的受限 YAML 解析器
+处理（比经 PyYAML 构造对象快一个数量级）：
+    - 标量：普通、单引号（'' 转义）、双引号（JSON 兼容转义）
+    - 行内列表 [a, "b, c"] 与块列表（key: 换行后的 - item）
+    - # 注释（行首，或值之后且前面有空白）
+遇到受限子集以外的语法（块标量 | >、锚点与别名、嵌套映射、跨行的行内列表、
+续行等）时，若已安装 PyYAML 的 libyaml 扩展则交给 CBaseLoader 解析，否则按
+受限规则尽量解析（不支持的结构保留原文或忽略）
+
+值只有字符串与字符串列表两种（不做类型推断，日期、版本号保持原文），
+嵌套映射按空字符串处理
+
+Usage:
+    from front_matter import parse_front_matter, parse_front_matter_bytes
+
+    metadata = parse_front_matter("L1_Requirements/FR_core_001_xxx.md")
+    metadata = parse_front_matter_bytes(blob_content)
+
+Author: ArchPilot Core Framework
+Date: 2026-10-18
+"""
+
+import io
+import json
+
+import metrics
+
+try:
+    import yaml
+    YAML_LOADER = yaml.CBaseLoader
+except (ImportError, AttributeError):  # 未安装 PyYAML，或未编译 libyaml 扩展
+    yaml = None
+    YAML_LOADER = None
+
+
+# ============ 配置常量 ============
+
+FRONT_MATTER_DELIMITER = "---"
+DELIMITER_BYTES = FRONT_MATTER_DELIMITER.encode('ascii')
+
+# 头部读取上限（字节数），超过仍未遇到结束分隔符视为无 front matter
+MAX_HEADER_BYTES = 64 * 1024
+
+# 完整 YAML 解析后端（受限子集以外的语法）；缓存以此区分解析结果来源
+PARSER_BACKEND = "libyaml" if yaml is not None else "python"
+
+# 普通标量不能以这些字符开头（锚点、别名、标签、块标量、行内映射等），交给完整解析
+YAML_INDICATORS = frozenset("&*!|>{%@`")
+# 行内列表内容不含这些字符时按逗号直接切分（其余情况逐字符解析）
+SIMPLE_FLOW = YAML_INDICATORS | frozenset("[]#:'\"")
+SPECIAL_STARTS = YAML_INDICATORS | frozenset("['\"")
+
+
+# ============ 核心功能 ============
+
+def read_front_matter_lines(file_path) -> list:
+    """读取 front matter 块内的原始行（不含分隔符），无 front matter 返回 None"""
+    with open(file_path, 'rb') as f:
+        return read_front_matter_stream(f)
+
+
+def read_front_matter_stream(f) -> list:
+    """从二进制流读取 front matter 行（文件或 git 对象内容的 io.BytesIO）"""
+    first_line = f.readline(MAX_HEADER_BYTES)
+    consumed = len(first_line)
+    try:
+        if not first_line.startswith(DELIMITER_BYTES):
+            return None
+
+        lines = []
+        # 首行分隔符之后的内容（如 "--- key: value"）与原解析器保持一致
+        remainder = first_line[len(DELIMITER_BYTES):].decode('utf-8').strip()
+        if remainder:
+            lines.append(remainder)
+
+        while consumed < MAX_HEADER_BYTES:
+            line = f.readline(MAX_HEADER_BYTES - consumed)
+            if not line:
+                return None
+            consumed += len(line)
+            if line.startswith(DELIMITER_BYTES):
+                return lines
+            lines.append(line.decode('utf-8').rstrip('\r\n'))
+        return None
+    finally:
+        metrics.count("header_bytes_read", consumed)
+
+
+class UnsupportedSyntax(ValueError):
+    """受限 YAML 子集以外的语法"""
+
+
+def _strip_comment(text: str) -> str:
+    """去掉普通标量后的 # 注释（# 前须有空白）"""
+    pos = text.find("#")
+    while pos > 0:
+        if text[pos - 1] in " \t":
+            return text[:pos].rstrip()
+        pos = text.find("#", pos + 1)
+    return text
+
+
+def _check_rest(rest: str, strict: bool) -> None:
+    """引号或列表结束后只允许空白与注释"""
+    rest = rest.strip()
+    if rest and rest[0] != "#" and strict:
+        raise UnsupportedSyntax(rest)
+
+
+def _quoted(text: str, strict: bool) -> tuple:
+    """解析以引号开头的标量，返回 (值, 结束位置)"""
+    quote = text[0]
+    pos = 1
+    if quote == "'":
+        while True:
+            pos = text.find("'", pos)
+            if pos < 0:
+                break
+            if text[pos + 1:pos + 2] != "'":
+                return text[1:pos].replace("''", "'"), pos + 1
+            pos += 2
+    else:
+        while True:
+            pos = text.find('"', pos)
+            if pos < 0:
+                break
+            backslashes = len(text[:pos]) - len(text[:pos].rstrip("\\"))
+            if backslashes % 2 == 0:
+                try:
+                    return json.loads(text[:pos + 1]), pos + 1
+                except ValueError:  # YAML 特有的转义（\x41、\e 等）
+                    if strict:
+                        raise UnsupportedSyntax(text)
+                    return text[1:pos], pos + 1
+            pos += 1
+    # 未闭合（跨行引号）
+    if strict:
+        raise UnsupportedSyntax(text)
+    return text, len(text)
+
+
+def _scalar(text: str, strict: bool) -> str:
+    """解析标量（普通或引号），text 已去除首尾空白"""
+    if not text or text[0] == "#":
+        return ""
+    first = text[0]
+    if first in "'\"":
+        value, end = _quoted(text, strict)
+        _check_rest(text[end:], strict)
+        return value
+    if strict and (first in YAML_INDICATORS or first == "["):
+        raise UnsupportedSyntax(text)
+    return _strip_comment(text)
+
+
+def _flow_list(text: str, strict: bool) -> list:
+    """解析单行行内列表 [a, 'b', "c, d"]"""
+    items = []
+    pos = 1
+    length = len(text)
+    while pos < length:
+        char = text[pos]
+        if char in " \t,":
+            pos += 1
+        elif char == "]":
+            _check_rest(text[pos + 1:], strict)
+            return items
+        elif char in "'\"":
+            value, end = _quoted(text[pos:], strict)
+            items.append(value)
+            pos += end
+        else:
+            end = pos
+            while end < length and text[end] not in ",]":
+                end += 1
+            item = text[pos:end].strip()
+            if strict and (item[0] in YAML_INDICATORS or item[0] in "[#" or ":" in item):
+                raise UnsupportedSyntax(text)
+            items.append(item)
+            pos = end
+    # 未闭合：跨行的行内列表
+    if strict:
+        raise UnsupportedSyntax(text)
+    return [item.strip() for item in text[1:].split(",") if item.strip()]
+
+
+def _value(text: str, strict: bool):
+    """解析 key: 之后的值（已去除首尾空白、非空）"""
+    if text[0] == "[":
+        return _flow_list(text, strict)
+    return _scalar(text, strict)
+
+
+def parse_simple_yaml(lines: list, strict: bool = False) -> dict:
+    """受限 YAML 解析：顶层 key: value、行内/块列表、引号与注释
+
+    strict 为 True 时遇到子集以外的语法抛出 UnsupportedSyntax，否则尽量解析
+    （不支持的结构保留原文或忽略）。
+    """
+    metadata = {}
+    block = None    # 值为空的键之后的块列表
+    for line in lines:
+        if not line:
+            continue
+        first = line[0]
+        if first in " \t-#":
+            stripped = line.strip()
+            if not stripped or stripped[0] == "#":
+                continue
+            if stripped[0] == "-" and (len(stripped) == 1 or stripped[1] in " \t"):
+                if block is None:
+                    # 顶层列表，或跟在非空值之后的列表项
+                    if strict:
+                        raise UnsupportedSyntax(line)
+                    continue
+                key, items = block
+                if items is None:
+                    items = metadata[key] = []
+                    block = (key, items)
+                items.append(_scalar(stripped[1:].strip(), strict))
+                continue
+            # 缩进的非列表行：嵌套映射或续行
+            if strict:
+                raise UnsupportedSyntax(line)
+            continue
+
+        key, separator, value = line.partition(":")
+        if not separator:
+            if strict:
+                raise UnsupportedSyntax(line)
+            continue
+        colon = len(key)
+        key = key.strip()
+        if key and key[0] in "'\"":
+            key = _quoted(key, strict)[0]
+        value = value.strip()
+        if not value or value[0] == "#":
+            metadata[key] = ""
+            block = (key, None)
+            continue
+        if strict and line[colon + 1] not in " \t":
+            # "a:b" 在 YAML 中是普通标量而非键值对
+            raise UnsupportedSyntax(line)
+        first = value[0]
+        if first not in SPECIAL_STARTS:
+            # 常见情况：普通标量
+            metadata[key] = _strip_comment(value) if "#" in value else value
+        elif first == "[" and value[-1] == "]" and SIMPLE_FLOW.isdisjoint(value[1:-1]):
+            # 常见情况：无引号、无注释的单层行内列表
+            metadata[key] = [item for item in map(str.strip, value[1:-1].split(",")) if item]
+        else:
+            metadata[key] = _value(value, strict)
+        block = None
+    return metadata
+
+
+def _normalize(value):
+    """libyaml 结果规范为字符串或字符串列表"""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        return [item for item in value if isinstance(item, str)]
+    return ""
+
+
+def parse_with_libyaml(lines: list) -> dict:
+    """完整 YAML 解析（CBaseLoader：所有标量保持字符串），无法解析为映射时抛出 ValueError"""
+    try:
+        data = yaml.load("\n".join(lines), Loader=YAML_LOADER)
+    except yaml.YAMLError as e:
+        raise ValueError(str(e)) from e
+    if data is None:
+        return {}
+    if not isinstance(data, dict):
+        raise ValueError("Front matter is not a mapping")
+    return {key: _normalize(value) for key, value in data.items() if isinstance(key, str)}
+
+
+def parse_front_matter_lines(lines: list) -> dict:
+    """解析 front matter 行：受限子集直接解析，其余交给 libyaml（未安装时尽量解析）"""
+    try:
+        return parse_simple_yaml(lines, strict=True)
+    except UnsupportedSyntax:
+        pass
+    metrics.count("front_matter_full_yaml")
+    if yaml is not None:
+        try:
+            return parse_with_libyaml(lines)
+        except ValueError:  # 非法 YAML：与无 libyaml 时一致，尽量解析
+            pass
+    return parse_simple_yaml(lines)
+
+
+@metrics.timed("parse_front_matter")
+def parse_front_matter(file_path) -> dict:
+    """从 Markdown 文件中提取 YAML front matter 元数据"""
+    try:
+        lines = read_front_matter_lines(file_path)
+    except (OSError, UnicodeDecodeError):
+        return {}
+    metrics.count("files_parsed")
+    if lines is None:
+        return {}
+    return parse_front_matter_lines(lines)
+
+
+def parse_front_matter_bytes(data: bytes) -> dict:
+    """从文件内容（如 git 对象）中提取 YAML front matter 元数据"""
+    try:
+        lines = read_front_matter_stream(io.BytesIO(data))
+    except UnicodeDecodeError:
+        return {}
+    metrics.count("files_parsed")
+    if lines is None:
+        return {}
+    return parse_front_matter_lines(lines)
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+合成基准项目生成脚本
+
+功能：生成指定规模的 L1-L5 合成项目目录树，用于衡量检查脚本的扩展性。
+文档带有符合 rules_naming.md 的 YAML front matter 与追溯关系，并按比例注入
+断链引用与不规范文件名
+
+规模分布（按文档总数）：
+    L1 10% / L2 15% / L3 25% / L4 30%（代码文件）/ L5 20%
+
+Usage:
+    python3 generate_bench_project.py --documents 10000 --output-dir /tmp/bench_10k
+    python3 generate_bench_project.py --documents 1000000 --output-dir /data/bench_1m --seed 7
+
+Arguments:
+    --documents N        文档/文件总数（必需）
+    --output-dir DIR     生成目录（必需）
+    --seed N             随机种子（默认 42）
+    --broken-ratio R     断链引用比例（默认 0.02）
+    --bad-name-ratio R   不规范文件名比例（默认 0.01）
+    --body-bytes N       文档正文字节数（默认 2048）
+    --force              目标目录已存在同参数项目时仍重新生成
+    --help               显示帮助
+
+Exit Codes:
+    0 - 成功
+    1 - 参数错误
+    2 - 依赖错误（目标目录不可写等）
+
+Author: ArchPilot Core Framework
+Date: 2026-10-18
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import time
+from pathlib import Path
+
+from repo_index import LAYER_DIRECTORIES
+
+
+# ============ 配置常量 ============
+
+# 各层级文件占比
+LAYER_SHARES = {
+    "L1": 0.10,
+    "L2": 0.15,
+    "L3": 0.25,
+    "L4": 0.30,
+    "L5": 0.20
+}
+
+LAYER_PREFIXES = {
+    "L1": "FR",
+    "L2": "SA",
+    "L3": "DD",
+    "L5": "TC"
+}
+
+# 每个上游层级的追溯扇入（traces_from 引用数范围）
+TRACE_FAN_IN = (1, 2)
+
+# traces_to 最多列出的下游文档数
+MAX_TRACES_TO = 5
+
+TEST_TYPES = ["unit", "integration", "system", "performance", "acceptance"]
+
+CODE_EXTENSIONS = [".py", ".cpp", ".ts", ".js", ".h"]
+
+DESCRIPTION_WORDS = ["user", "auth", "login", "cache", "storage", "sync", "report",
+                     "session", "config", "metric", "export", "import", "queue"]
+
+# 单个模块内的最大编号（三位数字）
+MAX_SEQUENCE = 999
+
+MANIFEST_NAME = ".bench_manifest.json"
+
+
+# ============ 核心功能 ============
+
+def module_name(number: int) -> str:
+    """生成仅含小写字母的模块缩写（a, b, ..., z, ba, bb, ...）"""
+    letters = []
+    while True:
+        number, remainder = divmod(number, 26)
+        letters.append(chr(ord("a") + remainder))
+        if number == 0:
+            break
+    return "m" + "".join(reversed(letters))
+
+
+def layer_counts(documents: int) -> dict:
+    """按占比分配各层级文件数"""
+    counts = {layer: int(documents * share) for layer, share in LAYER_SHARES.items()}
+    counts["L3"] += documents - sum(counts.values())
+    return counts
+
+
+def allocate_ids(prefix: str, count: int) -> list:
+    """分配 (id, module, sequence) 列表，每个模块最多 MAX_SEQUENCE 个编号"""
+    ids = []
+    for i in range(count):
+        module = module_name(i // MAX_SEQUENCE)
+        sequence = i % MAX_SEQUENCE + 1
+        doc_id = f"{prefix}_{module}_{sequence:03d}" if prefix else f"{module}_{sequence:03d}"
+        ids.append((doc_id, module, sequence))
+    return ids
+
+
+def description(rng: random.Random) -> str:
+    return "_".join(rng.sample(DESCRIPTION_WORDS, 2))
+
+
+def front_matter(doc_id: str, layer: str, traces_from: list, traces_to: list) -> str:
+    return (
+        "---\n"
+        f"id: {doc_id}\n"
+        f"layer: {layer}\n"
+        "status: draft\n"
+        "version: v1.0.0\n"
+        f"traces_from: [{', '.join(traces_from)}]\n"
+        f"traces_to: [{', '.join(traces_to)}]\n"
+        "---\n"
+    )
+
+
+def generate_project(output_dir: str, documents: int, seed: int = 42,
+                     broken_ratio: float = 0.02, bad_name_ratio: float = 0.01,
+                     body_bytes: int = 2048) -> dict:
+    """生成合成项目，返回各层级文件数与注入问题数"""
+    rng = random.Random(seed)
+    root = Path(output_dir)
+    counts = layer_counts(documents)
+    ids = {layer: allocate_ids(LAYER_PREFIXES.get(layer, ""), counts[layer])
+           for layer in LAYER_DIRECTORIES}
+
+    # 构建追溯关系：L2←L1, L3←L2, L5←L3（部分 L5 同时直接追溯 L1）
+    upstream_of = {"L2": "L1", "L3": "L2", "L5": "L3"}
+    traces_from = {layer: [[] for _ in ids[layer]] for layer in LAYER_DIRECTORIES}
+    traces_to = {layer: [[] for _ in ids[layer]] for layer in LAYER_DIRECTORIES}
+    broken = 0
+    for layer, upper in upstream_of.items():
+        if not ids[upper]:
+            continue
+        for i in range(len(ids[layer])):
+            for _ in range(rng.randint(*TRACE_FAN_IN)):
+                j = rng.randrange(len(ids[upper]))
+                if rng.random() < broken_ratio:
+                    traces_from[layer][i].append(f"{ids[upper][j][0]}_missing")
+                    broken += 1
+                    continue
+                traces_from[layer][i].append(ids[upper][j][0])
+                if len(traces_to[upper][j]) < MAX_TRACES_TO:
+                    traces_to[upper][j].append(ids[layer][i][0])
+            if layer == "L5" and ids["L1"] and rng.random() < 0.3:
+                traces_from[layer][i].append(ids["L1"][rng.randrange(len(ids["L1"]))][0])
+
+    body = ("Synthetic benchmark content. " * (body_bytes // 29 + 1))[:body_bytes] + "\n"
+    bad_names = 0
+    for layer, directory in LAYER_DIRECTORIES.items():
+        layer_dir = root / directory
+        layer_dir.mkdir(parents=True, exist_ok=True)
+        for i, (doc_id, module, sequence) in enumerate(ids[layer]):
+            bad = rng.random() < bad_name_ratio
+            bad_names += bad
+            desc = description(rng)
+            if layer == "L4":
+                extension = rng.choice(CODE_EXTENSIONS)
+                name = f"{module}_{sequence:03d}_{desc}{extension}"
+                if bad:
+                    name = name.replace("_", "-")
+                target = layer_dir / "src" / module
+                target.mkdir(parents=True, exist_ok=True)
+                with open(target / name, 'w', encoding='utf-8') as f:
+                    f.write(f'"""\n{doc_id}\n"""\n\n\ndef run():\n    return {sequence}\n')
+                continue
+
+            if layer == "L5":
+                name = f"{doc_id}_{rng.choice(TEST_TYPES)}_{desc}.md"
+            else:
+                name = f"{doc_id}_{desc}.md"
+            if bad:
+                name = name.replace("_", "-")
+            with open(layer_dir / name, 'w', encoding='utf-8') as f:
+                f.write(front_matter(doc_id, layer, traces_from[layer][i], traces_to[layer][i]))
+                f.write(f"\n# {doc_id}\n\n")
+                f.write(body)
+
+    return {
+        "documents": documents,
+        "seed": seed,
+        "broken_ratio": broken_ratio,
+        "bad_name_ratio": bad_name_ratio,
+        "body_bytes": body_bytes,
+        "by_layer": counts,
+        "injected_broken_links": broken,
+        "injected_bad_names": bad_names
+    }
+
+
+def ensure_project(output_dir: str, documents: int, seed: int = 42,
+                   broken_ratio: float = 0.02, bad_name_ratio: float = 0.01,
+                   body_bytes: int = 2048, force: bool = False) -> dict:
+    """目标目录已有同参数项目时直接复用，否则清空并重新生成"""
+    params = {"documents": documents, "seed": seed, "broken_ratio": broken_ratio,
+              "bad_name_ratio": bad_name_ratio, "body_bytes": body_bytes}
+    manifest_path = Path(output_dir) / MANIFEST_NAME
+    if not force and manifest_path.exists():
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if all(manifest.get(key) == value for key, value in params.items()):
+            manifest["reused"] = True
+            return manifest
+
+    for directory in LAYER_DIRECTORIES.values():
+        shutil.rmtree(Path(output_dir) / directory, ignore_errors=True)
+
+    start = time.perf_counter()
+    manifest = generate_project(output_dir, **params)
+    manifest["generate_seconds"] = round(time.perf_counter() - start, 3)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    manifest["reused"] = False
+    return manifest
+
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(
+        description='生成合成 L1-L5 基准项目',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--documents', type=int, required=True,
+                        help='文档/文件总数')
+    parser.add_argument('--output-dir', required=True,
+                        help='生成目录')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='随机种子')
+    parser.add_argument('--broken-ratio', type=float, default=0.02,
+                        help='断链引用比例')
+    parser.add_argument('--bad-name-ratio', type=float, default=0.01,
+                        help='不规范文件名比例')
+    parser.add_argument('--body-bytes', type=int, default=2048,
+                        help='文档正文字节数')
+    parser.add_argument('--force', action='store_true',
+                        help='强制重新生成')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+
+    if args.documents <= 0:
+        print("Error: --documents must be positive", file=sys.stderr)
+        return 1
+
+    try:
+        manifest = ensure_project(args.output_dir, args.documents, args.seed,
+                                  args.broken_ratio, args.bad_name_ratio,
+                                  args.body_bytes, args.force)
+    except OSError as e:
+        print(f"Error: Cannot generate project: {e}", file=sys.stderr)
+        return 2
+
+    action = "Reused" if manifest["reused"] else "Generated"
+    print(f"{action} benchmark project: {os.path.abspath(args.output_dir)}")
+    for layer, count in manifest["by_layer"].items():
+        print(f"  {layer}: {count}")
+    print(f"  Broken links: {manifest['injected_broken_links']}")
+    print(f"  Bad names: {manifest['injected_bad_names']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
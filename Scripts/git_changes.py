@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Git 变更文件查询模块
+
+功能：通过本地 git 底层命令获取变更文件集合，供 check_naming、validate_trace
+的 --changed-since / --staged 模式只检查本次改动涉及的文件（pre-commit、PR 流水线）
+
+    --changed-since REF  工作区相对 REF 的改动（含已暂存、未暂存与未跟踪文件）
+    --staged             暂存区相对 HEAD 的改动（即将提交的内容）
+
+返回路径均相对于项目根目录（git diff --relative），已删除的文件同样包含在内，
+由调用方按文件是否存在区分。
+
+另提供目录内文件列表查询（git ls-files），用于只需文件名的比较（如重复编号），
+不遍历也不 stat 目录。
+
+Usage:
+    from git_changes import GitError, changed_files, listed_files
+
+    paths = changed_files(project_root, since="origin/main")
+    paths = changed_files(project_root, staged=True)
+    names = listed_files(project_root, ["L1_Requirements"], staged=True)
+
+Author: ArchPilot Core Framework
+Date: 2026-10-18
+"""
+
+import os
+import subprocess
+
+
+# ============ 异常 ============
+
+class GitError(Exception):
+    """git 不可用、不在仓库内或引用无效"""
+
+
+# ============ 核心功能 ============
+
+def run_git(project_root: str, args: list) -> bytes:
+    """在项目根目录执行 git 命令，返回标准输出"""
+    try:
+        result = subprocess.run(["git", "-C", project_root] + args,
+                                capture_output=True, check=False)
+    except OSError as e:
+        raise GitError(f"Cannot run git: {e}") from e
+    if result.returncode != 0:
+        lines = result.stderr.decode("utf-8", "replace").strip().splitlines()
+        raise GitError(lines[0] if lines else f"git {' '.join(args)} failed")
+    return result.stdout
+
+
+def split_paths(output: bytes) -> list:
+    """解析 -z 输出（NUL 分隔）"""
+    return [os.fsdecode(path) for path in output.split(b"\0") if path]
+
+
+def changed_files(project_root: str, since: str = None, staged: bool = False) -> list:
+    """变更文件相对路径列表（去重、排序）"""
+    run_git(project_root, ["rev-parse", "--is-inside-work-tree"])
+    if staged:
+        output = run_git(project_root, ["diff", "--cached", "--name-only", "-z",
+                                        "--no-renames", "--relative"])
+        return sorted(set(split_paths(output)))
+
+    ref = since or "HEAD"
+    # 校验引用，避免 "git diff <路径>" 的歧义
+    run_git(project_root, ["rev-parse", "--verify", ref + "^{commit}"])
+    paths = split_paths(run_git(project_root, ["diff", "--name-only", "-z", "--no-renames",
+                                               "--relative", ref, "--"]))
+    paths += split_paths(run_git(project_root, ["ls-files", "--others",
+                                                "--exclude-standard", "-z"]))
+    return sorted(set(paths))
+
+
+def listed_files(project_root: str, directories: list, staged: bool = False) -> list:
+    """目录内文件相对路径列表（排序）
+
+    staged 为真时为暂存区中的文件（即将提交的内容）；否则为工作区文件：
+    已跟踪且未删除的文件加未跟踪（未被忽略）的文件。
+    """
+    pathspec = ["--"] + list(directories)
+    if staged:
+        return sorted(split_paths(run_git(project_root, ["ls-files", "--cached", "-z"] +
+                                          pathspec)))
+    paths = set(split_paths(run_git(project_root, ["ls-files", "--cached", "--others",
+                                                   "--exclude-standard", "-z"] + pathspec)))
+    paths.difference_update(split_paths(run_git(project_root, ["ls-files", "--deleted",
+                                                               "-z"] + pathspec)))
+    return sorted(paths)
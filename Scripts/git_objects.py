@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Git 对象读取模块
+
+功能：通过一个常驻的 `git cat-file --batch` 进程直接从对象库读取提交、树与
+文件内容，不检出工作区。供 backfill_scores.py 按标签回溯历史版本（每个工作
+进程持有一个读取流，逐个标签遍历树对象，只展开 L1-L5 层级目录），以及
+trace_diff.py 按 Merkle 树比较两个 revision（对象 ID 相同的子树直接跳过）
+
+Usage:
+    from git_objects import ObjectReader
+
+    with ObjectReader(project_root) as reader:
+        for rel_path, mode, oid in reader.walk_tree("v1.2.0", ["L1_Requirements"]):
+            data = reader.read_blob(oid)
+        for rel_path, old_oid, new_oid in reader.diff_trees("v1.2.0", "v1.3.0"):
+            ...
+
+Author: ArchPilot Core Framework
+Date: 2026-10-18
+"""
+
+import os
+import subprocess
+from datetime import datetime
+
+from git_changes import GitError, run_git
+
+
+# ============ 配置常量 ============
+
+# 树条目模式
+MODE_TREE = b"40000"
+MODE_SYMLINK = b"120000"
+MODE_SUBMODULE = b"160000"
+
+
+# ============ 核心功能 ============
+
+class ObjectReader:
+    """常驻 git cat-file --batch 读取流"""
+
+    def __init__(self, project_root: str):
+        self.project_root = project_root
+        run_git(project_root, ["rev-parse", "--is-inside-work-tree"])
+        try:
+            self.process = subprocess.Popen(
+                ["git", "-C", project_root, "cat-file", "--batch"],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except OSError as e:
+            raise GitError(f"Cannot run git: {e}") from e
+
+    def __enter__(self) -> "ObjectReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self.process.poll() is None:
+            self.process.stdin.close()
+            self.process.wait()
+        self.process.stdout.close()
+
+    def read(self, name: str) -> tuple:
+        """读取对象，返回 (对象 ID, 类型, 内容)；name 可为任意 rev 表达式"""
+        if "\n" in name:
+            raise GitError(f"Invalid object name: {name!r}")
+        self.process.stdin.write(name.encode("utf-8") + b"\n")
+        self.process.stdin.flush()
+        header = self.process.stdout.readline()
+        if not header:
+            raise GitError("git cat-file exited unexpectedly")
+        fields = header.split()
+        if len(fields) != 3:
+            # "<name> missing" / "<name> ambiguous"
+            raise GitError(f"Object not found: {name}")
+        oid, kind, size = fields[0].decode("ascii"), fields[1].decode("ascii"), int(fields[2])
+        data = self.process.stdout.read(size)
+        self.process.stdout.read(1)  # 内容后的换行
+        return oid, kind, data
+
+    def read_blob(self, oid: str) -> bytes:
+        """读取文件内容"""
+        _, kind, data = self.read(oid)
+        if kind != "blob":
+            raise GitError(f"Object {oid} is a {kind}, not a blob")
+        return data
+
+    def read_tree(self, name: str) -> list:
+        """读取树对象，返回 [(模式, 名称, 对象 ID)]"""
+        oid, kind, data = self.read(name)
+        if kind != "tree":
+            raise GitError(f"Object {name} is a {kind}, not a tree")
+        hash_size = len(oid) // 2
+        entries = []
+        pos = 0
+        while pos < len(data):
+            space = data.index(b" ", pos)
+            nul = data.index(b"\0", space)
+            end = nul + 1 + hash_size
+            entries.append((data[pos:space], os.fsdecode(data[space + 1:nul]),
+                            data[nul + 1:end].hex()))
+            pos = end
+        return entries
+
+    def walk_tree(self, revision: str, directories=None):
+        """遍历 revision 的树，产出 (相对路径, 模式, 对象 ID)
+
+        directories 指定时只展开这些顶层目录，其余顶层条目只产出自身（不递归）；
+        符号链接与子模块跳过。
+        """
+        stack = [("", revision + "^{tree}", True)]
+        while stack:
+            prefix, tree, top = stack.pop()
+            subtrees = []
+            for mode, name, oid in self.read_tree(tree):
+                if mode in (MODE_SYMLINK, MODE_SUBMODULE):
+                    continue
+                rel_path = prefix + name
+                if mode == MODE_TREE:
+                    if top and directories is not None and name not in directories:
+                        yield rel_path, mode, oid
+                    else:
+                        subtrees.append((rel_path + "/", oid, False))
+                else:
+                    yield rel_path, mode, oid
+            stack.extend(reversed(subtrees))
+
+    def diff_trees(self, base: str, head: str, directories=None):
+        """比较两个 revision 的树，产出内容不同的文件 (相对路径, 旧对象 ID, 新对象 ID)
+
+        对象 ID 相同的子树直接跳过（Merkle 树），开销只与变更的目录与文件数相关；
+        新增/删除一侧的对象 ID 为 None。directories 指定时只比较这些顶层目录。
+        """
+        stack = [("", base + "^{tree}", head + "^{tree}")]
+        while stack:
+            prefix, old_tree, new_tree = stack.pop()
+            old = self._tree_map(old_tree)
+            new = self._tree_map(new_tree)
+            top = not prefix
+            for name in sorted(set(old) | set(new)):
+                if top and directories is not None and name not in directories:
+                    continue
+                old_mode, old_oid = old.get(name, (None, None))
+                new_mode, new_oid = new.get(name, (None, None))
+                if old_oid == new_oid and old_mode == new_mode:
+                    continue
+                rel_path = prefix + name
+                old_is_tree = old_mode == MODE_TREE
+                new_is_tree = new_mode == MODE_TREE
+                if old_is_tree and new_is_tree:
+                    stack.append((rel_path + "/", old_oid, new_oid))
+                elif not old_is_tree and not new_is_tree:
+                    yield rel_path, old_oid, new_oid
+                else:
+                    # 文件与目录互换：分别按删除与新增处理
+                    if old_is_tree:
+                        for path, _, oid in self.walk_tree(old_oid):
+                            yield rel_path + "/" + path, oid, None
+                    elif old_oid is not None:
+                        yield rel_path, old_oid, None
+                    if new_is_tree:
+                        for path, _, oid in self.walk_tree(new_oid):
+                            yield rel_path + "/" + path, None, oid
+                    elif new_oid is not None:
+                        yield rel_path, None, new_oid
+
+    def _tree_map(self, tree: str) -> dict:
+        """树对象条目：名称 -> (模式, 对象 ID)，跳过符号链接与子模块"""
+        return {name: (mode, oid) for mode, name, oid in self.read_tree(tree)
+                if mode not in (MODE_SYMLINK, MODE_SUBMODULE)}
+
+
+def list_tags(project_root: str, patterns=None) -> list:
+    """按创建时间列出标签，返回 [{tag, date}]（date 为 UTC ISO 8601，与检查输出的时间戳格式一致）"""
+    refs = ["refs/tags/" + pattern for pattern in patterns] if patterns else ["refs/tags"]
+    output = run_git(project_root, ["for-each-ref", "--sort=creatordate",
+                                    "--format=%(refname:short)%00%(creatordate:unix)"] + refs)
+    tags = []
+    for line in output.decode("utf-8", "replace").splitlines():
+        name, _, seconds = line.partition("\0")
+        if name:
+            date = datetime.utcfromtimestamp(int(seconds or 0)).isoformat() + "Z"
+            tags.append({"tag": name, "date": date})
+    return tags
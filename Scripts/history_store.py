@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+运行历史存储模块
+
+功能：将每次检查运行的结果追加到本地 SQLite 数据库（标准库 sqlite3），
+包括质量评分（总分、各维度得分与扣分项）、追溯验证统计与命名检查结果，
+按项目 + 版本、项目 + 时间戳建立索引，趋势与回退查询只走索引，
+不随历史规模线性扫描 JSON 文件
+
+表结构：
+    runs             每次运行一行（项目、版本、时间戳、状态、总分、评级）
+    dimension_scores 各维度得分
+    deductions       各维度扣分项
+    trace_stats      追溯验证统计
+    naming_results   各层级命名检查结果
+
+Usage:
+    from history_store import HistoryStore
+
+    with HistoryStore("./out/history.sqlite") as store:
+        store.record_run(score_output, trace_output, naming_output)
+        points = store.trend("/abs/project", "total_score", limit=50)
+
+Author: ArchPilot Core Framework
+Date: 2026-10-18
+"""
+
+import sqlite3
+from pathlib import Path
+
+
+# ============ 配置常量 ============
+
+SCHEMA_VERSION = 1
+
+DEFAULT_HISTORY_PATH = "./out/history.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    project_root TEXT NOT NULL,
+    version TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    status TEXT,
+    total_score REAL,
+    grade TEXT,
+    trace_status TEXT,
+    naming_status TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_project_version ON runs (project_root, version, timestamp);
+CREATE INDEX IF NOT EXISTS idx_runs_project_timestamp ON runs (project_root, timestamp);
+
+CREATE TABLE IF NOT EXISTS dimension_scores (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    dimension TEXT NOT NULL,
+    score REAL,
+    weighted_score REAL,
+    PRIMARY KEY (run_id, dimension)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS deductions (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    dimension TEXT NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_deductions_run ON deductions (run_id);
+
+CREATE TABLE IF NOT EXISTS trace_stats (
+    run_id INTEGER PRIMARY KEY REFERENCES runs (id) ON DELETE CASCADE,
+    total_documents INTEGER,
+    complete_traces INTEGER,
+    broken_traces INTEGER,
+    missing_upstream INTEGER,
+    missing_downstream INTEGER,
+    completeness REAL,
+    total_issues INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS naming_results (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    layer TEXT NOT NULL,
+    status TEXT,
+    files_checked INTEGER,
+    errors INTEGER,
+    warnings INTEGER,
+    PRIMARY KEY (run_id, layer)
+) WITHOUT ROWID;
+"""
+
+# 趋势查询支持的指标：名称 -> (SQL 表达式, 关联表, 数值越大越好)
+METRICS = {
+    "total_score": ("r.total_score", "", True),
+    "completeness": ("t.completeness", "JOIN trace_stats t ON t.run_id = r.id", True),
+    "broken_traces": ("t.broken_traces", "JOIN trace_stats t ON t.run_id = r.id", False),
+    "missing_upstream": ("t.missing_upstream", "JOIN trace_stats t ON t.run_id = r.id", False),
+    "naming_errors": ("(SELECT SUM(n.errors) FROM naming_results n WHERE n.run_id = r.id)",
+                      "", False)
+}
+for _dimension in ("D1", "D2", "D3", "D4", "D5"):
+    METRICS[_dimension] = ("d.score",
+                           f"JOIN dimension_scores d ON d.run_id = r.id AND d.dimension = '{_dimension}'",
+                           True)
+
+
+# ============ 存储实现 ============
+
+class HistoryStore:
+    """SQLite 运行历史"""
+
+    def __init__(self, db_path: str = DEFAULT_HISTORY_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self._ensure_schema()
+
+    def __enter__(self) -> "HistoryStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _ensure_schema(self) -> None:
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            raise sqlite3.DatabaseError(
+                f"History schema version {version} is newer than supported {SCHEMA_VERSION}")
+        self.conn.executescript(SCHEMA)
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    # ---------- 写入 ----------
+
+    def record_run(self, score: dict = None, trace: dict = None, naming: dict = None,
+                   project_root: str = None, version: str = None,
+                   timestamp: str = None) -> int:
+        """追加一次运行（参数为各脚本 JSON 输出），返回运行 ID
+
+        project_root / version / timestamp 未指定时取自结果本身（check_naming 输出
+        不含前两项）；回溯历史版本时以标签创建时间作为 timestamp
+        """
+        primary = score or trace or naming
+        if primary is None:
+            raise ValueError("No results to record")
+
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO runs (project_root, version, timestamp, status, total_score, grade,"
+                " trace_status, naming_status) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (project_root or primary.get("project_root") or "",
+                 version or (score or {}).get("version") or primary.get("version") or "",
+                 timestamp or primary.get("timestamp") or "",
+                 (score or {}).get("status"),
+                 (score or {}).get("total_score"),
+                 ((score or {}).get("grade") or {}).get("english"),
+                 (trace or {}).get("status"),
+                 (naming or {}).get("status")))
+            run_id = cursor.lastrowid
+
+            if score:
+                dimensions = score.get("dimensions", {})
+                self.conn.executemany(
+                    "INSERT INTO dimension_scores VALUES (?, ?, ?, ?)",
+                    [(run_id, name, d.get("score"), d.get("weighted_score"))
+                     for name, d in dimensions.items()])
+                self.conn.executemany(
+                    "INSERT INTO deductions VALUES (?, ?, ?)",
+                    [(run_id, name, message) for name, d in dimensions.items()
+                     for message in d.get("deductions", [])])
+
+            if trace:
+                stats = trace.get("statistics", {})
+                self.conn.execute(
+                    "INSERT INTO trace_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (run_id, stats.get("total_documents"), stats.get("complete_traces"),
+                     stats.get("broken_traces"), stats.get("missing_upstream"),
+                     stats.get("missing_downstream"), trace.get("completeness_percentage"),
+                     trace.get("summary", {}).get("total_issues")))
+
+            if naming:
+                self.conn.executemany(
+                    "INSERT INTO naming_results VALUES (?, ?, ?, ?, ?, ?)",
+                    [(run_id, r.get("layer"), r.get("status"), r.get("files_checked"),
+                      len(r.get("errors", [])), len(r.get("warnings", [])))
+                     for r in naming.get("results", []) if r.get("layer")])
+        return run_id
+
+    # ---------- 查询 ----------
+
+    def projects(self) -> list:
+        return [row[0] for row in self.conn.execute(
+            "SELECT DISTINCT project_root FROM runs ORDER BY project_root")]
+
+    def find_run(self, project_root: str, version: str = None, offset: int = 0) -> dict:
+        """指定版本的最新一次运行；未指定版本时按时间倒序取第 offset 次运行"""
+        if version is not None:
+            row = self.conn.execute(
+                "SELECT * FROM runs WHERE project_root = ? AND version = ?"
+                " ORDER BY timestamp DESC, id DESC LIMIT 1", (project_root, version)).fetchone()
+        else:
+            row = self.conn.execute(
+                "SELECT * FROM runs WHERE project_root = ?"
+                " ORDER BY timestamp DESC, id DESC LIMIT 1 OFFSET ?",
+                (project_root, offset)).fetchone()
+        return dict(row) if row else None
+
+    def previous_run(self, run: dict) -> dict:
+        """同一项目中早于指定运行的最近一次运行"""
+        row = self.conn.execute(
+            "SELECT * FROM runs WHERE project_root = ? AND (timestamp < ?"
+            " OR (timestamp = ? AND id < ?)) ORDER BY timestamp DESC, id DESC LIMIT 1",
+            (run["project_root"], run["timestamp"], run["timestamp"], run["id"])).fetchone()
+        return dict(row) if row else None
+
+    def run_snapshot(self, run_id: int) -> dict:
+        """单次运行的全部指标"""
+        run = dict(self.conn.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone())
+        run["dimensions"] = {row["dimension"]: row["score"] for row in self.conn.execute(
+            "SELECT dimension, score FROM dimension_scores WHERE run_id = ?", (run_id,))}
+        run["deductions"] = [dict(row) for row in self.conn.execute(
+            "SELECT dimension, message FROM deductions WHERE run_id = ?", (run_id,))]
+        trace = self.conn.execute("SELECT * FROM trace_stats WHERE run_id = ?",
+                                  (run_id,)).fetchone()
+        run["trace"] = {key: trace[key] for key in trace.keys() if key != "run_id"} if trace else None
+        naming = self.conn.execute(
+            "SELECT SUM(errors) AS errors, SUM(warnings) AS warnings, COUNT(*) AS layers"
+            " FROM naming_results WHERE run_id = ?", (run_id,)).fetchone()
+        run["naming"] = dict(naming) if naming["layers"] else None
+        return run
+
+    def trend(self, project_root: str, metric: str = "total_score", limit: int = 50,
+              since: str = None) -> list:
+        """指标随时间变化（按时间正序），只读取最近 limit 次运行"""
+        expression, join, _ = METRICS[metric]
+        where = "r.project_root = ?"
+        params = [project_root]
+        if since:
+            where += " AND r.timestamp >= ?"
+            params.append(since)
+        params.append(limit)
+        rows = self.conn.execute(
+            f"SELECT r.id, r.version, r.timestamp, {expression} AS value FROM runs r {join}"
+            f" WHERE {where} ORDER BY r.timestamp DESC, r.id DESC LIMIT ?", params).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+    def regressions(self, base_run: int, head_run: int, threshold: float = 0.0) -> list:
+        """对比两次运行，返回变差幅度超过 threshold 的指标"""
+        base = self.run_snapshot(base_run)
+        head = self.run_snapshot(head_run)
+        pairs = [("total_score", base["total_score"], head["total_score"], True)]
+        for dimension in sorted(set(base["dimensions"]) & set(head["dimensions"])):
+            pairs.append((dimension, base["dimensions"][dimension],
+                          head["dimensions"][dimension], True))
+        if base["trace"] and head["trace"]:
+            pairs.append(("completeness", base["trace"]["completeness"],
+                          head["trace"]["completeness"], True))
+            pairs.append(("broken_traces", base["trace"]["broken_traces"],
+                          head["trace"]["broken_traces"], False))
+        if base["naming"] and head["naming"]:
+            pairs.append(("naming_errors", base["naming"]["errors"],
+                          head["naming"]["errors"], False))
+
+        result = []
+        for metric, before, after, higher_is_better in pairs:
+            if before is None or after is None:
+                continue
+            change = after - before
+            worse = -change if higher_is_better else change
+            if worse > threshold:
+                result.append({
+                    "metric": metric,
+                    "base": before,
+                    "head": after,
+                    "change": round(change, 4)
+                })
+        return result
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+文档 ID 相近匹配模块
+
+功能：为断链引用（traces_from 指向不存在的 ID）给出"您是否要找"的候选 ID。
+索引在首次查询时由全部文档 ID 构建一次（惰性，无断链时零开销），单次查询
+只访问少量候选，不做全量两两编辑距离比较
+
+匹配方式（ID 先规范化：小写，非字母数字字符统一为 "_"）：
+    1. 规范化后完全一致（大小写、分隔符差异）
+    2. 编辑距离为 1 的全部变体（删除 / 替换 / 插入一个字符）直接查表，结果精确
+    3. 三元组倒排索引：按稀有度选取查询的三元组，合并倒排表计数取重合最多的
+       候选，覆盖前后缀增删、多处修改等距离更大的情况（近似）
+    候选按 (编辑距离, 三元组相似度, ID) 排序，相似度过低的不作为建议
+
+Usage:
+    from id_suggest import IdSuggester
+
+    suggester = IdSuggester(all_documents)
+    suggester.suggest("FR-core-01")   # -> ["FR_core_001", ...]
+
+Author: ArchPilot Core Framework
+Date: 2026-10-18
+"""
+
+import re
+from collections import Counter
+from itertools import chain
+
+
+# ============ 配置常量 ============
+
+# 每个断链引用最多给出的建议数
+MAX_SUGGESTIONS = 3
+
+# 三元组相似度（Dice 系数）下限；编辑距离 <= 1 的候选不受此限制
+MIN_SIMILARITY = 0.4
+
+# 三元组计数后进入编辑距离排序的候选数（建议数的倍数）
+CANDIDATE_FACTOR = 8
+
+# 按相似度取前若干个候选计算编辑距离（建议数的倍数）
+RERANK_FACTOR = 2
+
+# 倒排表长度上限（ID 总数的比例，且不低于下限）：超过的常见三元组（如公共前缀）
+# 不参与计数；可用三元组不足 MIN_GRAMS 个时仍取最稀有的几个
+POSTING_CAP_RATIO = 0.02
+MIN_POSTING_CAP = 1000
+MIN_GRAMS = 3
+
+NORMALIZE_PATTERN = re.compile(r"[^0-9a-z]+")
+
+
+# ============ 核心功能 ============
+
+def normalize_id(doc_id: str) -> str:
+    """规范化 ID：小写，非字母数字字符统一为单个 "_" """
+    return NORMALIZE_PATTERN.sub("_", doc_id.lower())
+
+
+def trigrams(key: str) -> set:
+    """两端补位后的三元组集合"""
+    padded = "\0\0" + key + "\0\0"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, bound: int = None) -> int:
+    """Levenshtein 编辑距离；指定 bound 时超过即提前返回 bound + 1"""
+    if len(a) < len(b):
+        a, b = b, a
+    if bound is not None and len(a) - len(b) > bound:
+        return bound + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (char_a != char_b)))
+        if bound is not None and min(current) > bound:
+            return bound + 1
+        previous = current
+    return previous[-1]
+
+
+class IdSuggester:
+    """断链引用的相近 ID 查询（三元组倒排索引 + 编辑距离 1 精确查表）
+
+    source 为 ID 可迭代对象（如 {id: 文档} 字典）；索引在首次 suggest 时构建，
+    之后可用 add / discard 增量维护（监听模式）。
+    """
+
+    def __init__(self, source):
+        self._source = source
+        self._built = False
+        self._keys = []        # 槽位 -> 规范化 ID（移除后为 None）
+        self._slots = {}       # 规范化 ID -> 槽位
+        self._originals = {}   # 规范化 ID -> 原始 ID 列表
+        self._postings = {}    # 三元组 -> 槽位列表（移除的槽位惰性过滤）
+        self._alphabet = set()
+        self._memo = {}        # 引用 -> 建议（同一缺失 ID 常被多个文档引用）
+
+    def _ensure(self) -> None:
+        if not self._built:
+            self._built = True
+            for doc_id in self._source:
+                self._add(doc_id)
+
+    def _add(self, doc_id: str) -> None:
+        key = normalize_id(doc_id)
+        originals = self._originals.get(key)
+        if originals is not None:
+            if doc_id not in originals:
+                originals.append(doc_id)
+            return
+        slot = len(self._keys)
+        self._keys.append(key)
+        self._slots[key] = slot
+        self._originals[key] = [doc_id]
+        self._alphabet.update(key)
+        for gram in trigrams(key):
+            self._postings.setdefault(gram, []).append(slot)
+
+    def add(self, doc_id: str) -> None:
+        """新增 ID（索引尚未构建时忽略，构建时会从 source 读取）"""
+        if self._built:
+            self._add(doc_id)
+            self._memo.clear()
+
+    def discard(self, doc_id: str) -> None:
+        """移除 ID（倒排表中的槽位在查询时过滤）"""
+        if not self._built:
+            return
+        key = normalize_id(doc_id)
+        originals = self._originals.get(key)
+        if originals is None or doc_id not in originals:
+            return
+        originals.remove(doc_id)
+        self._memo.clear()
+        if not originals:
+            del self._originals[key]
+            self._keys[self._slots.pop(key)] = None
+
+    def _neighbors(self, key: str) -> set:
+        """编辑距离为 1 且存在于索引中的规范化 ID"""
+        alphabet = self._alphabet
+        variants = [key[:i] + key[i + 1:] for i in range(len(key))]
+        variants += [key[:i] + char + key[i + 1:] for i in range(len(key)) for char in alphabet]
+        variants += [key[:i] + char + key[i:] for i in range(len(key) + 1) for char in alphabet]
+        found = set(filter(self._slots.__contains__, variants))
+        found.discard(key)
+        return found
+
+    def _trigram_candidates(self, grams: set, limit: int) -> list:
+        """合并较稀有三元组的倒排表计数，返回重合最多的规范化 ID"""
+        postings = sorted((self._postings[gram] for gram in grams if gram in self._postings),
+                          key=len)
+        cap = max(MIN_POSTING_CAP, int(len(self._slots) * POSTING_CAP_RATIO))
+        selected = [posting for posting in postings if len(posting) <= cap]
+        if len(selected) < MIN_GRAMS:
+            selected = postings[:MIN_GRAMS]
+        counts = Counter(chain.from_iterable(selected))
+        candidates = []
+        for slot, _ in counts.most_common(limit * CANDIDATE_FACTOR):
+            key = self._keys[slot]
+            if key is not None:
+                candidates.append(key)
+        return candidates
+
+    def suggest(self, ref: str, limit: int = MAX_SUGGESTIONS) -> list:
+        """返回与 ref 最相近的至多 limit 个现有 ID"""
+        self._ensure()
+        memo_key = (ref, limit)
+        if memo_key in self._memo:
+            return list(self._memo[memo_key])
+        key = normalize_id(ref)
+        grams = trigrams(key)
+
+        def similarity(candidate: str) -> float:
+            other = trigrams(candidate)
+            return 2 * len(grams & other) / (len(grams) + len(other))
+
+        # 距离 0/1 的候选精确且最优，足够时不再查三元组索引
+        nearest = self._neighbors(key)
+        ranked = [(1, -similarity(candidate), candidate) for candidate in nearest]
+        if key in self._slots:
+            ranked.append((0, -1.0, key))
+        ranked.sort()
+
+        if len(ranked) < limit:
+            scored = []
+            for candidate in self._trigram_candidates(grams, limit):
+                if candidate != key and candidate not in nearest:
+                    score = similarity(candidate)
+                    if score >= MIN_SIMILARITY:
+                        scored.append((-score, candidate))
+            scored.sort()
+            for negative_score, candidate in scored[:limit * RERANK_FACTOR]:
+                # 已有 limit 个候选时只需判断能否进入前 limit 名
+                bound = ranked[limit - 1][0] if len(ranked) >= limit else None
+                distance = edit_distance(key, candidate, bound)
+                if bound is None or distance <= bound:
+                    ranked.append((distance, negative_score, candidate))
+                    ranked.sort()
+
+        suggestions = []
+        for _, _, candidate in ranked:
+            for doc_id in sorted(self._originals[candidate]):
+                if doc_id != ref and len(suggestions) < limit:
+                    suggestions.append(doc_id)
+        self._memo[memo_key] = suggestions
+        return list(suggestions)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+追溯元数据持久缓存模块
+
+功能：将文档的追溯元数据（id / traces_from / traces_to）按
+"相对路径 + 修改时间 + 文件大小" 缓存到磁盘，增量运行时仅重新解析
+新增或变更的文档，并清理已删除文档的缓存记录；缓存版本或 front matter
+解析后端（是否安装 libyaml）不一致时整体失效
+
+缓存文件格式（JSON）：
+    {
+      "cache_version": 2,
+      "parser": "libyaml",
+      "project_root": "/abs/path/to/project",
+      "entries": {
+        "L1_Requirements/FR_core_001_xxx.md": {
+          "mtime": 1767225600.0,
+          "size": 1024,
+          "metadata": {"id": "...", "traces_from": [], "traces_to": []}
+        }
+      }
+    }
+
+Usage:
+    from metadata_cache import MetadataCache
+
+    cache = MetadataCache("./out/trace_metadata_cache.json", project_root).load()
+    metadata = cache.get_metadata(entry)
+    cache.prune()
+    cache.save()
+
+Author: ArchPilot Core Framework
+Date: 2026-10-18
+"""
+
+import json
+import os
+from pathlib import Path
+
+from front_matter import PARSER_BACKEND
+
+
+# ============ 配置常量 ============
+
+# 2：front matter 解析支持块列表、引号与注释
+CACHE_VERSION = 2
+
+DEFAULT_CACHE_PATH = "./out/trace_metadata_cache.json"
+
+# 缓存的追溯字段
+TRACE_FIELDS = ("id", "traces_from", "traces_to")
+
+
+# ============ 缓存实现 ============
+
+class MetadataCache:
+    """基于 mtime + size 的追溯元数据缓存"""
+
+    def __init__(self, cache_path: str, project_root: str):
+        self.cache_path = Path(cache_path)
+        self.project_root = os.path.abspath(project_root)
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._seen = set()
+        self._dirty = False
+
+    def load(self) -> "MetadataCache":
+        """读取缓存文件；格式不兼容或项目不一致时丢弃"""
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self
+
+        if (data.get("cache_version") == CACHE_VERSION and
+                data.get("parser") == PARSER_BACKEND and
+                data.get("project_root") == self.project_root):
+            self.entries = data.get("entries", {})
+        return self
+
+    def is_fresh(self, entry) -> bool:
+        """缓存记录是否与文件当前 mtime/size 一致"""
+        cached = self.entries.get(entry.rel_path)
+        return bool(cached) and cached["mtime"] == entry.mtime and cached["size"] == entry.size
+
+    def get_metadata(self, entry) -> dict:
+        """获取索引条目的追溯元数据，命中缓存则跳过文件读取"""
+        self._seen.add(entry.rel_path)
+        if self.is_fresh(entry):
+            self.hits += 1
+            return self.entries[entry.rel_path]["metadata"]
+
+        self.misses += 1
+        # 只保留追溯字段，完整 front matter 不留在索引条目上
+        front_matter = entry.release_front_matter()
+        metadata = {key: front_matter[key] for key in TRACE_FIELDS if key in front_matter}
+        self.entries[entry.rel_path] = {
+            "mtime": entry.mtime,
+            "size": entry.size,
+            "metadata": metadata
+        }
+        self._dirty = True
+        return metadata
+
+    def cached_items(self):
+        """遍历缓存记录 (相对路径, 元数据)，不检查文件状态
+
+        仅用于调用方已确认文件未变更的场景（如 git 变更范围模式）。
+        """
+        for rel_path, cached in self.entries.items():
+            self._seen.add(rel_path)
+            yield rel_path, cached["metadata"]
+
+    def discard(self, rel_path: str) -> dict:
+        """移除一条缓存记录，返回其元数据（无记录时返回 None）"""
+        cached = self.entries.pop(rel_path, None)
+        if cached is None:
+            return None
+        self._dirty = True
+        return cached["metadata"]
+
+    def prune(self) -> int:
+        """清理本次运行未访问到的（已删除）文档记录"""
+        stale = [path for path in self.entries if path not in self._seen]
+        for path in stale:
+            del self.entries[path]
+        if stale:
+            self._dirty = True
+        return len(stale)
+
+    def save(self) -> None:
+        """有变更时原子写回缓存文件"""
+        if not self._dirty:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        # json.dumps 走 C 编码器；json.dump 写文件时逐块走纯 Python 编码，大缓存慢数倍
+        data = json.dumps({
+            "cache_version": CACHE_VERSION,
+            "parser": PARSER_BACKEND,
+            "project_root": self.project_root,
+            "entries": self.entries
+        }, ensure_ascii=False, separators=(",", ":"))
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self.cache_path)
+        self._dirty = False
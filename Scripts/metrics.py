@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+运行指标采集模块
+
+功能：为检查脚本的 --profile 选项提供轻量级插桩：在现有函数边界记录
+耗时与计数（遍历文件数、读取字节数、解析耗时、缓存命中等），并可选地用
+cProfile 导出 pstats 文件。未启用时插桩点仅为一次布尔判断
+
+Usage:
+    import metrics
+
+    metrics.enable()
+
+    @metrics.timed("collect_layer_documents")
+    def collect_layer_documents(...):
+        metrics.count("documents", len(documents))
+
+    output["metrics"] = metrics.snapshot()
+
+Author: ArchPilot Core Framework
+Date: 2026-10-18
+"""
+
+import cProfile
+import functools
+import sys
+import time
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows 无 resource 模块
+    resource = None
+
+
+# ============ 指标存储 ============
+
+_state = {"enabled": False}
+_counters = {}
+_timers = {}
+
+
+def enable() -> None:
+    """启用采集并清空已有指标"""
+    _state["enabled"] = True
+    _counters.clear()
+    _timers.clear()
+
+
+def disable() -> None:
+    """停止采集"""
+    _state["enabled"] = False
+
+
+def is_enabled() -> bool:
+    return _state["enabled"]
+
+
+def count(name: str, value: int = 1) -> None:
+    """累加计数器"""
+    if _state["enabled"]:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def add_time(name: str, seconds: float) -> None:
+    """累加耗时（秒）"""
+    if _state["enabled"]:
+        timer = _timers.setdefault(name, [0.0, 0])
+        timer[0] += seconds
+        timer[1] += 1
+
+
+def timed(name: str):
+    """函数耗时插桩装饰器"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state["enabled"]:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                add_time(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def peak_memory_kb() -> int:
+    """进程峰值 RSS（KB），平台不支持时返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 单位为字节，Linux 为 KB
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def snapshot() -> dict:
+    """导出当前指标，写入脚本 JSON 输出的 metrics 块"""
+    return {
+        "counters": dict(sorted(_counters.items())),
+        "timings_ms": {
+            name: {"total": round(total * 1000, 3), "calls": calls}
+            for name, (total, calls) in sorted(_timers.items())
+        },
+        "peak_memory_kb": peak_memory_kb()
+    }
+
+
+# ============ cProfile ============
+
+def start_profiler(path: str):
+    """path 非空时启动 cProfile，返回 profiler"""
+    if not path:
+        return None
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def stop_profiler(profiler, path: str) -> None:
+    """停止 cProfile 并导出 pstats 文件"""
+    if profiler is None:
+        return
+    profiler.disable()
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(path)
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+命名规则模块
+
+功能：从项目配置文件加载 rules_naming.md 对应的命名规则（未提供时使用内置
+默认规则），每个层级的全部规则编译为一个带命名分组的组合正则：文件名只匹配
+一次，即可确定命中的规则并提取模块、编号、测试类型等字段，供 check_naming.py
+做命名检查与层级内编号重复检测
+
+配置文件（JSON，默认依次查找项目根目录下的
+archpilot/Governance/rules/naming_rules.json、Governance/rules/naming_rules.json）：
+    {
+      "version": 1,
+      "ignore": ["README.md", "INDEX.md", ".gitkeep"],
+      "checked_extensions": [".md", ".py", ...],
+      "max_filename_length": 80,
+      "layers": {
+        "L1": {
+          "description": "需求文档",
+          "rules": [
+            {"name": "requirement",
+             "pattern": "FR_(?P<module>[a-z]+)_(?P<sequence>\\d{3})_(?P<description>[a-z_]+)\\.md",
+             "unique": ["module", "sequence"]}
+          ]
+        }
+      }
+    }
+
+    pattern   对完整文件名做全匹配，命名分组即提取的字段
+    unique    层级内不得重复的字段组合（省略时不检测重复）
+    不在 checked_extensions 中的文件不检查；文件名超过 max_filename_length 记为警告
+
+编译结果按配置文件路径 + 修改时间 + 大小缓存在进程内，同一进程（check-all、
+batch 工作进程、监听模式、查询服务）重复检查时不重新加载与编译
+
+Usage:
+    from naming_rules import load_rules
+
+    rules = load_rules(project_root)
+    match = rules.classify("L5", "TC_core_001_unit_login.md")
+    match.rule.name, match.fields   # -> "testcase", {"module": "core", "sequence": "001", ...}
+    match.key                       # -> (("module", "sequence"), ("core", "001"))
+
+Author: ArchPilot Core Framework
+Date: 2026-10-18
+"""
+
+import json
+import os
+import re
+
+from repo_index import LAYER_ORDER
+
+
+# ============ 配置常量 ============
+
+RULES_SEARCH_PATHS = (
+    "archpilot/Governance/rules/naming_rules.json",
+    "Governance/rules/naming_rules.json"
+)
+
+RULES_VERSION = 1
+
+# 内置默认规则（与 Governance/rules/naming_rules.json 一致）
+DEFAULT_RULES = {
+    "version": RULES_VERSION,
+    "ignore": ["README.md", "INDEX.md", ".gitkeep"],
+    "checked_extensions": [".md", ".cpp", ".h", ".py", ".js", ".ts"],
+    "max_filename_length": 80,
+    "layers": {
+        "L1": {
+            "description": "需求文档",
+            "rules": [{
+                "name": "requirement",
+                "pattern": r"FR_(?P<module>[a-z]+)_(?P<sequence>\d{3})_(?P<description>[a-z_]+)\.md",
+                "unique": ["module", "sequence"]
+            }]
+        },
+        "L2": {
+            "description": "架构文档",
+            "rules": [{
+                "name": "architecture",
+                "pattern": r"SA_(?P<module>[a-z]+)_(?P<sequence>\d{3})_(?P<description>[a-z_]+)\.md",
+                "unique": ["module", "sequence"]
+            }]
+        },
+        "L3": {
+            "description": "设计文档",
+            "rules": [{
+                "name": "design",
+                "pattern": r"DD_(?P<module>[a-z]+)_(?P<sequence>\d{3})_(?P<description>[a-z_]+)\.md",
+                "unique": ["module", "sequence"]
+            }, {
+                "name": "interaction_design",
+                "pattern": (r"DD_(?P<module>[a-z]+_[a-z]+)_(?P<sequence>\d{3})"
+                            r"_(?P<description>[a-z_]+)\.md"),
+                "unique": ["module", "sequence"]
+            }]
+        },
+        "L4": {
+            "description": "实现代码",
+            "rules": [{
+                "name": "implementation",
+                "pattern": (r"(?P<module>[a-z]+)_(?P<sequence>\d{3})_(?P<description>[a-z_]+)"
+                            r"\.(?P<language>cpp|h|py|js|ts)")
+            }]
+        },
+        "L5": {
+            "description": "测试用例",
+            "rules": [{
+                "name": "testcase",
+                "pattern": (r"TC_(?P<module>[a-z]+)_(?P<sequence>\d{3})"
+                            r"_(?P<type>unit|integration|system|performance|acceptance)"
+                            r"_(?P<description>[a-z_]+)\.md"),
+                "unique": ["module", "sequence"]
+            }]
+        }
+    }
+}
+
+# 规则中的命名分组与反向引用（编译组合正则时加规则前缀避免重名）
+GROUP_PATTERN = re.compile(r"\(\?P<([A-Za-z_]\w*)>")
+BACKREF_PATTERN = re.compile(r"\(\?P=([A-Za-z_]\w*)\)")
+
+
+# ============ 核心功能 ============
+
+class RuleConfigError(ValueError):
+    """命名规则配置无效"""
+
+
+class NamingRule:
+    """单条命名规则"""
+
+    __slots__ = ("name", "layer", "pattern", "unique", "group", "fields",
+                 "field_groups", "unique_groups")
+
+    def __init__(self, name: str, layer: str, pattern: str, unique, group: str):
+        self.name = name
+        self.layer = layer
+        self.pattern = pattern
+        self.unique = tuple(unique or ())
+        self.group = group
+        self.fields = tuple(GROUP_PATTERN.findall(pattern))
+        # 字段在组合正则中的分组编号（合并规则时填入）
+        self.field_groups = ()
+        self.unique_groups = ()
+
+
+def _groups(match, numbers: tuple) -> tuple:
+    """按分组编号一次取出多个分组的值"""
+    if len(numbers) == 1:
+        return (match.group(numbers[0]),)
+    return match.group(*numbers) if numbers else ()
+
+
+class RuleMatch:
+    """文件名匹配结果：命中的规则与提取的字段（字段按需取出）"""
+
+    __slots__ = ("rule", "_match")
+
+    def __init__(self, rule: NamingRule, match):
+        self.rule = rule
+        self._match = match
+
+    @property
+    def fields(self) -> dict:
+        return dict(zip(self.rule.fields, _groups(self._match, self.rule.field_groups)))
+
+    @property
+    def key(self) -> tuple:
+        """层级内重复检测键 (字段名元组, 值元组)，规则未定义 unique 时为 None"""
+        if not self.rule.unique:
+            return None
+        return self.rule.unique, _groups(self._match, self.rule.unique_groups)
+
+
+class RuleSet:
+    """编译后的命名规则集"""
+
+    def __init__(self, config: dict, source: str = "built-in"):
+        self.source = source
+        if not isinstance(config, dict) or config.get("version", RULES_VERSION) != RULES_VERSION:
+            raise RuleConfigError(f"Unsupported naming rules version in {source}")
+        self.ignore = frozenset(config.get("ignore", ()))
+        self.extensions = frozenset(ext.lower() for ext in config.get("checked_extensions", ()))
+        self.max_length = config.get("max_filename_length")
+        self.descriptions = {}
+        self.rules = {}
+        self._patterns = {}
+        self._by_group = {}
+
+        layers = config.get("layers")
+        if not isinstance(layers, dict):
+            raise RuleConfigError(f"'layers' must be an object in {source}")
+        for layer, layer_config in layers.items():
+            if layer not in LAYER_ORDER:
+                raise RuleConfigError(f"Unknown layer {layer!r} in {source}")
+            if not isinstance(layer_config, dict):
+                raise RuleConfigError(f"Layer {layer} must be an object in {source}")
+            self.descriptions[layer] = layer_config.get("description", "")
+            self.rules[layer] = [self._compile_rule(layer, i, rule)
+                                 for i, rule in enumerate(layer_config.get("rules", []))]
+            self._by_group.update((rule.group, rule) for rule in self.rules[layer])
+            try:
+                self._patterns[layer] = self._combine(self.rules[layer])
+            except re.error as e:
+                raise RuleConfigError(f"Cannot combine {layer} rules in {source}: {e}") from e
+
+    def _compile_rule(self, layer: str, position: int, rule: dict) -> NamingRule:
+        if not isinstance(rule, dict):
+            raise RuleConfigError(f"Rule {position} of {layer} must be an object in {self.source}")
+        name = rule.get("name") or f"{layer}_{position}"
+        pattern = rule.get("pattern")
+        if not isinstance(pattern, str):
+            raise RuleConfigError(f"Rule {name!r} ({layer}) has no pattern in {self.source}")
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise RuleConfigError(f"Invalid pattern for rule {name!r} ({layer}): {e}") from e
+        naming_rule = NamingRule(name, layer, pattern, rule.get("unique"),
+                                 f"{layer}_{position}")
+        missing = [field for field in naming_rule.unique if field not in naming_rule.fields]
+        if missing:
+            raise RuleConfigError(f"Rule {name!r} ({layer}) has no group for unique "
+                                  f"fields {missing}")
+        return naming_rule
+
+    @staticmethod
+    def _combine(rules: list):
+        """层级内全部规则合并为一个带规则分组的正则"""
+        if not rules:
+            return None
+        alternatives = []
+        for rule in rules:
+            prefix = rule.group + "__"
+            body = GROUP_PATTERN.sub(lambda m: f"(?P<{prefix}{m.group(1)}>", rule.pattern)
+            body = BACKREF_PATTERN.sub(lambda m: f"(?P={prefix}{m.group(1)})", body)
+            alternatives.append(f"(?P<{rule.group}>{body})")
+        pattern = re.compile("|".join(alternatives))
+        for rule in rules:
+            prefix = rule.group + "__"
+            rule.field_groups = tuple(pattern.groupindex[prefix + f] for f in rule.fields)
+            rule.unique_groups = tuple(pattern.groupindex[prefix + f] for f in rule.unique)
+        return pattern
+
+    def layers(self) -> list:
+        return [layer for layer in LAYER_ORDER if layer in self.rules]
+
+    def expected_pattern(self, layer: str) -> str:
+        """层级规则的原始正则（多条规则以 | 连接）"""
+        return "|".join(rule.pattern for rule in self.rules.get(layer, ()))
+
+    def is_checked(self, entry) -> bool:
+        """文件是否参与命名检查（隐藏文件、忽略列表与未配置的扩展名跳过）"""
+        return (not entry.name.startswith(".") and entry.name not in self.ignore and
+                entry.extension in self.extensions)
+
+    def classify(self, layer: str, filename: str) -> RuleMatch:
+        """单次匹配确定命中的规则并提取字段，不符合任何规则时返回 None"""
+        pattern = self._patterns.get(layer)
+        if pattern is None:
+            return None
+        match = pattern.fullmatch(filename)
+        if match is None:
+            return None
+        # 规则分组包住规则内全部分组，最后闭合的分组即命中的规则
+        return RuleMatch(self._by_group[match.lastgroup], match)
+
+    def classify_any(self, filename: str) -> RuleMatch:
+        """在全部层级中匹配（用于提示文件可能放错了层级）"""
+        for layer in self.layers():
+            match = self.classify(layer, filename)
+            if match:
+                return match
+        return None
+
+
+_RULES_CACHE = {}
+
+
+def find_rules_file(project_root: str) -> str:
+    """项目中的命名规则配置文件，不存在时返回 None"""
+    for relative in RULES_SEARCH_PATHS:
+        path = os.path.join(project_root, relative)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def load_rules(project_root: str, path: str = None) -> RuleSet:
+    """加载并编译命名规则（进程内按文件路径 + 修改时间 + 大小缓存）
+
+    path 未指定时在项目中查找配置文件，找不到则使用内置默认规则；
+    读取或校验失败抛出 RuleConfigError。
+    """
+    path = path or find_rules_file(project_root)
+    if path is None:
+        key = None
+    else:
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            raise RuleConfigError(f"Cannot read naming rules: {e}") from e
+        key = (os.path.abspath(path), st.st_mtime, st.st_size)
+
+    rules = _RULES_CACHE.get(key)
+    if rules is None:
+        if path is None:
+            rules = RuleSet(DEFAULT_RULES)
+        else:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    config = json.load(f)
+            except (OSError, ValueError) as e:
+                raise RuleConfigError(f"Cannot read naming rules {path}: {e}") from e
+            rules = RuleSet(config, path)
+        _RULES_CACHE[key] = rules
+    return rules
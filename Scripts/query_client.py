@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+查询服务客户端脚本
+
+功能：向 query_server.py 发送单个 JSON-RPC 请求，将结果 JSON 打印到标准输出
+（与对应脚本写出的文件内容一致）；脚本参数中含 --output 时同时写入该文件。
+退出码与对应脚本一致
+
+Usage:
+    python3 query_client.py validate_trace --full-chain
+    python3 query_client.py check_naming --all-layers --strict
+    python3 query_client.py score --version 1.0.0
+    python3 query_client.py lookup FR_core_001
+    python3 query_client.py --port 8765 status
+
+Arguments:
+    METHOD              check_naming / validate_trace / score / lookup / status /
+                        refresh / shutdown
+    ARGS                传给对应脚本的参数（lookup 为文档 ID）
+    --socket PATH       Unix 套接字路径（默认 ./out/archpilot.sock）
+    --port N            改为连接 127.0.0.1:N
+    --help              显示帮助
+
+Exit Codes:
+    0 - 检查通过
+    1 - 参数错误
+    2 - 无法连接服务或服务返回错误
+    3 - 检查未通过（lookup 为 ID 不存在）
+
+Author: ArchPilot Core Framework
+Date: 2026-10-18
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+
+from query_server import DEFAULT_SOCKET_PATH
+
+
+# ============ 配置常量 ============
+
+# 由服务端读取的路径参数（--output 由客户端写入，保持原样）
+PATH_OPTIONS = ("--project-root", "--rules")
+
+
+# ============ 核心功能 ============
+
+def call(method: str, params: dict, socket_path: str = DEFAULT_SOCKET_PATH,
+         port: int = None) -> dict:
+    """发送请求并返回 JSON-RPC 响应"""
+    if port is not None:
+        connection = socket.create_connection(("127.0.0.1", port))
+    else:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.connect(socket_path)
+        except OSError:
+            connection.close()
+            raise
+    with connection, connection.makefile("rwb") as stream:
+        request = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
+        stream.write((json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8"))
+        stream.flush()
+        line = stream.readline()
+    if not line:
+        raise OSError("Connection closed by query server")
+    return json.loads(line)
+
+
+def output_path(script_args: list):
+    """脚本参数中的 --output 路径"""
+    for i, arg in enumerate(script_args):
+        if arg == "--output" and i + 1 < len(script_args):
+            return script_args[i + 1]
+        if arg.startswith("--output="):
+            return arg.split("=", 1)[1]
+    return None
+
+
+def absolute_paths(script_args: list) -> list:
+    """将 PATH_OPTIONS 中选项的相对路径按客户端工作目录转为绝对路径"""
+    result = list(script_args)
+    for i, arg in enumerate(result):
+        if arg in PATH_OPTIONS and i + 1 < len(result):
+            result[i + 1] = os.path.abspath(result[i + 1])
+        elif arg.split("=", 1)[0] in PATH_OPTIONS and "=" in arg:
+            option, value = arg.split("=", 1)
+            result[i] = option + "=" + os.path.abspath(value)
+    return result
+
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(
+        description='查询服务客户端：打印与脚本相同的 JSON 结果',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--socket', default=DEFAULT_SOCKET_PATH,
+                        help='Unix 套接字路径')
+    parser.add_argument('--port', type=int,
+                        help='改为连接 127.0.0.1 端口')
+    parser.add_argument('method',
+                        help='check_naming / validate_trace / score / lookup / status / '
+                             'refresh / shutdown')
+    parser.add_argument('args', nargs=argparse.REMAINDER,
+                        help='传给对应脚本的参数（lookup 为文档 ID）')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+
+    if args.method == "lookup":
+        if len(args.args) != 1:
+            print("Error: lookup requires exactly one document ID", file=sys.stderr)
+            return 1
+        params = {"id": args.args[0]}
+    else:
+        # 服务端核对 --project-root 是否为其项目根目录
+        params = {"argv": absolute_paths(args.args)}
+
+    try:
+        response = call(args.method, params, args.socket, args.port)
+    except (OSError, ValueError) as e:
+        print(f"Error: Cannot reach query server: {e}", file=sys.stderr)
+        return 2
+    if "error" in response:
+        error = response["error"]
+        print(f"Error: {error.get('message')} (code {error.get('code')})", file=sys.stderr)
+        return 2
+
+    result = response["result"]
+    text = json.dumps(result["output"], indent=2, ensure_ascii=False)
+    print(text)
+    path = output_path(args.args)
+    if path:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+    return result.get("exit_code", 0)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+本地查询服务脚本
+
+功能：常驻进程只加载一次项目索引与追溯文档模型，通过 Unix 套接字（或本机
+TCP 端口）以 JSON-RPC 2.0 应答命名检查、追溯验证、质量评分与按 ID 查询文档
+请求，避免 Agent 每次检查都启动新进程并重新扫描、解析全部文档。返回结果与
+对应脚本写出的 JSON 完全一致（客户端见 query_client.py）
+
+一致性：监听线程（inotify，不可用时轮询）将 L1-L5 下的文件变更增量更新到
+索引，并使按索引版本缓存的结果失效；层级目录以外的变化（如新建层级目录、
+Governance 目录）需调用 refresh 重新扫描
+
+协议：每行一个 JSON-RPC 2.0 消息（UTF-8），同一连接可连续发送多个请求
+    → {"jsonrpc": "2.0", "id": 1, "method": "validate_trace", "params": {"argv": ["--full-chain"]}}
+    ← {"jsonrpc": "2.0", "id": 1, "result": {"exit_code": 0, "output": {...}}}
+
+Methods:
+    check_naming    params {"argv": [...]}，参数同 check_naming.py
+    validate_trace  params {"argv": [...]}，参数同 validate_trace.py
+    score           params {"argv": [...]}，参数同 calculate_score.py
+    lookup          params {"id": "FR_core_001"}，文档记录、引用方与断链引用；
+                    不存在时附带相近 ID 建议
+    status          索引版本、文档数、运行时长
+    refresh         重新扫描项目
+    shutdown        停止服务
+    不支持：--watch / --stream / --changed-since / --staged / --profile / --history
+    （--output、--cache 等文件参数被忽略；--project-root 须与服务的项目根目录一致）
+
+Usage:
+    python3 query_server.py --project-root .
+    python3 query_server.py --port 8765
+
+Arguments:
+    --project-root DIR  项目根目录（默认 .）
+    --socket PATH       Unix 套接字路径（默认 ./out/archpilot.sock）
+    --port N            改为监听 127.0.0.1:N（平台不支持 Unix 套接字时必须指定）
+    --poll              文件监听强制使用轮询
+    --help              显示帮助
+
+Exit Codes:
+    0 - 正常退出（shutdown 请求或 Ctrl+C）
+    1 - 参数错误
+    2 - 依赖错误（套接字已被占用、无法监听等）
+
+Author: ArchPilot Core Framework
+Date: 2026-10-18
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from datetime import datetime
+
+import calculate_score
+import check_naming
+import code_metrics
+import validate_trace
+from code_metrics import CodeMetricsCache
+from id_suggest import IdSuggester
+from naming_rules import RuleConfigError, load_rules
+from repo_index import LAYER_ORDER, get_index
+from watch_mode import create_watcher
+
+
+# ============ 配置常量 ============
+
+DEFAULT_SOCKET_PATH = "./out/archpilot.sock"
+
+# JSON-RPC 2.0 错误码
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+# 各方法不支持的脚本参数（常驻模式下无意义或会写文件/阻塞）
+UNSUPPORTED_OPTIONS = {
+    "check_naming": ("--watch", "--poll", "--changed-since", "--staged",
+                     "--profile", "--profile-output"),
+    "validate_trace": ("--watch", "--poll", "--stream", "--changed-since", "--staged",
+                       "--profile", "--profile-output"),
+    "score": ("--history", "--profile", "--profile-output")
+}
+
+
+# ============ 查询服务 ============
+
+class RpcError(Exception):
+    """JSON-RPC 错误"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+class QueryService:
+    """常驻项目模型：索引、追溯文档与按索引版本缓存的检查结果"""
+
+    def __init__(self, project_root: str):
+        # 传给各检查函数的根目录保持启动时的写法，输出中的目录字段与直接运行脚本一致
+        self.root_arg = project_root
+        self.project_root = os.path.abspath(project_root)
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.generation = 0
+        self.requests = 0
+        self.index = get_index(self.root_arg, refresh=True)
+        self.code_cache = CodeMetricsCache(code_metrics.DEFAULT_CACHE_PATH).load()
+        # 相近 ID 索引跨索引版本复用，按 ID 集合差异增量维护（内容修改通常不改变 ID）
+        self._suggester = None
+        self._suggester_ids = set()
+        self._reset()
+        self.methods = {
+            "check_naming": self.check_naming,
+            "validate_trace": self.validate_trace,
+            "score": self.score,
+            "lookup": self.lookup,
+            "status": self.status,
+            "refresh": self.refresh
+        }
+
+    def _reset(self) -> None:
+        """索引变化后丢弃派生结果"""
+        self._results = {}
+        self._dimensions = None
+        self._documents = None
+        self._referrers = None
+
+    def apply_changes(self, paths) -> int:
+        """监听线程回调：增量更新索引，返回变更条目数"""
+        with self.lock:
+            changes = self.index.update_paths(paths)
+            if changes:
+                self.generation += 1
+                self._reset()
+            return len(changes)
+
+    # ---------- 请求分发 ----------
+
+    def handle(self, message) -> dict:
+        """处理单个 JSON-RPC 消息，返回响应（通知消息返回 None）"""
+        if not isinstance(message, dict) or not isinstance(message.get("method"), str):
+            return rpc_error(None, INVALID_REQUEST, "Invalid request")
+        request_id = message.get("id")
+        params = message.get("params") or {}
+        try:
+            if not isinstance(params, dict):
+                raise RpcError(INVALID_PARAMS, "params must be an object")
+            method = self.methods.get(message["method"])
+            if method is None:
+                raise RpcError(METHOD_NOT_FOUND, f"Unknown method: {message['method']}")
+            with self.lock:
+                self.requests += 1
+                result = method(params)
+        except RpcError as e:
+            response = rpc_error(request_id, e.code, str(e))
+        except Exception as e:  # 单个请求失败不影响服务
+            response = rpc_error(request_id, INTERNAL_ERROR, f"{type(e).__name__}: {e}")
+        else:
+            response = {"jsonrpc": "2.0", "id": request_id, "result": result}
+        return response if "id" in message else None
+
+    def _parse(self, method: str, parse_args, params: dict):
+        """按脚本自身的参数解析器解析 argv，项目根目录固定为服务根目录"""
+        argv = params.get("argv", [])
+        if not isinstance(argv, list) or not all(isinstance(arg, str) for arg in argv):
+            raise RpcError(INVALID_PARAMS, "argv must be a list of strings")
+        for arg in argv:
+            if arg.split("=", 1)[0] in UNSUPPORTED_OPTIONS[method]:
+                raise RpcError(INVALID_PARAMS, f"{arg} is not supported by the query server")
+        stderr = io.StringIO()
+        try:
+            with contextlib.redirect_stderr(stderr), contextlib.redirect_stdout(stderr):
+                args = parse_args(argv)
+        except SystemExit:
+            raise RpcError(INVALID_PARAMS, stderr.getvalue().strip() or "Invalid arguments")
+        if "--project-root" in argv or any(arg.startswith("--project-root=") for arg in argv):
+            if os.path.abspath(args.project_root) != self.project_root:
+                raise RpcError(INVALID_PARAMS,
+                               f"Query server serves {self.project_root}, not {args.project_root}")
+        args.project_root = self.root_arg
+        return args
+
+    def _cached(self, key: tuple, compute) -> dict:
+        """同一索引版本内的相同请求直接复用结果（时间戳取本次请求时间）"""
+        result = self._results.get(key)
+        if result is None:
+            result = self._results[key] = compute()
+        output = dict(result["output"])
+        output["timestamp"] = datetime.utcnow().isoformat() + "Z"
+        return {"exit_code": result["exit_code"], "output": output}
+
+    # ---------- 检查方法 ----------
+
+    def check_naming(self, params: dict) -> dict:
+        args = self._parse("check_naming", check_naming.parse_args, params)
+        if not args.layer and not args.all_layers:
+            raise RpcError(INVALID_PARAMS, "Must specify --layer or --all-layers")
+        layers = check_naming.selected_layers(args)
+        try:
+            # 规则文件按修改时间缓存，变更后得到新的规则集，结果缓存随之失效
+            rules = load_rules(self.root_arg, args.rules)
+        except RuleConfigError as e:
+            raise RpcError(INVALID_PARAMS, str(e))
+
+        def compute():
+            results = [check_naming.check_layer_naming(layer, self.root_arg, args.strict,
+                                                       rules=rules)
+                       for layer in layers]
+            output = check_naming.build_output(args, layers, results, rules=rules)
+            return {"exit_code": 3 if output["status"] == "failed" else 0, "output": output}
+
+        return self._cached(("check_naming", tuple(layers), args.strict, rules), compute)
+
+    def validate_trace(self, params: dict) -> dict:
+        args = self._parse("validate_trace", validate_trace.parse_args, params)
+        if not args.full_chain and not (args.from_layer and args.to_layer):
+            raise RpcError(INVALID_PARAMS, "Must specify --full-chain or both --from and --to")
+        if args.max_issues is not None and args.max_issues < 0:
+            raise RpcError(INVALID_PARAMS, "--max-issues must be non-negative")
+
+        def compute():
+            self._load_documents()
+            issues = validate_trace.IssueCollector(args.max_issues)
+            result = validate_trace.run_validation(args, None, None, 1, issues,
+                                                   self._suggester)
+            output = validate_trace.build_output(args, result)
+            return {"exit_code": 3 if result["status"] == "failed" else 0, "output": output}
+
+        key = ("validate_trace", args.full_chain, args.from_layer, args.to_layer,
+               args.max_issues, args.body_refs, args.suggest, args.graph)
+        return self._cached(key, compute)
+
+    def score(self, params: dict) -> dict:
+        args = self._parse("score", calculate_score.parse_args, params)
+
+        def compute():
+            # 维度结果与版本号无关，同一索引版本内共享
+            if self._dimensions is None:
+                self._dimensions, _ = calculate_score.score_dimensions(
+                    self.root_arg, None, self.code_cache)
+            output = calculate_score.build_output(args, self._dimensions)
+            return {"exit_code": 3 if output["status"] == "failure" else 0, "output": output}
+
+        return self._cached(("score", args.version), compute)
+
+    # ---------- 文档查询 ----------
+
+    def _load_documents(self) -> dict:
+        """追溯文档模型（ID -> 文档），与 validate_trace 相同的后者覆盖前者规则"""
+        if self._documents is None:
+            documents = {}
+            for layer in LAYER_ORDER:
+                for doc in validate_trace.collect_layer_documents(self.root_arg, layer):
+                    documents[doc.id] = doc
+            referrers = {}
+            for doc in documents.values():
+                for field in ("traces_from", "traces_to"):
+                    for ref in getattr(doc, field):
+                        referrers.setdefault(ref, {}).setdefault(field, []).append(doc.id)
+            self._documents = documents
+            self._referrers = referrers
+            self._sync_suggester(documents)
+        return self._documents
+
+    def _sync_suggester(self, documents: dict) -> None:
+        if self._suggester is None:
+            self._suggester = IdSuggester(documents)
+        else:
+            for doc_id in self._suggester_ids - documents.keys():
+                self._suggester.discard(doc_id)
+            for doc_id in documents.keys() - self._suggester_ids:
+                self._suggester.add(doc_id)
+        self._suggester_ids = set(documents)
+
+    def lookup(self, params: dict) -> dict:
+        doc_id = params.get("id")
+        if not isinstance(doc_id, str) or not doc_id:
+            raise RpcError(INVALID_PARAMS, "id must be a non-empty string")
+        documents = self._load_documents()
+        doc = documents.get(doc_id)
+        output = {
+            "script": "query_server",
+            "method": "lookup",
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "status": "success" if doc else "not_found",
+            "project_root": self.project_root,
+            "id": doc_id
+        }
+        if doc is None:
+            output["suggestions"] = self._suggester.suggest(doc_id)
+            return {"exit_code": 3, "output": output}
+
+        referrers = self._referrers.get(doc_id, {})
+        output["document"] = {
+            "id": doc.id,
+            "file": doc.file,
+            "layer": doc.layer,
+            "traces_from": list(doc.traces_from),
+            "traces_to": list(doc.traces_to)
+        }
+        output["referenced_by"] = {
+            "traces_from": sorted(referrers.get("traces_from", [])),
+            "traces_to": sorted(referrers.get("traces_to", []))
+        }
+        output["broken_references"] = [ref for ref in doc.traces_from + doc.traces_to
+                                       if ref not in documents]
+        return {"exit_code": 0, "output": output}
+
+    # ---------- 服务管理 ----------
+
+    def status(self, params: dict) -> dict:
+        documents = self._load_documents()
+        return {"exit_code": 0, "output": {
+            "script": "query_server",
+            "method": "status",
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "status": "success",
+            "project_root": self.project_root,
+            "generation": self.generation,
+            "files_indexed": sum(len(self.index.files(layer)) for layer in LAYER_ORDER),
+            "documents": len(documents),
+            "requests": self.requests,
+            "uptime_seconds": round(time.time() - self.started, 1)
+        }}
+
+    def refresh(self, params: dict) -> dict:
+        self.index = get_index(self.root_arg, refresh=True)
+        self.generation += 1
+        self._reset()
+        return self.status(params)
+
+
+def rpc_error(request_id, code: int, message: str) -> dict:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+# ============ 网络服务 ============
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """逐行读取 JSON-RPC 请求并写回响应"""
+
+    def handle(self) -> None:
+        service = self.server.service
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                message = json.loads(line)
+            except ValueError as e:
+                response = rpc_error(None, PARSE_ERROR, f"Parse error: {e}")
+            else:
+                if isinstance(message, dict) and message.get("method") == "shutdown":
+                    self.reply(message, {"exit_code": 0, "output": {"status": "stopping"}})
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    return
+                response = service.handle(message)
+            if response is not None:
+                self.write(response)
+
+    def reply(self, message: dict, result: dict) -> None:
+        if "id" in message:
+            self.write({"jsonrpc": "2.0", "id": message["id"], "result": result})
+
+    def write(self, response: dict) -> None:
+        self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+
+class ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class ThreadingLocalServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def create_server(socket_path: str, port: int):
+    """创建监听 Unix 套接字或 127.0.0.1 端口的服务器"""
+    if port is not None:
+        return ThreadingLocalServer(("127.0.0.1", port), RequestHandler)
+    if os.path.exists(socket_path):
+        # 残留的套接字文件：能连上说明已有服务在运行
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            os.unlink(socket_path)
+        else:
+            raise OSError(f"Query server already running on {socket_path}")
+        finally:
+            probe.close()
+    os.makedirs(os.path.dirname(os.path.abspath(socket_path)), exist_ok=True)
+    return ThreadingUnixServer(socket_path, RequestHandler)
+
+
+def start_watcher(service: QueryService, polling: bool = False) -> None:
+    """后台线程：层级目录文件变更时增量更新索引"""
+    roots = [service.index.layer_root(layer) for layer in LAYER_ORDER]
+    watcher = create_watcher(roots, polling)
+
+    def loop():
+        while True:
+            service.apply_changes(watcher.wait())
+
+    threading.Thread(target=loop, name="query-server-watcher", daemon=True).start()
+
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(
+        description='本地查询服务：常驻项目索引，以 JSON-RPC 应答检查请求',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--project-root', default='.',
+                        help='项目根目录')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET_PATH,
+                        help='Unix 套接字路径')
+    parser.add_argument('--port', type=int,
+                        help='改为监听 127.0.0.1 端口')
+    parser.add_argument('--poll', action='store_true',
+                        help='文件监听强制使用轮询')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+
+    if args.port is None and not hasattr(socket, "AF_UNIX"):
+        print("Error: Unix sockets are not supported on this platform, use --port",
+              file=sys.stderr)
+        return 1
+    if not os.path.isdir(args.project_root):
+        print(f"Error: Project root not found: {args.project_root}", file=sys.stderr)
+        return 2
+
+    service = QueryService(args.project_root)
+    try:
+        server = create_server(args.socket, args.port)
+    except OSError as e:
+        print(f"Error: Cannot listen: {e}", file=sys.stderr)
+        return 2
+    server.service = service
+    start_watcher(service, args.poll)
+
+    address = f"127.0.0.1:{args.port}" if args.port is not None else args.socket
+    print(f"Query server for {service.project_root} listening on {address}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.port is None and os.path.exists(args.socket):
+            os.unlink(args.socket)
+        service.code_cache.save()
+    print("Query server stopped")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
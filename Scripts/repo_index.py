@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+项目文件索引模块
+
+功能：单次遍历 L1-L5 层级目录，构建内存文件索引，供 check_naming、
+validate_trace、calculate_score 共享查询，避免各脚本重复 rglob/glob 全树扫描
+
+索引内容：
+    - 相对路径、所属层级、扩展名
+    - 文件大小、修改时间（首次访问时才 stat，只按文件名查询的调用方不产生 stat）
+    - YAML front matter（首次访问时流式读取头部并缓存；只需部分字段的调用方
+      用 release_front_matter() 取出后释放，索引不再常驻完整字典）
+
+Usage:
+    from repo_index import get_index
+
+    index = get_index(project_root)
+    for entry in index.files("L1", pattern="*.md"):
+        print(entry.rel_path, entry.front_matter.get("id"))
+
+Author: ArchPilot Core Framework
+Date: 2026-10-18
+"""
+
+import fnmatch
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import metrics
+from front_matter import parse_front_matter
+
+
+# ============ 配置常量（根据项目调整） ============
+
+# 层级目录配置
+LAYER_DIRECTORIES = {
+    "L1": "L1_Requirements",
+    "L2": "L2_Architecture",
+    "L3": "L3_DetailDesign",
+    "L4": "L4_Implementation",
+    "L5": "L5_Verification"
+}
+
+LAYER_ORDER = ["L1", "L2", "L3", "L4", "L5"]
+
+# 非追溯文档（索引/说明文件）
+SPECIAL_FILES = ["README.md", "INDEX.md"]
+
+# 并行解析 front matter 的分块大小；待解析文件少于两块时不启用进程池
+PARSE_CHUNK_SIZE = 256
+
+
+# ============ 索引结构 ============
+
+class IndexEntry:
+    """索引中的单个文件记录"""
+
+    __slots__ = ("path", "rel_path", "name", "layer", "extension",
+                 "depth", "_size", "_mtime", "_front_matter")
+
+    def __init__(self, path: str, rel_path: str, layer: str, depth: int,
+                 size: int = None, mtime: float = None):
+        self.path = path
+        self.rel_path = rel_path
+        self.name = os.path.basename(path)
+        self.layer = layer
+        self.extension = os.path.splitext(self.name)[1].lower()
+        self.depth = depth
+        self._size = size
+        self._mtime = mtime
+        self._front_matter = None
+
+    @property
+    def size(self) -> int:
+        """文件大小（懒加载，文件已不存在时为 None）"""
+        if self._mtime is None:
+            self._load_stat()
+        return self._size
+
+    @property
+    def mtime(self) -> float:
+        """修改时间（懒加载，文件已不存在时为 None）"""
+        if self._mtime is None:
+            self._load_stat()
+        return self._mtime
+
+    def _load_stat(self) -> None:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return
+        metrics.count("files_stated")
+        self._size = st.st_size
+        self._mtime = st.st_mtime
+
+    @property
+    def front_matter(self) -> dict:
+        """YAML front matter（仅 .md 文件，懒加载）"""
+        if self._front_matter is None:
+            if self.extension == ".md":
+                self._front_matter = parse_front_matter(self.path)
+            else:
+                self._front_matter = {}
+        return self._front_matter
+
+    def release_front_matter(self) -> dict:
+        """取出 front matter 并释放条目上的缓存（再次访问时重新解析）"""
+        front_matter = self.front_matter
+        self._front_matter = None
+        return front_matter
+
+
+class RepoIndex:
+    """项目层级目录的内存文件索引"""
+
+    def __init__(self, project_root: str):
+        self.project_root = project_root
+        self.layer_dirs = {}
+        self.entries = {layer: [] for layer in LAYER_ORDER}
+
+    def layer_exists(self, layer: str) -> bool:
+        """层级目录是否存在"""
+        return layer in self.layer_dirs
+
+    def layer_path(self, layer: str) -> Path:
+        """层级目录路径"""
+        return Path(self.project_root) / LAYER_DIRECTORIES.get(layer, "")
+
+    def layer_root(self, layer: str) -> str:
+        """层级目录路径字符串（与索引条目路径写法一致，目录可尚未创建）"""
+        return os.path.join(self.project_root, LAYER_DIRECTORIES[layer])
+
+    def files(self, layer: str, pattern: str = None, extensions=None,
+              recursive: bool = True, exclude=None) -> list:
+        """按层级查询文件
+
+        pattern 为文件名通配符（fnmatch 语义，区分大小写）；
+        recursive=False 时只返回层级目录顶层文件，等价于 glob。
+        """
+        result = []
+        for entry in self.entries.get(layer, []):
+            if not recursive and entry.depth > 0:
+                continue
+            if pattern and not fnmatch.fnmatchcase(entry.name, pattern):
+                continue
+            if extensions and entry.extension not in extensions:
+                continue
+            if exclude and entry.name in exclude:
+                continue
+            result.append(entry)
+        return result
+
+    def documents(self, layer: str, recursive: bool = True) -> list:
+        """层级内追溯文档（.md，排除 README/INDEX）"""
+        return self.files(layer, pattern="*.md", recursive=recursive,
+                          exclude=SPECIAL_FILES)
+
+    @metrics.timed("prefetch_front_matter")
+    def prefetch_front_matter(self, entries, jobs: int = 1) -> int:
+        """并行预解析尚未加载的 front matter，返回解析文件数
+
+        进程池按分块分发，结果按输入顺序回填，与串行懒加载结果完全一致。
+        """
+        pending = [entry for entry in entries
+                   if entry._front_matter is None and entry.extension == ".md"]
+        if jobs <= 1 or len(pending) < PARSE_CHUNK_SIZE * 2:
+            for entry in pending:
+                entry.front_matter
+            return len(pending)
+
+        # 子进程内的解析计数不回传，这里按文件数记账
+        metrics.count("files_parsed_parallel", len(pending))
+
+        paths = [entry.path for entry in pending]
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = pool.map(parse_front_matter, paths, chunksize=PARSE_CHUNK_SIZE)
+            for entry, metadata in zip(pending, results):
+                entry._front_matter = metadata
+        return len(pending)
+
+    def layer_of(self, path: str) -> str:
+        """根据路径判断所属层级（层级目录本身也属于该层级，不在层级目录下返回 None）
+
+        索引建立后才创建的层级目录在此时登记。
+        """
+        for layer in LAYER_ORDER:
+            top = self.layer_dirs.get(layer) or self.layer_root(layer)
+            if path == top or path.startswith(top + os.sep):
+                if layer not in self.layer_dirs and os.path.isdir(top):
+                    self.layer_dirs[layer] = top
+                return layer
+        return None
+
+    def update_paths(self, paths) -> list:
+        """按变更路径增量更新索引，返回 (旧条目, 新条目) 列表，新增/删除时对应项为 None"""
+        changes = []
+        touched = {}
+        for path in sorted(paths):
+            layer = self.layer_of(path)
+            if layer is None:
+                continue
+            if layer not in touched:
+                touched[layer] = {entry.path: entry for entry in self.entries[layer]}
+            by_path = touched[layer]
+
+            old = by_path.pop(path, None)
+            new = None
+            try:
+                st = os.stat(path)
+            except OSError:
+                st = None
+            if st is not None and os.path.isfile(path):
+                relative = os.path.relpath(path, self.layer_root(layer))
+                new = IndexEntry(path, os.path.join(LAYER_DIRECTORIES[layer], relative),
+                                 layer, relative.count(os.sep), st.st_size, st.st_mtime)
+                by_path[path] = new
+            if old is not None or new is not None:
+                changes.append((old, new))
+            elif st is None:
+                # 目录被删除或移走：移除其下全部条目（层级目录本身被删除时取消登记）
+                prefix = path + os.sep
+                for removed in [p for p in by_path if p.startswith(prefix)]:
+                    changes.append((by_path.pop(removed), None))
+                if path == self.layer_dirs.get(layer):
+                    del self.layer_dirs[layer]
+
+        for layer, by_path in touched.items():
+            self.entries[layer] = list(by_path.values())
+        return changes
+
+    @metrics.timed("scan")
+    def scan(self, layers=None, pattern: str = None) -> "RepoIndex":
+        """单次遍历层级目录，填充索引（指定 pattern 时只登记匹配的文件）"""
+        for layer in layers or LAYER_ORDER:
+            top = self.layer_root(layer)
+            if not os.path.isdir(top):
+                continue
+            self.layer_dirs[layer] = top
+            self.entries[layer] = self._walk(top, LAYER_DIRECTORIES[layer], layer, pattern)
+        return self
+
+    def _walk(self, top: str, rel_top: str, layer: str, pattern: str = None) -> list:
+        """os.scandir 深度优先遍历，目录内按名称排序保证结果稳定
+
+        文件类型取自目录项（d_type），遍历本身不 stat 文件。
+        """
+        match = re.compile(fnmatch.translate(pattern)).match if pattern else None
+        entries = []
+        stack = [(top, rel_top, 0)]
+        while stack:
+            current, rel_current, depth = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    items = sorted(it, key=lambda e: e.name)
+            except OSError:
+                continue
+
+            subdirs = []
+            prefix = rel_current + os.sep
+            for item in items:
+                name = item.name
+                try:
+                    if item.is_dir(follow_symlinks=False):
+                        subdirs.append((item.path, prefix + name, depth + 1))
+                    elif (match is None or match(name)) and item.is_file():
+                        entries.append(IndexEntry(item.path, prefix + name, layer, depth))
+                except OSError:
+                    continue
+            # 逆序入栈，使子目录按名称顺序出栈
+            stack.extend(reversed(subdirs))
+            metrics.count("directories_scanned")
+        metrics.count("files_indexed", len(entries))
+        return entries
+
+
+# ============ 共享入口 ============
+
+_INDEX_CACHE = {}
+
+
+def scan_project(project_root: str, layers=None, pattern: str = None) -> RepoIndex:
+    """遍历项目并返回新的索引（不进入共享缓存）
+
+    pattern 限定登记的文件名（如 "*.md"），供只查询部分文件的单脚本运行
+    减少常驻条目；这样的索引不能交给需要其他文件的查询。
+    """
+    return RepoIndex(project_root).scan(layers, pattern)
+
+
+def index_paths(project_root: str, paths) -> RepoIndex:
+    """只为给定文件路径建立索引（不遍历目录），用于按变更文件检查"""
+    index = RepoIndex(project_root)
+    for layer in LAYER_ORDER:
+        top = index.layer_root(layer)
+        if os.path.isdir(top):
+            index.layer_dirs[layer] = top
+    index.update_paths(paths)
+    return index
+
+
+def index_listed(project_root: str, rel_paths) -> RepoIndex:
+    """由文件相对路径列表（"/" 分隔，如 git ls-files 输出）建立索引
+
+    不访问文件系统：条目只有路径与文件名信息（大小与修改时间在首次访问时
+    才 stat），用于按文件名比较的查询。
+    """
+    index = RepoIndex(project_root)
+    directory_layers = {directory: layer for layer, directory in LAYER_DIRECTORIES.items()}
+    for rel_path in rel_paths:
+        parts = rel_path.split("/")
+        layer = directory_layers.get(parts[0])
+        if layer is None or len(parts) < 2:
+            continue
+        index.layer_dirs.setdefault(layer, index.layer_root(layer))
+        index.entries[layer].append(IndexEntry(os.path.join(project_root, *parts),
+                                               os.path.join(*parts), layer,
+                                               len(parts) - 2))
+    return index
+
+
+def resolve_jobs(jobs: int) -> int:
+    """解析 --jobs 参数：0 或负数表示自动使用 CPU 核数"""
+    if jobs and jobs > 0:
+        return jobs
+    return os.cpu_count() or 1
+
+
+def get_index(project_root: str, refresh: bool = False) -> RepoIndex:
+    """获取项目索引（同一进程内按项目根目录复用）"""
+    key = os.path.abspath(project_root)
+    if refresh or key not in _INDEX_CACHE:
+        _INDEX_CACHE[key] = scan_project(project_root)
+    return _INDEX_CACHE[key]
+
+
+def drop_index(project_root: str) -> None:
+    """释放项目索引（批量检查多个项目时避免常驻进程内存持续增长）"""
+    _INDEX_CACHE.pop(os.path.abspath(project_root), None)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+运行历史查询脚本
+
+功能：维护检查结果的 SQLite 历史库（history_store），导入已有 JSON 结果，
+查询指标趋势，并对比两次运行发现回退
+
+Usage:
+    python3 run_history.py record --score out/quality_score.json --trace out/trace_validation.json
+    python3 run_history.py trend --metric total_score --limit 100
+    python3 run_history.py regressions --base v1.2.0 --head v1.3.0
+
+Subcommands:
+    record        导入各脚本 JSON 输出为一次运行（--score / --trace / --naming，至少一个；
+                  --version 覆盖版本号）
+    trend         指标趋势（--metric，默认 total_score；--limit N；--since 时间戳）
+    regressions   对比两次运行（--base / --head 版本号，默认为最近两次运行；--threshold 容差）
+
+Arguments (通用):
+    --db PATH           历史库路径（默认 ./out/history.sqlite）
+    --project-root DIR  项目根目录（默认 .，用于定位历史记录；record 时默认取结果中的项目根目录）
+    --output PATH       输出路径（默认 ./out/run_history.json）
+    --help              显示帮助
+
+Exit Codes:
+    0 - 成功
+    1 - 参数错误
+    2 - 依赖错误（结果文件或历史库不可读等）
+    3 - 检测到回退（regressions）
+
+Author: ArchPilot Core Framework
+Date: 2026-10-18
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from history_store import DEFAULT_HISTORY_PATH, METRICS, HistoryStore
+
+
+# ============ 核心功能 ============
+
+def load_result(path: str) -> dict:
+    """读取脚本 JSON 输出（未指定时返回 None）"""
+    if not path:
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def record(store: HistoryStore, project_root: str, args) -> dict:
+    """导入 JSON 结果"""
+    results = {name: load_result(path) for name, path in
+               (("score", args.score), ("trace", args.trace), ("naming", args.naming))}
+    run_id = store.record_run(results["score"], results["trace"], results["naming"],
+                              project_root=project_root, version=args.version)
+    return {"status": "success", "run_id": run_id,
+            "recorded": [name for name, result in results.items() if result]}
+
+
+def trend(store: HistoryStore, project_root: str, args) -> dict:
+    """指标趋势"""
+    points = store.trend(project_root, args.metric, args.limit, args.since)
+    values = [p["value"] for p in points if p["value"] is not None]
+    return {
+        "status": "success",
+        "metric": args.metric,
+        "points": points,
+        "summary": {
+            "runs": len(points),
+            "min": min(values) if values else None,
+            "max": max(values) if values else None,
+            "latest": values[-1] if values else None
+        }
+    }
+
+
+def regressions(store: HistoryStore, project_root: str, args) -> dict:
+    """对比两次运行"""
+    head = store.find_run(project_root, args.head)
+    if args.base is not None:
+        base = store.find_run(project_root, args.base)
+    else:
+        # 未指定基线：取 head 之前的最近一次运行
+        base = store.previous_run(head) if head else None
+    if head is None or base is None:
+        return {"status": "skipped", "reason": "Not enough runs to compare",
+                "base": base, "head": head, "regressions": []}
+
+    found = store.regressions(base["id"], head["id"], args.threshold)
+    return {
+        "status": "warning" if found else "success",
+        "base": {key: base[key] for key in ("id", "version", "timestamp", "total_score")},
+        "head": {key: head[key] for key in ("id", "version", "timestamp", "total_score")},
+        "regressions": found
+    }
+
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--db', default=DEFAULT_HISTORY_PATH,
+                        help='历史库路径')
+    common.add_argument('--project-root',
+                        help='项目根目录（默认 .；record 时默认取结果中的项目根目录）')
+    common.add_argument('--output', default='./out/run_history.json',
+                        help='输出路径')
+
+    parser = argparse.ArgumentParser(
+        description='检查结果历史：导入、趋势与回退查询',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = subparsers.add_parser('record', parents=[common],
+                                          help='导入 JSON 结果')
+    record_parser.add_argument('--score', help='calculate_score 输出')
+    record_parser.add_argument('--trace', help='validate_trace 输出')
+    record_parser.add_argument('--naming', help='check_naming 输出')
+    record_parser.add_argument('--version',
+                               help='版本号（默认取评分结果中的版本）')
+
+    trend_parser = subparsers.add_parser('trend', parents=[common],
+                                         help='指标趋势')
+    trend_parser.add_argument('--metric', default='total_score', choices=sorted(METRICS),
+                              help='指标')
+    trend_parser.add_argument('--limit', type=int, default=50,
+                              help='最近运行次数')
+    trend_parser.add_argument('--since',
+                              help='起始时间戳（ISO 8601）')
+
+    regress_parser = subparsers.add_parser('regressions', parents=[common],
+                                           help='回退检测')
+    regress_parser.add_argument('--base', help='基线版本')
+    regress_parser.add_argument('--head', help='对比版本')
+    regress_parser.add_argument('--threshold', type=float, default=0.0,
+                                help='容差（变差幅度超过该值才视为回退）')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+
+    if args.command == 'record' and not (args.score or args.trace or args.naming):
+        print("Error: Must specify at least one of --score, --trace, --naming",
+              file=sys.stderr)
+        return 1
+
+    project_root = os.path.abspath(args.project_root or '.')
+    try:
+        with HistoryStore(args.db) as store:
+            if args.command == 'record':
+                result = record(store, args.project_root and project_root, args)
+            elif args.command == 'trend':
+                result = trend(store, project_root, args)
+            else:
+                result = regressions(store, project_root, args)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    output = {
+        "script": "run_history",
+        "command": args.command,
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "project_root": project_root,
+        "database": str(Path(args.db)),
+        **result
+    }
+
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+
+    if args.command == 'record':
+        print(f"Recorded run {result['run_id']}: {', '.join(result['recorded'])}")
+    elif args.command == 'trend':
+        print(f"Trend of {args.metric} ({result['summary']['runs']} runs):")
+        for point in result["points"]:
+            print(f"  {point['timestamp']}  {point['version']}: {point['value']}")
+    else:
+        print(f"Regression check: {result['status']}")
+        for item in result["regressions"]:
+            print(f"  {item['metric']}: {item['base']} -> {item['head']}")
+    print(f"Results written to: {output_path}")
+
+    if args.command == 'regressions' and result["regressions"]:
+        return 3
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
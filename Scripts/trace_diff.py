@@ -0,0 +1,644 @@
+#!/usr/bin/env python3
+"""
+追溯关系图差异脚本
+
+功能：比较两个 git revision（如两个发布标签）之间 validate_trace 文档图的结构
+变化：新增/删除的追溯边、新增/删除/修改的文档、新出现的孤立文档与断链。
+直接从 git 对象库读取（不检出工作区），输出 JSON 与符合 rules_mermaid.md 的
+Mermaid 片段
+
+增量计算：
+    1. 两棵树按 Merkle 方式比较，对象 ID 相同的子树直接跳过，只得到变更文件
+    2. base 文档图由树遍历 + 按对象 ID 缓存的 front matter 构建，未变化的文档
+       不重复读取与解析
+    3. head 文档图以 base 为父状态，只覆盖变更涉及的路径、ID 与引用；
+       边、孤立与断链的比较只在变更文档及其直接追溯邻居上进行
+
+Usage:
+    python3 trace_diff.py --base v1.2.0 --head v1.3.0
+    python3 trace_diff.py --base origin/main --mermaid out/trace_diff.mmd
+
+Arguments:
+    --base REV          基线 revision（必需）
+    --head REV          对比 revision（默认 HEAD）
+    --project-root DIR  git 仓库根目录（默认 .）
+    --output PATH       输出路径（默认 ./out/trace_diff.json）
+    --mermaid PATH      Mermaid 输出路径（默认 ./out/trace_diff.mmd）
+    --cache PATH        按对象 ID 的元数据缓存（默认 ./out/trace_diff_cache.json）
+    --no-cache          禁用元数据缓存
+    --help              显示帮助
+
+Exit Codes:
+    0 - 成功
+    1 - 参数错误
+    2 - 依赖错误（不在 git 仓库内、revision 无效等）
+    3 - head 引入了新的断链
+
+Author: ArchPilot Core Framework
+Date: 2026-10-18
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from datetime import datetime
+from fnmatch import fnmatchcase
+from pathlib import Path
+
+from front_matter import PARSER_BACKEND, parse_front_matter_bytes
+from git_changes import GitError
+from git_objects import MODE_TREE, ObjectReader
+from metadata_cache import TRACE_FIELDS
+from repo_index import LAYER_DIRECTORIES, LAYER_ORDER, SPECIAL_FILES
+from trace_graph import DECLARED_BY_TRACES_FROM, DECLARED_BY_TRACES_TO, TraceDocument
+
+
+# ============ 配置常量 ============
+
+DEFAULT_OUTPUT = "./out/trace_diff.json"
+DEFAULT_MERMAID_OUTPUT = "./out/trace_diff.mmd"
+DEFAULT_CACHE_PATH = "./out/trace_diff_cache.json"
+
+# 2：front matter 解析支持块列表、引号与注释
+CACHE_VERSION = 2
+
+# 层级目录名 -> 层级
+DIRECTORY_LAYERS = {directory: layer for layer, directory in LAYER_DIRECTORIES.items()}
+
+LAYER_TITLES = {
+    "L1": "L1 需求",
+    "L2": "L2 架构",
+    "L3": "L3 详细设计",
+    "L4": "L4 实现",
+    "L5": "L5 验证"
+}
+
+# rules_mermaid.md 5.1：超过 30 个节点必须拆分，超出部分只在 JSON 中给出
+MERMAID_MAX_NODES = 30
+
+
+# ============ 元数据缓存 ============
+
+class BlobMetadataCache:
+    """按 git 对象 ID 缓存追溯元数据（内容不变则对象 ID 不变，无需校验）"""
+
+    def __init__(self, cache_path: str = None):
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.entries = {}
+        self.misses = 0
+        self._seen = set()
+
+    def load(self) -> "BlobMetadataCache":
+        if self.cache_path is None:
+            return self
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self
+        if data.get("cache_version") == CACHE_VERSION and data.get("parser") == PARSER_BACKEND:
+            self.entries = data.get("entries", {})
+        return self
+
+    def metadata(self, reader: ObjectReader, oid: str) -> dict:
+        """对象的追溯元数据，未缓存时读取并解析"""
+        self._seen.add(oid)
+        cached = self.entries.get(oid)
+        if cached is None:
+            self.misses += 1
+            front_matter = parse_front_matter_bytes(reader.read_blob(oid))
+            cached = {key: front_matter[key] for key in TRACE_FIELDS if key in front_matter}
+            self.entries[oid] = cached
+        return cached
+
+    def save(self) -> None:
+        """只保留本次用到的对象，原子写回"""
+        if self.cache_path is None:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        data = json.dumps({
+            "cache_version": CACHE_VERSION,
+            "parser": PARSER_BACKEND,
+            "entries": {oid: self.entries[oid] for oid in self._seen}
+        }, ensure_ascii=False, separators=(",", ":"))
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self.cache_path)
+
+
+# ============ 文档图状态 ============
+
+def document_layer(rel_path: str) -> str:
+    """追溯文档所属层级（与 RepoIndex.documents 的范围一致），非文档返回 None"""
+    top, _, rest = rel_path.partition("/")
+    layer = DIRECTORY_LAYERS.get(top)
+    if layer is None or not rest:
+        return None
+    name = rest.rsplit("/", 1)[-1]
+    if not fnmatchcase(name, "*.md") or name in SPECIAL_FILES:
+        return None
+    return layer
+
+
+def scan_order(rel_path: str) -> tuple:
+    """RepoIndex 的遍历顺序：层级 → 目录（同目录文件先于子目录）→ 文件名"""
+    parts = rel_path.split("/")
+    return (LAYER_ORDER.index(DIRECTORY_LAYERS[parts[0]]), tuple(parts[1:-1]), parts[-1])
+
+
+def make_document(rel_path: str, metadata: dict) -> TraceDocument:
+    """由元数据构建文档记录（无 id 的文档不参与追溯）"""
+    if not metadata.get("id"):
+        return None
+    return TraceDocument(metadata["id"], rel_path, document_layer(rel_path),
+                         metadata.get("traces_from"), metadata.get("traces_to"))
+
+
+class GraphState:
+    """某个 revision 的文档集合
+
+    documents  路径 -> 文档（None 表示已删除）
+    id_paths   ID -> 声明该 ID 的文档路径（按扫描顺序，最后一个生效，与
+               validate_trace 的字典覆盖语义一致）
+    declarers  引用 ID -> 在 traces_from / traces_to 中引用它的文档路径
+
+    head 状态以 base 为父状态，只保存被变更覆盖的项。
+    """
+
+    def __init__(self, parent: "GraphState" = None):
+        self.parent = parent
+        self.documents = {}
+        self.id_paths = {}
+        self.declarers = {}
+
+    def document(self, rel_path: str) -> TraceDocument:
+        if rel_path in self.documents:
+            return self.documents[rel_path]
+        return self.parent.document(rel_path) if self.parent else None
+
+    def paths_of(self, doc_id: str) -> tuple:
+        if doc_id in self.id_paths:
+            return self.id_paths[doc_id]
+        return self.parent.paths_of(doc_id) if self.parent else ()
+
+    def declaring(self, ref: str) -> frozenset:
+        if ref in self.declarers:
+            return self.declarers[ref]
+        return self.parent.declaring(ref) if self.parent else frozenset()
+
+    def exists(self, doc_id: str) -> bool:
+        return bool(self.paths_of(doc_id))
+
+    def winner(self, doc_id: str) -> TraceDocument:
+        """ID 对应的生效文档"""
+        paths = self.paths_of(doc_id)
+        return self.document(paths[-1]) if paths else None
+
+    def is_winner(self, rel_path: str, doc: TraceDocument) -> bool:
+        paths = self.paths_of(doc.id)
+        return bool(paths) and paths[-1] == rel_path
+
+    @classmethod
+    def build(cls, documents: list) -> "GraphState":
+        """由 (路径, 文档) 列表构建完整状态"""
+        state = cls()
+        declarers = {}
+        for rel_path, doc in documents:
+            state.documents[rel_path] = doc
+            state.id_paths.setdefault(doc.id, []).append(rel_path)
+            for ref in set(doc.traces_from + doc.traces_to):
+                declarers.setdefault(ref, []).append(rel_path)
+        state.id_paths = {doc_id: tuple(sorted(paths, key=scan_order)) if len(paths) > 1
+                          else (paths[0],) for doc_id, paths in state.id_paths.items()}
+        state.declarers = {ref: frozenset(paths) for ref, paths in declarers.items()}
+        return state
+
+    def apply(self, changes: list) -> "GraphState":
+        """应用文档变更 [(路径, 旧文档, 新文档)]，返回以当前状态为父状态的新状态"""
+        head = GraphState(parent=self)
+        changed_paths = {rel_path for rel_path, _, _ in changes}
+        ids = set()
+        refs = set()
+        for rel_path, old, new in changes:
+            head.documents[rel_path] = new
+            for doc in (old, new):
+                if doc is not None:
+                    ids.add(doc.id)
+                    refs.update(doc.traces_from + doc.traces_to)
+
+        for doc_id in ids:
+            paths = [p for p in self.paths_of(doc_id) if p not in changed_paths]
+            paths += [rel_path for rel_path, _, new in changes if new is not None and new.id == doc_id]
+            head.id_paths[doc_id] = tuple(sorted(paths, key=scan_order))
+        for ref in refs:
+            paths = {p for p in self.declaring(ref) if p not in changed_paths}
+            paths.update(rel_path for rel_path, _, new in changes
+                         if new is not None and (ref in new.traces_from or ref in new.traces_to))
+            head.declarers[ref] = frozenset(paths)
+        return head
+
+    # ---------- 局部查询 ----------
+
+    def edges_at(self, doc_id: str) -> dict:
+        """与文档相连的全部追溯边：(上游 ID, 下游 ID) -> 声明来源标记"""
+        doc = self.winner(doc_id)
+        if doc is None:
+            return {}
+        edges = {}
+        for ref in doc.traces_to:
+            if self.exists(ref):
+                edges[(doc_id, ref)] = edges.get((doc_id, ref), 0) | DECLARED_BY_TRACES_TO
+        for ref in doc.traces_from:
+            if self.exists(ref):
+                edges[(ref, doc_id)] = edges.get((ref, doc_id), 0) | DECLARED_BY_TRACES_FROM
+        for rel_path in self.declaring(doc_id):
+            other = self.document(rel_path)
+            if other is None or not self.is_winner(rel_path, other):
+                continue
+            if doc_id in other.traces_to:
+                key = (other.id, doc_id)
+                edges[key] = edges.get(key, 0) | DECLARED_BY_TRACES_TO
+            if doc_id in other.traces_from:
+                key = (doc_id, other.id)
+                edges[key] = edges.get(key, 0) | DECLARED_BY_TRACES_FROM
+        return edges
+
+    def broken_links(self, rel_path: str) -> set:
+        """文档的断链（validate_trace 语义：非 L1 文档 traces_from 引用的 ID 不存在）"""
+        doc = self.document(rel_path)
+        if doc is None or doc.layer == LAYER_ORDER[0] or not self.is_winner(rel_path, doc):
+            return set()
+        return {(doc.id, ref) for ref in doc.traces_from if not self.exists(ref)}
+
+
+# ============ 读取 revision ============
+
+def load_state(reader: ObjectReader, revision: str, cache: BlobMetadataCache) -> GraphState:
+    """遍历 revision 的层级目录，构建完整文档状态"""
+    documents = []
+    for rel_path, mode, oid in reader.walk_tree(revision, set(LAYER_DIRECTORIES.values())):
+        if mode == MODE_TREE or document_layer(rel_path) is None:
+            continue
+        doc = make_document(rel_path, cache.metadata(reader, oid))
+        if doc is not None:
+            documents.append((rel_path, doc))
+    return GraphState.build(documents)
+
+
+def document_changes(reader: ObjectReader, base: str, head: str, state: GraphState,
+                     cache: BlobMetadataCache) -> tuple:
+    """两个 revision 间的文档变更，返回 (变更文件数, [(路径, 旧文档, 新文档)])"""
+    files = 0
+    changes = []
+    for rel_path, old_oid, new_oid in reader.diff_trees(base, head,
+                                                        set(LAYER_DIRECTORIES.values())):
+        if document_layer(rel_path) is None:
+            continue
+        files += 1
+        old = state.document(rel_path) if old_oid else None
+        new = make_document(rel_path, cache.metadata(reader, new_oid)) if new_oid else None
+        if old is None and new is None:
+            continue
+        if (old is not None and new is not None and old.id == new.id and
+                old.traces_from == new.traces_from and old.traces_to == new.traces_to):
+            continue  # 只改正文，追溯关系不变
+        changes.append((rel_path, old, new))
+    return files, changes
+
+
+# ============ 差异计算 ============
+
+def declared_by(flags: int) -> list:
+    result = []
+    if flags & DECLARED_BY_TRACES_TO:
+        result.append("traces_to")
+    if flags & DECLARED_BY_TRACES_FROM:
+        result.append("traces_from")
+    return result
+
+
+def describe(state: GraphState, doc_id: str) -> dict:
+    doc = state.winner(doc_id)
+    return {"id": doc_id, "layer": doc.layer, "file": doc.file}
+
+
+def diff_states(base: GraphState, head: GraphState, changes: list) -> dict:
+    """只在变更文档及其直接追溯邻居上比较两个状态"""
+    affected = set()
+    for _, old, new in changes:
+        for doc in (old, new):
+            if doc is not None:
+                affected.add(doc.id)
+
+    # 追溯边：两端之一的声明或存在性变化才会改变边，均落在 affected 上
+    base_edges = {}
+    head_edges = {}
+    for doc_id in affected:
+        base_edges.update(base.edges_at(doc_id))
+        head_edges.update(head.edges_at(doc_id))
+    added = sorted(key for key in head_edges if key not in base_edges)
+    removed = sorted(key for key in base_edges if key not in head_edges)
+    redeclared = sorted(key for key in head_edges
+                        if key in base_edges and head_edges[key] != base_edges[key])
+
+    # 孤立文档：只有变更文档与增删边的端点可能改变
+    candidates = set(affected)
+    for source, target in added + removed:
+        candidates.update((source, target))
+    base_orphans = {doc_id for doc_id in candidates
+                    if base.exists(doc_id) and not base.edges_at(doc_id)}
+    head_orphans = {doc_id for doc_id in candidates
+                    if head.exists(doc_id) and not head.edges_at(doc_id)}
+
+    # 断链：变更文档自身，以及引用了存在性变化的 ID 的文档
+    paths = set()
+    for doc_id in affected:
+        for state in (base, head):
+            paths.update(state.paths_of(doc_id))
+            paths.update(state.declaring(doc_id))
+    base_broken = set()
+    head_broken = set()
+    for rel_path in paths:
+        base_broken |= base.broken_links(rel_path)
+        head_broken |= head.broken_links(rel_path)
+
+    documents_added = sorted(doc_id for doc_id in affected
+                             if head.exists(doc_id) and not base.exists(doc_id))
+    documents_removed = sorted(doc_id for doc_id in affected
+                               if base.exists(doc_id) and not head.exists(doc_id))
+    documents_modified = sorted(doc_id for doc_id in affected
+                                if base.exists(doc_id) and head.exists(doc_id))
+
+    return {
+        "documents": {
+            "added": [describe(head, doc_id) for doc_id in documents_added],
+            "removed": [describe(base, doc_id) for doc_id in documents_removed],
+            "modified": [describe(head, doc_id) for doc_id in documents_modified]
+        },
+        "edges": {
+            "added": [{"from": s, "to": t, "declared_by": declared_by(head_edges[(s, t)])}
+                      for s, t in added],
+            "removed": [{"from": s, "to": t, "declared_by": declared_by(base_edges[(s, t)])}
+                        for s, t in removed],
+            "redeclared": [{"from": s, "to": t,
+                            "base_declared_by": declared_by(base_edges[(s, t)]),
+                            "head_declared_by": declared_by(head_edges[(s, t)])}
+                           for s, t in redeclared]
+        },
+        "orphans": {
+            "new": [describe(head, doc_id) for doc_id in sorted(head_orphans - base_orphans)],
+            "resolved": [describe(head, doc_id) for doc_id in sorted(base_orphans - head_orphans)
+                         if head.exists(doc_id)]
+        },
+        "broken_links": {
+            "new": [{"document": d, "reference": r} for d, r in sorted(head_broken - base_broken)],
+            "resolved": [{"document": d, "reference": r}
+                         for d, r in sorted(base_broken - head_broken)]
+        }
+    }
+
+
+# ============ Mermaid 输出 ============
+
+def render_mermaid(diff: dict, base: str, head: str, layers: dict) -> str:
+    """按 rules_mermaid.md 生成差异图：实线为新增边，虚线为删除的边与断链"""
+    notes = {item["id"]: "新增孤立" for item in diff["orphans"]["new"]}
+    notes.update((item["id"], "新增文档") for item in diff["documents"]["added"])
+    notes.update((item["id"], "已删除") for item in diff["documents"]["removed"])
+    node_ids = {}  # (文档 ID, 是否缺失) -> 节点 ID
+    nodes = []     # (节点 ID, 标签, 层级；缺失文档为 None)
+    links = []     # (注释分组, 语句)
+    omitted = 0
+
+    def node(doc_id: str, missing: bool = False) -> str:
+        key = (doc_id, missing)
+        if key not in node_ids:
+            node_id = ("M_" if missing else "N_") + re.sub(r'[^A-Za-z0-9_]', '_', doc_id)
+            if node_id in node_ids.values():
+                node_id += f"_{len(node_ids)}"
+            node_ids[key] = node_id
+            label = doc_id.replace('"', '#quot;')
+            if missing:
+                label += "<br/>（不存在）"
+            elif doc_id in notes:
+                label += f"<br/>{notes[doc_id]}"
+            nodes.append((node_id, label, None if missing else layers[doc_id]))
+        return node_ids[key]
+
+    def fits(*keys) -> bool:
+        pending = {key for key in keys if key not in node_ids}
+        return len(node_ids) + len(pending) <= MERMAID_MAX_NODES
+
+    for title, edges, arrow in (("新增追溯边", diff["edges"]["added"], "-->|新增|"),
+                                ("删除的追溯边", diff["edges"]["removed"], "-.->|删除|")):
+        for edge in edges:
+            if not fits((edge["from"], False), (edge["to"], False)):
+                omitted += 1
+                continue
+            links.append((title, f"{node(edge['from'])} {arrow} {node(edge['to'])}"))
+    for link in diff["broken_links"]["new"]:
+        if not fits((link["reference"], True), (link["document"], False)):
+            omitted += 1
+            continue
+        # 与追溯方向一致：缺失的上游 → 引用它的文档
+        links.append(("新增断链",
+                      f"{node(link['reference'], True)} -.->|断链| {node(link['document'])}"))
+    # 没有增删边的孤立文档与增删文档单独列出
+    for doc_id in sorted(notes):
+        if (doc_id, False) in node_ids:
+            continue
+        if not fits((doc_id, False)):
+            omitted += 1
+            continue
+        node(doc_id)
+
+    lines = [
+        "%%{init: {'theme': 'base', 'themeVariables': { 'lineColor': '#000000', "
+        "'arrowheadColor': '#000000' }}}%%",
+        "%% ========================================",
+        f"%% 追溯关系图差异：{base} → {head}",
+        "%% 实线：新增追溯边；虚线：删除的追溯边 / 新增断链",
+        "%% ========================================",
+    ]
+    if omitted:
+        lines.append(f"%% 另有 {omitted} 项变更未显示（节点数上限 {MERMAID_MAX_NODES}），"
+                     "完整差异见 JSON 输出")
+    lines.append("flowchart TB")
+
+    frames = []
+    for layer in LAYER_ORDER:
+        members = [(node_id, label) for node_id, label, node_layer in nodes
+                   if node_layer == layer]
+        if not members:
+            continue
+        frames.append(f"G_{layer}")
+        lines.append(f'    subgraph G_{layer}["{LAYER_TITLES[layer]}"]')
+        lines.append("        direction LR")
+        lines += [f'        {node_id}["{label}"]' for node_id, label in members]
+        lines.append("    end")
+    lines += [f'    {node_id}["{label}"]' for node_id, label, node_layer in nodes
+              if node_layer is None]
+
+    current = None
+    for title, statement in links:
+        if title != current:
+            lines += ["", f"    %% {title}"]
+            current = title
+        lines.append(f"    {statement}")
+
+    lines += [
+        "",
+        "    %% 样式定义",
+        "    classDef frameStyle fill:#fafafa,stroke:#424242,stroke-width:2px,color:#000",
+        "    classDef stepStyle fill:#fff,stroke:#424242,stroke-width:2px,color:#000",
+        "    classDef outputStyle fill:#fff3e0,stroke:#ff9800,stroke-width:2px,color:#000",
+        "    classDef outputHighStyle fill:#ffccbc,stroke:#ff5722,stroke-width:2px,color:#000",
+    ]
+    if links:
+        lines.append("    linkStyle default stroke:#000,stroke-width:2px")
+    # 文档按产物类型着色：FR/SA/DD 为 Output，实现与测试用例为 Output 高亮
+    styles = (
+        ("frameStyle", frames),
+        ("outputStyle", [n for n, _, layer in nodes if layer in ("L1", "L2", "L3")]),
+        ("outputHighStyle", [n for n, _, layer in nodes if layer in ("L4", "L5")]),
+        ("stepStyle", [n for n, _, layer in nodes if layer is None])
+    )
+    lines += ["", "    %% 应用样式"]
+    lines += [f"    class {','.join(members)} {style}" for style, members in styles if members]
+    return "\n".join(lines) + "\n"
+
+
+def node_layers(diff: dict, base: GraphState, head: GraphState) -> dict:
+    """差异图中出现的文档 -> 层级"""
+    ids = {item["id"] for item in diff["orphans"]["new"]}
+    ids.update(item["id"] for group in ("added", "removed") for item in diff["documents"][group])
+    ids.update(link["document"] for link in diff["broken_links"]["new"])
+    for edge in diff["edges"]["added"] + diff["edges"]["removed"]:
+        ids.update((edge["from"], edge["to"]))
+    return {doc_id: (head.winner(doc_id) or base.winner(doc_id)).layer for doc_id in ids}
+
+
+# ============ 入口 ============
+
+def trace_diff(project_root: str, base: str, head: str, cache: BlobMetadataCache) -> tuple:
+    """计算两个 revision 间的追溯关系图差异，返回 (差异, 图中文档层级)"""
+    with ObjectReader(project_root) as reader:
+        base_commit = reader.read(base + "^{commit}")[0]
+        head_commit = reader.read(head + "^{commit}")[0]
+        base_state = load_state(reader, base_commit, cache)
+        files, changes = document_changes(reader, base_commit, head_commit, base_state, cache)
+    head_state = base_state.apply(changes)
+
+    diff = diff_states(base_state, head_state, changes)
+    base_count = len(base_state.id_paths)
+    head_count = (base_count + len(diff["documents"]["added"]) -
+                  len(diff["documents"]["removed"]))
+    diff["summary"] = {
+        "base_documents": base_count,
+        "head_documents": head_count,
+        "changed_files": files,
+        "documents_added": len(diff["documents"]["added"]),
+        "documents_removed": len(diff["documents"]["removed"]),
+        "documents_modified": len(diff["documents"]["modified"]),
+        "edges_added": len(diff["edges"]["added"]),
+        "edges_removed": len(diff["edges"]["removed"]),
+        "new_orphans": len(diff["orphans"]["new"]),
+        "new_broken_links": len(diff["broken_links"]["new"]),
+        "resolved_broken_links": len(diff["broken_links"]["resolved"])
+    }
+    diff["base"] = {"revision": base, "commit": base_commit}
+    diff["head"] = {"revision": head, "commit": head_commit}
+    return diff, node_layers(diff, base_state, head_state)
+
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(
+        description='比较两个 git revision 间的追溯关系图（不检出工作区）',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--base', required=True,
+                        help='基线 revision')
+    parser.add_argument('--head', default='HEAD',
+                        help='对比 revision')
+    parser.add_argument('--project-root', default='.',
+                        help='git 仓库根目录')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT,
+                        help='输出路径')
+    parser.add_argument('--mermaid', default=DEFAULT_MERMAID_OUTPUT,
+                        help='Mermaid 输出路径')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH,
+                        help='按对象 ID 的元数据缓存路径')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='禁用元数据缓存')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+
+    cache = BlobMetadataCache(None if args.no_cache else args.cache).load()
+    try:
+        diff, layers = trace_diff(os.path.abspath(args.project_root), args.base, args.head,
+                                  cache)
+    except GitError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    try:
+        cache.save()
+    except OSError as e:
+        print(f"Warning: Cannot save cache: {e}", file=sys.stderr)
+
+    summary = diff["summary"]
+    if summary["new_broken_links"]:
+        status = "failed"
+    elif summary["new_orphans"]:
+        status = "warning"
+    else:
+        status = "passed"
+
+    output = {
+        "script": "trace_diff",
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "status": status,
+        "project_root": os.path.abspath(args.project_root),
+        "base": diff.pop("base"),
+        "head": diff.pop("head"),
+        "summary": diff.pop("summary"),
+        **diff,
+        "mermaid_output": args.mermaid
+    }
+
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+
+    mermaid_path = Path(args.mermaid)
+    mermaid_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(mermaid_path, 'w', encoding='utf-8') as f:
+        f.write(render_mermaid(output, args.base, args.head, layers))
+
+    print(f"Trace Graph Diff - {args.base} → {args.head}")
+    print("=" * 50)
+    print(f"  Documents: {summary['base_documents']} → {summary['head_documents']} "
+          f"(+{summary['documents_added']} -{summary['documents_removed']} "
+          f"~{summary['documents_modified']})")
+    print(f"  Edges: +{summary['edges_added']} -{summary['edges_removed']}")
+    print(f"  New orphans: {summary['new_orphans']}")
+    print(f"  Broken links: +{summary['new_broken_links']} "
+          f"-{summary['resolved_broken_links']}")
+    print("=" * 50)
+    print(f"Status: {status}")
+    print(f"Results written to: {output_path}")
+    print(f"Mermaid written to: {mermaid_path}")
+
+    return 3 if status == "failed" else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
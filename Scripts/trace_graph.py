@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+追溯关系图模块
+
+功能：基于 traces_from / traces_to 构建 L1-L5 文档有向图（方向为上游 → 下游），
+一次性建立正向/反向邻接索引，以线性时间回答层级覆盖查询，并检测：
+    - 孤立文档（无任何追溯边）
+    - 循环追溯（强连通分量）
+    - 跨层追溯边（跳过存在文档的中间层级）
+    - 单向追溯（A traces_to B 但 B 未 traces_from A，或反之）
+
+所有分析均为 O(V+E)，检测明细逐条产生（不在内存中汇总）。文档以 __slots__
+记录保存（ID 与引用字符串驻留共享），节点属性与邻接关系存放在连续的整数数组中
+（CSR 压缩行格式），适用于百万级文档。
+
+Usage:
+    from trace_graph import TraceDocument, TraceGraph
+
+    documents = [TraceDocument("FR_core_001", "L1_Requirements/FR_core_001_x.md", "L1",
+                               traces_to=["SA_core_001"])]
+    graph = TraceGraph(documents)
+    coverage = graph.coverage("L1", "L5")
+    analysis = graph.analyze(lambda category, item: print(category, item))
+
+Author: ArchPilot Core Framework
+Date: 2026-10-18
+"""
+
+import sys
+from array import array
+from collections import deque
+
+from repo_index import LAYER_ORDER
+
+
+# ============ 配置常量 ============
+
+# 边的声明来源标记
+DECLARED_BY_TRACES_TO = 1
+DECLARED_BY_TRACES_FROM = 2
+
+# 允许直接追溯任意上游层级的层级（测试用例可直接验证需求，见 tpl_testcase.md）
+SKIP_EXEMPT_LAYERS = ["L5"]
+
+
+# ============ 辅助函数 ============
+
+def normalize_refs(value) -> list:
+    """将 traces_from / traces_to 字段统一为引用列表"""
+    if isinstance(value, str):
+        return [value] if value else []
+    if not value:
+        return []
+    return [ref for ref in value if ref]
+
+
+# ============ 文档记录 ============
+
+class TraceDocument:
+    """追溯文档记录（ID、所在文件、层级与规范化后的引用）
+
+    ID 与引用经 sys.intern 驻留：引用同一文档的所有字符串共享一个对象，
+    引用字段存为元组而非列表。
+    """
+
+    __slots__ = ("id", "file", "layer", "traces_from", "traces_to")
+
+    def __init__(self, doc_id: str, file: str, layer: str,
+                 traces_from=None, traces_to=None):
+        self.id = sys.intern(doc_id)
+        self.file = file
+        self.layer = sys.intern(layer)
+        self.traces_from = intern_refs(traces_from)
+        self.traces_to = intern_refs(traces_to)
+
+    def __repr__(self) -> str:
+        return f"TraceDocument({self.id!r}, {self.file!r}, {self.layer!r})"
+
+
+def intern_refs(value) -> tuple:
+    """规范化并驻留引用列表"""
+    if not value:
+        return ()
+    if isinstance(value, str):
+        return (sys.intern(value),)
+    return tuple(map(sys.intern, filter(None, value)))
+
+
+# ============ 邻接数组 ============
+
+class Adjacency:
+    """CSR 压缩行邻接表：节点 n 的邻居为 targets[offsets[n]:offsets[n + 1]]"""
+
+    __slots__ = ("offsets", "targets")
+
+    def __init__(self, offsets: array, targets: array):
+        self.offsets = offsets
+        self.targets = targets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, node: int) -> array:
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def degree(self, node: int) -> int:
+        return self.offsets[node + 1] - self.offsets[node]
+
+    def transpose(self) -> "Adjacency":
+        """计数排序构建反向邻接表（每行按节点下标有序）"""
+        node_count = len(self)
+        offsets = array('l', [0]) * (node_count + 1)
+        for target in self.targets:
+            offsets[target + 1] += 1
+        for node in range(node_count):
+            offsets[node + 1] += offsets[node]
+        fill = offsets[:-1]
+        targets = array('l', self.targets)
+        source_offsets = self.offsets
+        source_targets = self.targets
+        for source in range(node_count):
+            for position in range(source_offsets[source], source_offsets[source + 1]):
+                target = source_targets[position]
+                targets[fill[target]] = source
+                fill[target] += 1
+        return Adjacency(offsets, targets)
+
+
+# ============ 追溯图 ============
+
+class TraceGraph:
+    """文档追溯有向图（正向/反向 CSR 邻接数组）"""
+
+    def __init__(self, documents: list):
+        self.ids = []
+        self.docs = []
+        self.layers = array('b')
+        self.index = {}
+
+        for doc in documents:
+            doc_id = doc.id
+            if doc_id in self.index:
+                # 重复 ID 以后出现者为准，与 validate_trace 的字典语义一致
+                position = self.index[doc_id]
+                self.docs[position] = doc
+                self.layers[position] = LAYER_ORDER.index(doc.layer)
+                continue
+            self.index[doc_id] = len(self.ids)
+            self.ids.append(doc_id)
+            self.docs.append(doc)
+            self.layers.append(LAYER_ORDER.index(doc.layer))
+
+        # 悬空引用只计数：损坏项目可能有海量断链，明细由 validate_trace 流式输出
+        self.dangling = 0
+        self._build_edges()
+
+    # ---------- 构建 ----------
+
+    def _build_edges(self) -> None:
+        """由 traces_to / traces_from 声明构建去重后的 CSR 邻接数组
+
+        声明先按源节点计数排序，再逐行排序去重并合并声明来源标记，
+        全程只使用整数数组，不为每条边创建字典项或列表。
+        """
+        node_count = len(self.ids)
+        index = self.index
+
+        # 每条声明编码为 (目标下标 << 2) | 声明来源
+        sources = array('l')
+        codes = array('q')
+        for source, doc in enumerate(self.docs):
+            for ref in doc.traces_to:
+                target = index.get(ref)
+                if target is None:
+                    self.dangling += 1
+                    continue
+                sources.append(source)
+                codes.append(target << 2 | DECLARED_BY_TRACES_TO)
+
+            for ref in doc.traces_from:
+                upstream = index.get(ref)
+                if upstream is None:
+                    self.dangling += 1
+                    continue
+                sources.append(upstream)
+                codes.append(source << 2 | DECLARED_BY_TRACES_FROM)
+
+        row_offsets = array('l', [0]) * (node_count + 1)
+        for source in sources:
+            row_offsets[source + 1] += 1
+        for node in range(node_count):
+            row_offsets[node + 1] += row_offsets[node]
+        fill = row_offsets[:-1]
+        rows = array('q', codes)
+        for source, code in zip(sources, codes):
+            rows[fill[source]] = code
+            fill[source] += 1
+        del sources, codes, fill
+
+        offsets = array('l', [0]) * (node_count + 1)
+        targets = array('l')
+        flags = bytearray()
+        for node in range(node_count):
+            start = row_offsets[node]
+            end = row_offsets[node + 1]
+            if end - start == 1:
+                code = rows[start]
+                targets.append(code >> 2)
+                flags.append(code & 3)
+                offsets[node + 1] = len(targets)
+                continue
+            previous = -1
+            for code in sorted(rows[start:end]):
+                target = code >> 2
+                if target == previous:
+                    flags[-1] |= code & 3
+                    continue
+                targets.append(target)
+                flags.append(code & 3)
+                previous = target
+            offsets[node + 1] = len(targets)
+
+        self.forward = Adjacency(offsets, targets)
+        self.reverse = self.forward.transpose()
+        self.edge_flags = flags
+
+    @property
+    def node_count(self) -> int:
+        return len(self.ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.edge_flags)
+
+    def edges(self):
+        """按源节点顺序遍历 (source, target, flags) 三元组"""
+        offsets = self.forward.offsets
+        targets = self.forward.targets
+        flags = self.edge_flags
+        for source in range(self.node_count):
+            for position in range(offsets[source], offsets[source + 1]):
+                yield source, targets[position], flags[position]
+
+    # ---------- 可达性 ----------
+
+    def reachable(self, starts, direction: str = "down") -> set:
+        """多源 BFS，返回从 starts 出发可达的节点下标集合（含起点）"""
+        adjacency = self.forward if direction == "down" else self.reverse
+        visited = set(starts)
+        queue = deque(visited)
+        while queue:
+            node = queue.popleft()
+            for neighbor in adjacency[node]:
+                if neighbor not in visited:
+                    visited.add(neighbor)
+                    queue.append(neighbor)
+        return visited
+
+    def layer_nodes(self, layer: str) -> list:
+        """指定层级的节点下标"""
+        layer_index = LAYER_ORDER.index(layer)
+        return [node for node, value in enumerate(self.layers) if value == layer_index]
+
+    def coverage(self, from_layer: str, to_layer: str) -> dict:
+        """L_x → L_y 覆盖率：from 层中存在追溯路径到达 to 层的文档比例
+
+        从 to 层全部节点做一次反向多源 BFS，整体为线性时间。
+        from 层高于 to 层时（如 L5 → L1）沿上游方向查询。
+        """
+        sources = self.layer_nodes(from_layer)
+        targets = self.layer_nodes(to_layer)
+
+        if LAYER_ORDER.index(from_layer) <= LAYER_ORDER.index(to_layer):
+            can_reach = self.reachable(targets, direction="up")
+        else:
+            can_reach = self.reachable(targets, direction="down")
+
+        if from_layer == to_layer:
+            covered = list(sources)
+        else:
+            covered = [node for node in sources if node in can_reach]
+        covered_set = set(covered)
+        uncovered = [self.ids[node] for node in sources if node not in covered_set]
+
+        percentage = round(len(covered) / len(sources) * 100, 2) if sources else 0
+        return {
+            "from": from_layer,
+            "to": to_layer,
+            "total": len(sources),
+            "covered": len(covered),
+            "percentage": percentage,
+            "uncovered": uncovered
+        }
+
+    # ---------- 结构检测 ----------
+
+    def orphans(self):
+        """逐个产生无任何追溯边（入边与出边均为空）的文档 ID（按节点顺序）"""
+        forward = self.forward
+        reverse = self.reverse
+        for node in range(self.node_count):
+            if not forward.degree(node) and not reverse.degree(node):
+                yield self.ids[node]
+
+    def strongly_connected_components(self) -> list:
+        """迭代式 Tarjan 强连通分量，按逆拓扑序返回（下游分量先于上游分量）"""
+        node_count = self.node_count
+        offsets = self.forward.offsets
+        targets = self.forward.targets
+        indices = [-1] * node_count
+        lowlink = [0] * node_count
+        on_stack = [False] * node_count
+        stack = []
+        components = []
+        counter = 0
+
+        for root in range(node_count):
+            if indices[root] != -1:
+                continue
+            work = [(root, offsets[root])]
+            while work:
+                node, position = work.pop()
+                if indices[node] == -1:
+                    indices[node] = lowlink[node] = counter
+                    counter += 1
+                    stack.append(node)
+                    on_stack[node] = True
+
+                recurse = False
+                end = offsets[node + 1]
+                while position < end:
+                    neighbor = targets[position]
+                    position += 1
+                    if indices[neighbor] == -1:
+                        work.append((node, position))
+                        work.append((neighbor, offsets[neighbor]))
+                        recurse = True
+                        break
+                    if on_stack[neighbor]:
+                        lowlink[node] = min(lowlink[node], indices[neighbor])
+                if recurse:
+                    continue
+
+                if lowlink[node] == indices[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+
+        return components
+
+    def cycles(self):
+        """逐个产生循环追溯：规模 > 1 或含自环的强连通分量（分量内 ID 有序）"""
+        forward = self.forward
+        for component in self.strongly_connected_components():
+            if len(component) > 1 or component[0] in forward[component[0]]:
+                yield sorted(self.ids[member] for member in component)
+
+    def layer_skipping_edges(self):
+        """逐条产生跨层追溯边：下游层级与上游层级之间存在含文档的中间层级"""
+        populated = set(self.layers)
+        exempt = {LAYER_ORDER.index(layer) for layer in SKIP_EXEMPT_LAYERS}
+        for source, target, _ in self.edges():
+            source_layer = self.layers[source]
+            target_layer = self.layers[target]
+            if target_layer - source_layer <= 1 or target_layer in exempt:
+                continue
+            skipped = [LAYER_ORDER[layer] for layer in range(source_layer + 1, target_layer)
+                       if layer in populated]
+            if skipped:
+                yield {
+                    "from": self.ids[source],
+                    "to": self.ids[target],
+                    "skipped_layers": skipped
+                }
+
+    def asymmetric_links(self):
+        """逐条产生单向追溯：仅由一端声明的边"""
+        for source, target, flags in self.edges():
+            if flags == DECLARED_BY_TRACES_TO:
+                missing = "traces_from"
+            elif flags == DECLARED_BY_TRACES_FROM:
+                missing = "traces_to"
+            else:
+                continue
+            yield {
+                "from": self.ids[source],
+                "to": self.ids[target],
+                "missing": missing
+            }
+
+    def analyze(self, report=None) -> dict:
+        """结构检测：明细逐条交给 report(类别, 明细)，返回各类计数
+
+        类别为 "orphans"（明细为文档 ID）、"cycles"（ID 列表）、
+        "layer_skipping_edges" 与 "asymmetric_links"（边记录）。明细不在内存中
+        汇总，结果大小与项目规模无关。
+        """
+        counts = {
+            "nodes": self.node_count,
+            "edges": self.edge_count,
+            "dangling_references": self.dangling
+        }
+        findings = (("orphans", self.orphans()),
+                    ("cycles", self.cycles()),
+                    ("layer_skipping_edges", self.layer_skipping_edges()),
+                    ("asymmetric_links", self.asymmetric_links()))
+        for category, items in findings:
+            counts[category] = 0
+            for item in items:
+                counts[category] += 1
+                if report is not None:
+                    report(category, item)
+        return counts
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+变更影响分析脚本
+
+功能：基于 validate_trace 文档模型预计算追溯图的传递闭包并持久化，
+支持按文档 ID 查询下游受影响文档（如 FR 变更影响哪些 SA/DD/L4/TC）
+与上游归属文档（如失败的 TC 归属哪些需求）
+
+闭包按强连通分量压缩后在拓扑序上合并计算，持久化到 ./out/ 下的索引文件；
+加载后单次 ID 查询为字典查找 + 结果拼装，耗时在亚毫秒级。
+
+索引新鲜度校验：默认遍历层级目录并 stat 全部追溯文档，与索引中记录的文件状态
+指纹（相对路径、大小、修改时间）比对，一致时直接使用索引，不读取任何文档；
+不一致时经元数据缓存只重新解析变更文档，追溯关系未变则只更新指纹，不重算闭包。
+校验耗时随文档数线性增长，唯一不访问文档的快速路径是 --skip-verify；
+多个 ID 请在一次调用中重复 --id 指定，共享一次校验。
+
+Usage:
+    python3 trace_impact.py --id FR_core_001 --direction downstream --layer L5
+    python3 trace_impact.py --id TC_core_001 --direction upstream --layer L1
+    python3 trace_impact.py --rebuild
+    python3 trace_impact.py --id FR_core_001 --skip-verify
+
+Arguments:
+    --id ID             查询的文档 ID（可重复指定）
+    --direction DIR     查询方向：downstream/upstream/both（默认 both）
+    --layer LAYER       仅输出指定层级的结果（可重复指定）
+    --index PATH        闭包索引路径（默认 ./out/trace_impact_index.json）
+    --rebuild           强制重建闭包索引
+    --skip-verify       跳过索引新鲜度校验，直接使用已持久化的索引；唯一不访问文档的
+                        快速路径（文档变更后索引可能过期，默认校验需 stat 全部追溯文档）
+    --output PATH       输出路径（默认 ./out/trace_impact.json）
+    --project-root DIR  项目根目录
+    --help              显示帮助
+
+Exit Codes:
+    0 - 成功
+    1 - 参数错误
+    2 - 依赖错误（索引不存在等）
+    3 - 查询的文档 ID 不存在
+
+Author: ArchPilot Core Framework
+Date: 2026-10-18
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from metadata_cache import DEFAULT_CACHE_PATH, MetadataCache
+from repo_index import LAYER_ORDER, scan_project
+from trace_graph import TraceGraph
+from validate_trace import collect_layer_documents
+
+
+# ============ 配置常量 ============
+
+INDEX_VERSION = 1
+
+DEFAULT_INDEX_PATH = "./out/trace_impact_index.json"
+
+DIRECTIONS = ["downstream", "upstream", "both"]
+
+
+# ============ 闭包计算 ============
+
+def documents_signature(documents: list) -> str:
+    """文档追溯模型指纹（ID、层级、追溯字段），用于判断索引是否过期"""
+    digest = hashlib.sha1()
+    for doc in sorted(documents, key=lambda d: d.id):
+        digest.update("\x1f".join([
+            doc.id,
+            doc.layer,
+            ",".join(doc.traces_from),
+            ",".join(doc.traces_to)
+        ]).encode("utf-8"))
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
+
+def documents_stamp(index) -> str:
+    """追溯文档文件状态指纹（相对路径、大小、修改时间），只 stat 不读取文件"""
+    stamp = "\x1e".join(f"{entry.rel_path}|{entry.size}|{entry.mtime!r}"
+                        for layer in LAYER_ORDER for entry in index.documents(layer))
+    return hashlib.sha1(stamp.encode("utf-8", "surrogateescape")).hexdigest()
+
+
+def _component_closure(graph: TraceGraph, components: list, adjacency: list) -> list:
+    """在分量 DAG 上按拓扑序合并可达集合，返回每个节点的可达节点下标（不含自身）
+
+    components 需满足：任一分量的后继分量均排在其之前。
+    """
+    component_of = [0] * graph.node_count
+    for position, component in enumerate(components):
+        for member in component:
+            component_of[member] = position
+
+    # reach[c] = 分量 c 的成员 ∪ 其全部后继分量的成员
+    reach = [None] * len(components)
+    closure = [None] * graph.node_count
+    for position, component in enumerate(components):
+        merged = set(component)
+        for member in component:
+            for neighbor in adjacency[member]:
+                target = component_of[neighbor]
+                if target != position:
+                    merged |= reach[target]
+        reach[position] = merged
+        for member in component:
+            closure[member] = sorted(merged - {member})
+    return closure
+
+
+def compute_closure(graph: TraceGraph) -> tuple:
+    """计算下游/上游传递闭包"""
+    components = graph.strongly_connected_components()
+    # Tarjan 输出为逆拓扑序：下游分量在前，正向闭包可直接顺序合并
+    downstream = _component_closure(graph, components, graph.forward)
+    # 上游闭包需要反向图上的逆拓扑序，即正向拓扑序
+    upstream = _component_closure(graph, list(reversed(components)), graph.reverse)
+    return downstream, upstream
+
+
+# ============ 影响索引 ============
+
+class ImpactIndex:
+    """持久化的传递闭包索引"""
+
+    def __init__(self, ids: list, layers: list, downstream: list, upstream: list,
+                 signature: str = "", project_root: str = "", stamp: str = ""):
+        self.ids = ids
+        self.layers = layers
+        self.downstream_closure = downstream
+        self.upstream_closure = upstream
+        self.signature = signature
+        self.project_root = project_root
+        self.stamp = stamp
+        self.position = {doc_id: i for i, doc_id in enumerate(ids)}
+
+    @classmethod
+    def build(cls, documents: list, project_root: str = "", stamp: str = "") -> "ImpactIndex":
+        """由 validate_trace 文档列表构建索引（stamp 为文档文件状态指纹）"""
+        graph = TraceGraph(documents)
+        downstream, upstream = compute_closure(graph)
+        layers = [LAYER_ORDER[layer] for layer in graph.layers]
+        return cls(graph.ids, layers, downstream, upstream,
+                   documents_signature(documents), os.path.abspath(project_root), stamp)
+
+    @classmethod
+    def load(cls, index_path: str) -> "ImpactIndex":
+        """读取持久化索引，不存在或版本不兼容时返回 None"""
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("index_version") != INDEX_VERSION:
+            return None
+        return cls(data["ids"], data["layers"], data["downstream"], data["upstream"],
+                   data.get("signature", ""), data.get("project_root", ""),
+                   data.get("stamp", ""))
+
+    def save(self, index_path: str) -> None:
+        """原子写入索引文件"""
+        path = Path(index_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "index_version": INDEX_VERSION,
+                "project_root": self.project_root,
+                "signature": self.signature,
+                "stamp": self.stamp,
+                "ids": self.ids,
+                "layers": self.layers,
+                "downstream": self.downstream_closure,
+                "upstream": self.upstream_closure
+            }, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.position
+
+    def _select(self, nodes: list, layers) -> list:
+        if layers:
+            return [self.ids[node] for node in nodes if self.layers[node] in layers]
+        return [self.ids[node] for node in nodes]
+
+    def downstream(self, doc_id: str, layers=None) -> list:
+        """doc_id 变更时受影响的下游文档"""
+        position = self.position.get(doc_id)
+        if position is None:
+            return []
+        return self._select(self.downstream_closure[position], layers)
+
+    def upstream(self, doc_id: str, layers=None) -> list:
+        """doc_id 归属的上游文档"""
+        position = self.position.get(doc_id)
+        if position is None:
+            return []
+        return self._select(self.upstream_closure[position], layers)
+
+    def impact(self, doc_id: str, direction: str = "both", layers=None) -> dict:
+        """按方向组合查询结果"""
+        result = {"id": doc_id, "found": doc_id in self.position}
+        if result["found"]:
+            result["layer"] = self.layers[self.position[doc_id]]
+        if direction in ("downstream", "both"):
+            result["downstream"] = self.downstream(doc_id, layers)
+        if direction in ("upstream", "both"):
+            result["upstream"] = self.upstream(doc_id, layers)
+        return result
+
+
+def collect_documents(project_root: str, cache: MetadataCache = None,
+                      index=None) -> list:
+    """收集全部层级文档（validate_trace 文档模型）"""
+    documents = []
+    for layer in LAYER_ORDER:
+        documents.extend(collect_layer_documents(project_root, layer, cache, index))
+    return documents
+
+
+def load_or_build_index(project_root: str, index_path: str = DEFAULT_INDEX_PATH,
+                        rebuild: bool = False, verify: bool = True,
+                        cache: MetadataCache = None) -> tuple:
+    """加载闭包索引；过期或缺失时重建并持久化
+
+    校验先比对文档文件状态指纹（只 stat），一致时不读取任何文档；不一致时
+    收集文档模型比对追溯指纹，追溯关系未变只更新文件状态指纹。元数据缓存
+    只在需要收集文档时才读取（传入未加载的实例）。
+    返回 (索引, 是否遍历了项目文档)：调用方据此决定是否清理并保存元数据缓存。
+    """
+    index = None if rebuild else ImpactIndex.load(index_path)
+    if index is not None and not verify:
+        return index, False
+
+    repo_index = scan_project(project_root, pattern="*.md")
+    stamp = documents_stamp(repo_index)
+    fresh_root = index is not None and index.project_root == os.path.abspath(project_root)
+    if fresh_root and index.stamp == stamp:
+        return index, False
+
+    if cache is not None:
+        cache.load()
+    documents = collect_documents(project_root, cache, repo_index)
+    if fresh_root and index.signature == documents_signature(documents):
+        index.stamp = stamp
+    else:
+        index = ImpactIndex.build(documents, project_root, stamp)
+    index.save(index_path)
+    return index, True
+
+
+# ============ 命令行 ============
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(
+        description='追溯变更影响分析（基于预计算传递闭包）',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例:
+    python3 trace_impact.py --id FR_core_001 --direction downstream --layer L5
+    python3 trace_impact.py --id TC_core_001 --direction upstream --layer L1
+    python3 trace_impact.py --rebuild
+    python3 trace_impact.py --id FR_core_001 --skip-verify   # 快速路径：不校验索引
+        """
+    )
+    parser.add_argument('--id', dest='ids', action='append', default=[],
+                        help='查询的文档 ID（可重复指定）')
+    parser.add_argument('--direction', choices=DIRECTIONS, default='both',
+                        help='查询方向')
+    parser.add_argument('--layer', dest='layers', action='append',
+                        choices=LAYER_ORDER,
+                        help='仅输出指定层级的结果（可重复指定）')
+    parser.add_argument('--index', default=DEFAULT_INDEX_PATH,
+                        help='闭包索引路径')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='强制重建闭包索引')
+    parser.add_argument('--skip-verify', action='store_true',
+                        help='跳过索引新鲜度校验，直接使用已有索引（唯一不访问文档的快速路径；'
+                             '默认校验需 stat 全部追溯文档）')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH,
+                        help='元数据缓存文件路径')
+    parser.add_argument('--output', default='./out/trace_impact.json',
+                        help='输出路径')
+    parser.add_argument('--project-root', default='.',
+                        help='项目根目录')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+
+    if not args.ids and not args.rebuild:
+        print("Error: Must specify --id or --rebuild", file=sys.stderr)
+        return 1
+
+    if args.skip_verify and not os.path.exists(args.index):
+        print(f"Error: Impact index not found: {args.index}", file=sys.stderr)
+        return 2
+
+    cache = MetadataCache(args.cache, args.project_root)
+    index, collected = load_or_build_index(args.project_root, args.index, args.rebuild,
+                                           not args.skip_verify, cache)
+    # 只有收集过全部文档时才能判断哪些缓存记录已失效（指纹一致或 --skip-verify 时未收集）
+    if collected:
+        cache.prune()
+        cache.save()
+
+    results = [index.impact(doc_id, args.direction, args.layers) for doc_id in args.ids]
+    unknown = [r["id"] for r in results if not r["found"]]
+    status = "warning" if unknown else "success"
+
+    output = {
+        "script": "trace_impact",
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "status": status,
+        "project_root": os.path.abspath(args.project_root),
+        "direction": args.direction,
+        "layers": args.layers or LAYER_ORDER,
+        "index": {
+            "path": args.index,
+            "documents": len(index.ids),
+            "signature": index.signature
+        },
+        "results": results,
+        "summary": {
+            "queried": len(results),
+            "unknown_ids": unknown
+        }
+    }
+
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+
+    print(f"Impact analysis completed. Results written to: {output_path}")
+    for r in results:
+        if not r["found"]:
+            print(f"  {r['id']}: not found")
+            continue
+        counts = ", ".join(f"{key}={len(r[key])}" for key in ("downstream", "upstream") if key in r)
+        print(f"  {r['id']} ({r['layer']}): {counts}")
+
+    if unknown:
+        return 3
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
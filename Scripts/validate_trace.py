@@ -2,17 +2,39 @@
 """
 追溯关系验证脚本模板
 
-功能：验证 L1-L5 追溯关系的完整性
+功能：验证 L1-L5 追溯关系的完整性；可选为断链问题附带相近的现有文档 ID
+（suggestions），便于迁移后批量修正引用。可选扫描文档正文，比对正文提到的
+文档 ID 与声明的 traces_from / traces_to（见 body_refs.py）
 
 Usage:
     python3 validate_trace.py --full-chain --output result.json
     python3 validate_trace.py --from L1 --to L5
+    python3 validate_trace.py --staged
+    python3 validate_trace.py --changed-since origin/main
+    python3 validate_trace.py --full-chain --body-refs
+    python3 validate_trace.py --full-chain --graph
 
 Arguments:
     --full-chain    验证完整追溯链
-    --from LAYER    起始层级
+    --from LAYER    起始层级（与 --to 一起使用，查询层级间追溯覆盖率）
     --to LAYER      目标层级
     --output PATH   输出路径（默认 ./out/trace_validation.json）
+    --cache PATH    元数据缓存路径（默认 ./out/trace_metadata_cache.json）
+    --no-cache      禁用元数据缓存
+    --jobs N        并行解析进程数（默认自动检测 CPU 核数）
+    --stream        流式输出：验证过程中逐条写出 NDJSON 问题记录，最后写一条汇总记录
+                    （默认输出 ./out/trace_validation.ndjson），内存占用与问题数无关
+    --max-issues N  最多输出 N 条问题（统计仍覆盖全部问题）
+    --suggest       为断链问题附带相近的现有文档 ID（只为实际输出的问题查询）
+    --graph         追溯图结构检测（孤立文档、循环追溯、跨层追溯边、单向追溯）
+    --body-refs     扫描文档正文：正文提到其他层级文档但未声明追溯关系记为警告，
+                    已声明但正文未提到记为提示（info）；变更范围模式只扫描变更文档
+    --changed-since REF  只验证相对 REF 变更的文档及其直接追溯邻居（其余文档取自元数据缓存）
+    --staged        只验证暂存区中变更的文档及其直接追溯邻居（pre-commit 使用）
+    --watch         常驻监听模式，文档变更时仅重新检查受影响文档并输出单行 JSON
+    --poll          监听模式强制使用轮询（默认优先 inotify）
+    --profile       输出中附加 metrics 块（各阶段耗时、文件数、读取字节数、峰值内存）
+    --profile-output PATH  同时用 cProfile 记录并导出 pstats 文件
     --help          显示帮助
 
 Exit Codes:
@@ -30,88 +52,301 @@ import json
 import os
 import re
 import sys
+import time
 from datetime import datetime
 from pathlib import Path
 
+import metrics
+from front_matter import parse_front_matter
+from body_refs import check_body_references
+from metadata_cache import DEFAULT_CACHE_PATH, MetadataCache
+from git_changes import GitError, changed_files
+from id_suggest import IdSuggester
+from repo_index import (LAYER_DIRECTORIES, LAYER_ORDER, SPECIAL_FILES, get_index,
+                        index_paths, resolve_jobs, scan_project)
+from trace_graph import TraceDocument, TraceGraph
+from watch_mode import emit_event, run_watch
+
 
 # ============ 配置常量 ============
 
-LAYER_DIRECTORIES = {
-    "L1": "L1_Requirements",
-    "L2": "L2_Architecture",
-    "L3": "L3_DetailDesign",
-    "L4": "L4_Implementation",
-    "L5": "L5_Verification"
-}
+DEFAULT_OUTPUT = "./out/trace_validation.json"
+DEFAULT_STREAM_OUTPUT = "./out/trace_validation.ndjson"
 
-LAYER_ORDER = ["L1", "L2", "L3", "L4", "L5"]
+# 层级目录名 -> 层级
+DIRECTORY_LAYERS = {directory: layer for layer, directory in LAYER_DIRECTORIES.items()}
 
 
 # ============ 核心功能 ============
 
 def extract_yaml_metadata(file_path: Path) -> dict:
     """从 Markdown 文件中提取 YAML 元数据"""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        # 简单的 YAML front matter 解析
-        if content.startswith('---'):
-            end_index = content.find('---', 3)
-            if end_index != -1:
-                yaml_content = content[3:end_index].strip()
-                metadata = {}
-                for line in yaml_content.split('\n'):
-                    if ':' in line:
-                        key, value = line.split(':', 1)
-                        key = key.strip()
-                        value = value.strip()
-                        # 简单处理列表
-                        if value.startswith('[') and value.endswith(']'):
-                            value = [v.strip() for v in value[1:-1].split(',') if v.strip()]
-                        metadata[key] = value
-                return metadata
-    except Exception as e:
-        pass
-    return {}
-
-
-def collect_layer_documents(project_root: str, layer: str) -> list:
-    """收集指定层级的所有文档"""
-    directory = Path(project_root) / LAYER_DIRECTORIES.get(layer, "")
-    if not directory.exists():
+    return parse_front_matter(file_path)
+
+
+@metrics.timed("collect_layer_documents")
+def collect_layer_documents(project_root: str, layer: str,
+                            cache: MetadataCache = None, index=None) -> list:
+    """收集指定层级的所有文档（提供 cache 时仅解析新增/变更文档）"""
+    index = index or get_index(project_root)
+    if not index.layer_exists(layer):
         return []
 
     documents = []
-    for file_path in directory.rglob("*.md"):
-        if file_path.name not in ["README.md", "INDEX.md"]:
-            metadata = extract_yaml_metadata(file_path)
-            if metadata.get("id"):
-                documents.append({
-                    "id": metadata.get("id"),
-                    "file": str(file_path.relative_to(project_root)),
-                    "layer": layer,
-                    "traces_from": metadata.get("traces_from", []),
-                    "traces_to": metadata.get("traces_to", [])
-                })
+    for entry in index.documents(layer):
+        metadata = cache.get_metadata(entry) if cache else entry.release_front_matter()
+        if metadata.get("id"):
+            documents.append(TraceDocument(metadata["id"], entry.rel_path, layer,
+                                           metadata.get("traces_from"),
+                                           metadata.get("traces_to")))
 
     return documents
 
 
-def validate_trace_chain(project_root: str) -> dict:
-    """验证完整追溯链"""
+def prefetch_documents(project_root: str, cache: MetadataCache = None,
+                       jobs: int = 1, index=None) -> int:
+    """并行预解析全部层级中需要读取的文档（缓存命中的文档跳过）"""
+    index = index or get_index(project_root)
+    pending = []
+    for layer in LAYER_ORDER:
+        for entry in index.documents(layer):
+            if cache is None or not cache.is_fresh(entry):
+                pending.append(entry)
+    return index.prefetch_front_matter(pending, jobs)
+
+
+def attach_suggestions(issue: dict, suggester: IdSuggester) -> dict:
+    """断链问题（error 级且带 reference 字段）附带相近的现有 ID"""
+    if suggester is not None and issue.get("severity") == "error" and "reference" in issue:
+        issue["suggestions"] = suggester.suggest(issue["reference"])
+    return issue
+
+
+class IssueCollector:
+    """追溯问题收集器：统计全部问题，仅保留前 max_issues 条（None 表示不限）
+
+    启用相近 ID 建议后，只为通过条数限制、实际输出的断链问题查询建议。
+    """
+
+    def __init__(self, max_issues: int = None):
+        self.max_issues = max_issues
+        self.issues = []
+        self.total = 0
+        self.errors = 0
+        self.warnings = 0
+        self.reported = 0
+        self.suggester = None
+
+    def enable_suggestions(self, suggester: IdSuggester) -> None:
+        self.suggester = suggester
+
+    def add(self, issue: dict) -> None:
+        self.total += 1
+        severity = issue.get("severity")
+        if severity == "error":
+            self.errors += 1
+        elif severity == "warning":
+            self.warnings += 1
+        if self.max_issues is None or self.reported < self.max_issues:
+            self.reported += 1
+            self.emit(attach_suggestions(issue, self.suggester))
+
+    def emit(self, issue: dict) -> None:
+        self.issues.append(issue)
+
+    def summary(self) -> dict:
+        summary = {
+            "total_issues": self.total,
+            "errors": self.errors,
+            "warnings": self.warnings
+        }
+        if self.max_issues is not None:
+            summary["reported_issues"] = self.reported
+            summary["truncated"] = self.total > self.reported
+        return summary
+
+
+class NdjsonIssueWriter(IssueCollector):
+    """流式问题输出：每条问题立即写为一行 NDJSON，不在内存中保留"""
+
+    def __init__(self, stream, max_issues: int = None):
+        super().__init__(max_issues)
+        self.stream = stream
+
+    def emit(self, issue: dict) -> None:
+        record = {"record": "issue"}
+        record.update(issue)
+        self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def check_document(doc: TraceDocument, all_documents: dict) -> dict:
+    """检查单个文档的追溯关系，返回问题列表与计数（断链问题的 reference 为缺失的 ID）"""
+    doc_id = doc.id
+    layer_index = LAYER_ORDER.index(doc.layer)
+    issues = []
+    check = {"issues": issues, "broken_traces": 0,
+             "missing_upstream": 0, "missing_downstream": 0}
+
+    # 检查 traces_from（上游）
+    if layer_index > 0:  # 非 L1 应该有上游
+        traces_from = doc.traces_from
+
+        if not traces_from:
+            check["missing_upstream"] = 1
+            issues.append({
+                "document": doc_id,
+                "layer": doc.layer,
+                "issue": "Missing traces_from",
+                "severity": "warning"
+            })
+        else:
+            # 验证引用的文档是否存在
+            for ref in traces_from:
+                if ref not in all_documents:
+                    check["broken_traces"] += 1
+                    issues.append({
+                        "document": doc_id,
+                        "layer": doc.layer,
+                        "issue": f"Referenced document not found: {ref}",
+                        "severity": "error",
+                        "reference": ref
+                    })
+
+    # 检查 traces_to（下游）- L5 不需要
+    if layer_index < len(LAYER_ORDER) - 1:
+        # traces_to 为空是警告，不是错误
+        if not doc.traces_to:
+            check["missing_downstream"] = 1
+
+    return check
+
+
+def check_documents(documents, all_documents: dict, trace_stats: dict,
+                    issues: IssueCollector) -> float:
+    """逐个检查文档，问题交给 issues，统计累加到 trace_stats，返回完整度"""
+    start = time.perf_counter()
+    for doc in documents:
+        check = check_document(doc, all_documents)
+        for issue in check["issues"]:
+            issues.add(issue)
+        for key in ("broken_traces", "missing_upstream", "missing_downstream"):
+            trace_stats[key] += check[key]
+    metrics.add_time("check_documents", time.perf_counter() - start)
+
+    # 计算完整追溯数
+    trace_stats["complete_traces"] = (
+        trace_stats["total_documents"] -
+        trace_stats["broken_traces"] -
+        trace_stats["missing_upstream"]
+    )
+
+    # 计算完整度
+    if trace_stats["total_documents"] > 0:
+        return (trace_stats["complete_traces"] / trace_stats["total_documents"]) * 100
+    return 0
+
+
+def add_body_references(project_root: str, documents, all_documents: dict,
+                        issues: IssueCollector, jobs: int = 1) -> dict:
+    """正文引用扫描：问题逐条交给 issues，返回扫描统计"""
+    return check_body_references(project_root, documents, all_documents, issues.add, jobs)
+
+
+def graph_issue(category: str, item, all_documents: dict) -> dict:
+    """结构检测明细转换为问题记录（severity 为 info，不影响验证状态）"""
+    if category == "orphans":
+        return {
+            "document": item,
+            "layer": all_documents[item].layer,
+            "issue": "Orphan document: no trace links",
+            "severity": "info",
+            "category": "orphan"
+        }
+    if category == "cycles":
+        return {
+            "document": item[0],
+            "layer": all_documents[item[0]].layer,
+            "issue": f"Trace cycle among {len(item)} documents",
+            "severity": "info",
+            "category": "cycle",
+            "documents": item
+        }
+    if category == "layer_skipping_edges":
+        return {
+            "document": item["to"],
+            "layer": all_documents[item["to"]].layer,
+            "issue": f"Trace from {item['from']} skips layers {', '.join(item['skipped_layers'])}",
+            "severity": "info",
+            "category": "layer_skip",
+            "reference": item["from"],
+            "skipped_layers": item["skipped_layers"]
+        }
+    # 单向追溯：问题记在缺少声明的一端
+    if item["missing"] == "traces_from":
+        doc_id, ref = item["to"], item["from"]
+    else:
+        doc_id, ref = item["from"], item["to"]
+    return {
+        "document": doc_id,
+        "layer": all_documents[doc_id].layer,
+        "issue": f"One-sided trace link: {ref} not declared in {item['missing']}",
+        "severity": "info",
+        "category": "asymmetric_link",
+        "reference": ref
+    }
+
+
+def add_graph_findings(graph: TraceGraph, all_documents: dict,
+                       issues: IssueCollector) -> dict:
+    """追溯图结构检测：明细逐条作为问题交给 issues，返回 graph 计数块"""
+    def report(category, item):
+        issues.add(graph_issue(category, item, all_documents))
+
+    return graph.analyze(report)
+
+
+def determine_status(trace_stats: dict) -> str:
+    """根据追溯统计确定验证状态"""
+    if trace_stats["broken_traces"] > 0:
+        return "failed"
+    if trace_stats["missing_upstream"] > trace_stats["total_documents"] * 0.3:
+        return "warning"
+    return "passed"
+
+
+@metrics.timed("validate_trace_chain")
+def validate_trace_chain(project_root: str, cache: MetadataCache = None,
+                         from_layer: str = None, to_layer: str = None,
+                         jobs: int = 1, issues: IssueCollector = None,
+                         suggester: IdSuggester = None, body_refs: bool = False,
+                         suggest: bool = False, graph_checks: bool = False,
+                         index=None) -> dict:
+    """验证完整追溯链（指定 from_layer/to_layer 时附加层级覆盖查询）
+
+    问题逐条交给 issues 收集器（默认全部保留在内存），流式输出时传入
+    NdjsonIssueWriter 即可边验证边写出；suggest 为真时断链问题附带相近 ID
+    （suggester 为常驻进程跨次复用的索引，须与本次文档 ID 集合一致，未提供时
+    按需构建）；body_refs 为真时附加正文引用扫描；graph_checks 为真时附加追溯图
+    结构检测（追溯图只在结构检测或层级覆盖查询时构建）。index 未提供时使用
+    进程内共享的项目索引。
+    """
+    if issues is None:
+        issues = IssueCollector()
+    index = index or get_index(project_root)
     all_documents = {}
     layer_docs = {}
 
+    if jobs > 1:
+        prefetch_documents(project_root, cache, jobs, index)
+
     # 收集所有层级文档
     for layer in LAYER_ORDER:
-        docs = collect_layer_documents(project_root, layer)
+        docs = collect_layer_documents(project_root, layer, cache, index)
         layer_docs[layer] = docs
         for doc in docs:
-            all_documents[doc["id"]] = doc
+            all_documents[doc.id] = doc
 
     # 分析追溯关系
-    trace_issues = []
     trace_stats = {
         "total_documents": len(all_documents),
         "by_layer": {layer: len(docs) for layer, docs in layer_docs.items()},
@@ -121,75 +356,283 @@ def validate_trace_chain(project_root: str) -> dict:
         "missing_downstream": 0
     }
 
-    # 检查每个文档的追溯关系
-    for doc_id, doc in all_documents.items():
-        layer_index = LAYER_ORDER.index(doc["layer"])
-
-        # 检查 traces_from（上游）
-        if layer_index > 0:  # 非 L1 应该有上游
-            traces_from = doc.get("traces_from", [])
-            if isinstance(traces_from, str):
-                traces_from = [traces_from] if traces_from else []
-
-            if not traces_from:
-                trace_stats["missing_upstream"] += 1
-                trace_issues.append({
-                    "document": doc_id,
-                    "layer": doc["layer"],
-                    "issue": "Missing traces_from",
-                    "severity": "warning"
-                })
-            else:
-                # 验证引用的文档是否存在
-                for ref in traces_from:
-                    if ref and ref not in all_documents:
-                        trace_stats["broken_traces"] += 1
-                        trace_issues.append({
-                            "document": doc_id,
-                            "layer": doc["layer"],
-                            "issue": f"Referenced document not found: {ref}",
-                            "severity": "error"
-                        })
-
-        # 检查 traces_to（下游）- L5 不需要
-        if layer_index < len(LAYER_ORDER) - 1:
-            traces_to = doc.get("traces_to", [])
-            if isinstance(traces_to, str):
-                traces_to = [traces_to] if traces_to else []
-
-            # traces_to 为空是警告，不是错误
-            if not traces_to:
-                trace_stats["missing_downstream"] += 1
-
-    # 计算完整追溯数
-    trace_stats["complete_traces"] = (
-        trace_stats["total_documents"] -
-        trace_stats["broken_traces"] -
-        trace_stats["missing_upstream"]
-    )
-
-    # 计算完整度
-    if trace_stats["total_documents"] > 0:
-        completeness = (trace_stats["complete_traces"] / trace_stats["total_documents"]) * 100
-    else:
-        completeness = 0
+    # 检查每个文档的追溯关系（相近 ID 索引在首次查询时才构建）
+    if suggest:
+        issues.enable_suggestions(suggester if suggester is not None
+                                  else IdSuggester(all_documents))
+    completeness = check_documents(all_documents.values(), all_documents, trace_stats, issues)
+    body_stats = None
+    if body_refs:
+        body_stats = add_body_references(project_root, all_documents.values(),
+                                         all_documents, issues, jobs)
+
+    # 构建追溯图并做结构检测
+    graph = None
+    graph_analysis = None
+    if graph_checks or (from_layer and to_layer):
+        start = time.perf_counter()
+        graph = TraceGraph(list(all_documents.values()))
+        if graph_checks:
+            graph_analysis = add_graph_findings(graph, all_documents, issues)
+        metrics.add_time("trace_graph", time.perf_counter() - start)
+
+    # 层级覆盖查询
+    coverage = None
+    if from_layer and to_layer:
+        coverage = graph.coverage(from_layer, to_layer)
+        # 未覆盖文档逐条记入 issues，输出的 coverage 块只保留计数
+        uncovered = coverage.pop("uncovered")
+        coverage["uncovered"] = len(uncovered)
+        for doc_id in uncovered:
+            issues.add({
+                "document": doc_id,
+                "layer": from_layer,
+                "issue": f"No trace path to {to_layer}",
+                "severity": "warning"
+            })
+        del uncovered
 
     # 确定状态
-    status = "passed"
-    if trace_stats["broken_traces"] > 0:
-        status = "failed"
-    elif trace_stats["missing_upstream"] > trace_stats["total_documents"] * 0.3:
+    status = determine_status(trace_stats)
+    if status == "passed" and coverage and coverage["uncovered"]:
         status = "warning"
 
-    return {
+    result = {
         "status": status,
         "completeness": round(completeness, 2),
         "statistics": trace_stats,
-        "issues": trace_issues
+        "issues": issues.issues,
+        "issue_summary": issues.summary()
+    }
+    if graph_analysis is not None:
+        result["graph"] = graph_analysis
+    if coverage is not None:
+        result["coverage"] = coverage
+    if body_stats is not None:
+        result["body_references"] = body_stats
+    return result
+
+
+@metrics.timed("validate_changed_documents")
+def validate_changed_documents(project_root: str, changed: list,
+                               cache: MetadataCache = None,
+                               issues: IssueCollector = None,
+                               body_refs: bool = False, suggest: bool = False,
+                               graph_checks: bool = False) -> dict:
+    """只验证变更文档及其直接追溯邻居（git 变更范围模式）
+
+    changed 为相对项目根目录的变更文件路径（含已删除文件）。未变更文档的
+    追溯元数据直接取自元数据缓存，不再 stat 或读取文件；缓存为空时回退为
+    全量扫描。graph_checks 为真时附加结构检测（孤立、循环等），限于检查范围内
+    的子图。
+    """
+    if issues is None:
+        issues = IssueCollector()
+    changed_paths = set(changed)
+    all_documents = {}
+    changed_ids = set()
+
+    if cache is not None and cache.entries:
+        # 变更/删除文档的旧 ID 同样属于变更集合（引用它们的文档需要复查）
+        for rel_path in changed_paths:
+            metadata = cache.discard(rel_path)
+            if metadata and metadata.get("id"):
+                changed_ids.add(metadata["id"])
+        for rel_path, metadata in cache.cached_items():
+            layer = DIRECTORY_LAYERS.get(rel_path.split(os.sep, 1)[0])
+            if layer and metadata.get("id"):
+                all_documents[metadata["id"]] = TraceDocument(
+                    metadata["id"], rel_path, layer,
+                    metadata.get("traces_from"), metadata.get("traces_to"))
+        index = index_paths(project_root,
+                            [os.path.join(project_root, path) for path in changed_paths])
+        for layer in LAYER_ORDER:
+            for doc in collect_layer_documents(project_root, layer, cache, index):
+                all_documents[doc.id] = doc
+                changed_ids.add(doc.id)
+    else:
+        for layer in LAYER_ORDER:
+            for doc in collect_layer_documents(project_root, layer, cache):
+                all_documents[doc.id] = doc
+                if doc.file in changed_paths:
+                    changed_ids.add(doc.id)
+
+    # 检查范围：变更文档 + 其引用的文档 + 引用它们的文档
+    scope_ids = set(changed_ids)
+    for doc in all_documents.values():
+        if doc.id in changed_ids:
+            scope_ids.update(doc.traces_from)
+            scope_ids.update(doc.traces_to)
+        elif (any(ref in changed_ids for ref in doc.traces_from) or
+              any(ref in changed_ids for ref in doc.traces_to)):
+            scope_ids.add(doc.id)
+    scoped = [doc for doc in all_documents.values() if doc.id in scope_ids]
+
+    by_layer = {layer: 0 for layer in LAYER_ORDER}
+    for doc in scoped:
+        by_layer[doc.layer] += 1
+    trace_stats = {
+        "total_documents": len(scoped),
+        "by_layer": by_layer,
+        "complete_traces": 0,
+        "broken_traces": 0,
+        "missing_upstream": 0,
+        "missing_downstream": 0
+    }
+    if suggest:
+        issues.enable_suggestions(IdSuggester(all_documents))
+    completeness = check_documents(scoped, all_documents, trace_stats, issues)
+    body_stats = None
+    if body_refs:
+        changed_docs = [all_documents[doc_id] for doc_id in sorted(changed_ids)
+                        if doc_id in all_documents]
+        body_stats = add_body_references(project_root, changed_docs, all_documents, issues)
+    graph_analysis = None
+    if graph_checks:
+        graph_analysis = add_graph_findings(TraceGraph(scoped), all_documents, issues)
+
+    # 问题汇总须在全部问题（含正文引用与结构检测）收集完之后生成
+    result = {
+        "status": determine_status(trace_stats),
+        "completeness": round(completeness, 2),
+        "statistics": trace_stats,
+        "issues": issues.issues,
+        "issue_summary": issues.summary(),
+        "scope": {
+            "changed_files": len(changed_paths),
+            "changed_documents": sorted(doc_id for doc_id in changed_ids
+                                        if doc_id in all_documents),
+            "checked_documents": len(scoped),
+            "project_documents": len(all_documents)
+        }
     }
+    if graph_analysis is not None:
+        result["graph"] = graph_analysis
+    if body_stats is not None:
+        result["body_references"] = body_stats
+    return result
+
+
+def watch_trace(project_root: str, cache: MetadataCache = None,
+                polling: bool = False, suggest: bool = False) -> int:
+    """监听模式：文档模型常驻内存，变更时仅重新检查变更文档及引用它的文档"""
+    index = get_index(project_root)
+    docs_by_path = {}
+    all_documents = {}
+    definitions = {}   # ID -> 声明该 ID 的全部文档（按加入顺序，最后一个生效）
+    referrers = {}
+    results = {}
+    suggester = IdSuggester(all_documents) if suggest else None
+
+    def is_document(entry) -> bool:
+        return entry.name.endswith(".md") and entry.name not in SPECIAL_FILES
+
+    def add_document(entry):
+        metadata = cache.get_metadata(entry) if cache else entry.release_front_matter()
+        if not metadata.get("id"):
+            return None
+        doc = TraceDocument(metadata["id"], entry.rel_path, entry.layer,
+                            metadata.get("traces_from"), metadata.get("traces_to"))
+        docs_by_path[entry.rel_path] = doc
+        definitions.setdefault(doc.id, []).append(doc)
+        activate(doc)
+        if suggester is not None:
+            suggester.add(doc.id)
+        return doc.id
+
+    def activate(doc):
+        """使 doc 成为其 ID 的生效文档，引用方索引随之更新"""
+        previous = all_documents.get(doc.id)
+        if previous is not None:
+            for ref in previous.traces_from:
+                referrers.get(ref, set()).discard(doc.id)
+        all_documents[doc.id] = doc
+        for ref in doc.traces_from:
+            referrers.setdefault(ref, set()).add(doc.id)
+
+    def remove_document(rel_path: str):
+        doc = docs_by_path.pop(rel_path, None)
+        if doc is None:
+            return None
+        remaining = definitions[doc.id]
+        remaining.remove(doc)
+        if all_documents.get(doc.id) is not doc:
+            return doc.id
+        if remaining:
+            # 另一文件仍声明同一 ID：回退到该文件，不视为删除
+            activate(remaining[-1])
+            return doc.id
+        del definitions[doc.id]
+        del all_documents[doc.id]
+        for ref in doc.traces_from:
+            referrers.get(ref, set()).discard(doc.id)
+        if suggester is not None:
+            suggester.discard(doc.id)
+        return doc.id
+
+    for layer in LAYER_ORDER:
+        for entry in index.documents(layer):
+            add_document(entry)
+    for doc in all_documents.values():
+        results[doc.id] = check_document(doc, all_documents)
+
+    def on_change(paths):
+        start = time.perf_counter()
+        changed_ids = set()
+        for old, new in index.update_paths(paths):
+            if old is not None and is_document(old):
+                changed_ids.add(remove_document(old.rel_path))
+            if new is not None and is_document(new):
+                changed_ids.add(add_document(new))
+        changed_ids.discard(None)
+        if not changed_ids:
+            return
+
+        # 受影响文档：变更文档本身 + 通过 traces_from 引用它们的文档
+        affected = set(changed_ids)
+        for doc_id in changed_ids:
+            affected.update(referrers.get(doc_id, ()))
+        for doc_id in affected:
+            if doc_id in all_documents:
+                results[doc_id] = check_document(all_documents[doc_id], all_documents)
+            else:
+                results.pop(doc_id, None)
+
+        trace_stats = {
+            "total_documents": len(all_documents),
+            "broken_traces": sum(r["broken_traces"] for r in results.values()),
+            "missing_upstream": sum(r["missing_upstream"] for r in results.values()),
+            "missing_downstream": sum(r["missing_downstream"] for r in results.values())
+        }
+        # 相近 ID 只为本次输出的受影响文档查询（检查结果中的问题保持不变）
+        issues = []
+        for doc_id in sorted(affected):
+            if doc_id in results:
+                issues.extend(attach_suggestions(dict(issue), suggester)
+                              for issue in results[doc_id]["issues"])
+
+        emit_event({
+            "script": "validate_trace",
+            "event": "update",
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "status": determine_status(trace_stats),
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+            "changed": sorted(changed_ids),
+            "affected": sorted(affected),
+            "issues": issues,
+            "statistics": trace_stats
+        })
+
+    # 尚未创建的层级目录同样监听，创建后其中的文档自动纳入
+    roots = [index.layer_root(layer) for layer in LAYER_ORDER]
+    try:
+        return run_watch(roots, on_change, polling)
+    finally:
+        if cache:
+            cache.save()
 
 
-def parse_args():
+def parse_args(argv=None):
     """解析命令行参数"""
     parser = argparse.ArgumentParser(
         description='验证 L1-L5 追溯关系完整性',
@@ -203,52 +646,187 @@ def parse_args():
     parser.add_argument('--to', dest='to_layer',
                         choices=['L1', 'L2', 'L3', 'L4', 'L5'],
                         help='目标层级')
-    parser.add_argument('--output', default='./out/trace_validation.json',
-                        help='输出路径')
+    parser.add_argument('--output',
+                        help='输出路径（默认 ./out/trace_validation.json，'
+                             '--stream 时为 ./out/trace_validation.ndjson）')
     parser.add_argument('--project-root', default='.',
                         help='项目根目录')
-    return parser.parse_args()
-
-
-def main():
-    """主函数"""
-    args = parse_args()
-
-    if not args.full_chain and not (args.from_layer and args.to_layer):
-        print("Error: Must specify --full-chain or both --from and --to",
-              file=sys.stderr)
-        return 1
-
-    # 执行验证
-    result = validate_trace_chain(args.project_root)
-
-    # 构建输出
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH,
+                        help='元数据缓存文件路径')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='禁用元数据缓存，全量解析')
+    parser.add_argument('--jobs', type=int, default=0,
+                        help='并行解析进程数（默认 0 = 自动使用 CPU 核数）')
+    parser.add_argument('--stream', action='store_true',
+                        help='流式输出 NDJSON 问题记录与汇总记录')
+    parser.add_argument('--max-issues', type=int,
+                        help='最多输出的问题条数')
+    parser.add_argument('--suggest', action='store_true',
+                        help='为断链问题附带相近的现有文档 ID')
+    parser.add_argument('--graph', action='store_true',
+                        help='追溯图结构检测（孤立、循环、跨层、单向追溯）')
+    parser.add_argument('--body-refs', action='store_true',
+                        help='扫描文档正文，比对正文提到的 ID 与声明的追溯关系')
+    scope = parser.add_mutually_exclusive_group()
+    scope.add_argument('--changed-since', metavar='REF',
+                       help='只验证相对 REF 变更的文档及其直接追溯邻居')
+    scope.add_argument('--staged', action='store_true',
+                       help='只验证暂存区中变更的文档及其直接追溯邻居')
+    parser.add_argument('--watch', action='store_true',
+                        help='常驻监听模式')
+    parser.add_argument('--poll', action='store_true',
+                        help='监听模式强制使用轮询')
+    parser.add_argument('--profile', action='store_true',
+                        help='输出中附加运行指标（耗时、文件数、读取字节数、峰值内存）')
+    parser.add_argument('--profile-output',
+                        help='将 cProfile 统计写入指定 pstats 文件')
+    return parser.parse_args(argv)
+
+
+def save_cache(cache: MetadataCache) -> None:
+    """清理并保存元数据缓存"""
+    if cache:
+        cache.prune()
+        cache.save()
+        metrics.count("cache_hits", cache.hits)
+        metrics.count("cache_misses", cache.misses)
+
+
+def validation_type(args) -> str:
+    """输出中的验证类型"""
+    if args.staged:
+        return "staged"
+    if args.changed_since:
+        return "changed_since"
+    if args.full_chain:
+        return "full_chain"
+    return f"{args.from_layer}_to_{args.to_layer}"
+
+
+def build_output(args, result: dict, profiler=None) -> dict:
+    """构建脚本 JSON 输出"""
     output = {
         "script": "validate_trace",
         "timestamp": datetime.utcnow().isoformat() + "Z",
         "status": result["status"],
         "project_root": os.path.abspath(args.project_root),
-        "validation_type": "full_chain" if args.full_chain else f"{args.from_layer}_to_{args.to_layer}",
+        "validation_type": validation_type(args),
         "completeness_percentage": result["completeness"],
         "statistics": result["statistics"],
         "issues": result["issues"],
-        "summary": {
-            "total_issues": len(result["issues"]),
-            "errors": sum(1 for i in result["issues"] if i.get("severity") == "error"),
-            "warnings": sum(1 for i in result["issues"] if i.get("severity") == "warning")
-        }
+        "summary": result["issue_summary"]
     }
+    if "graph" in result:
+        output["graph"] = result["graph"]
+    if "coverage" in result:
+        output["coverage"] = result["coverage"]
+    if "body_references" in result:
+        output["body_references"] = result["body_references"]
+    if "scope" in result:
+        scope = {"mode": output["validation_type"], "ref": args.changed_since}
+        scope.update(result["scope"])
+        output["scope"] = scope
+
+    metrics.stop_profiler(profiler, args.profile_output)
+    if args.profile:
+        output["metrics"] = metrics.snapshot()
+    return output
+
+
+def run_validation(args, cache: MetadataCache, changed: list, jobs: int,
+                   issues: IssueCollector, suggester: IdSuggester = None,
+                   index=None) -> dict:
+    """按参数运行全链验证、层级覆盖查询或变更范围验证
+
+    index 为全链/层级覆盖验证使用的文档索引（未提供时使用共享的项目索引）。
+    """
+    if changed is not None:
+        return validate_changed_documents(args.project_root, changed, cache, issues,
+                                          args.body_refs, args.suggest, args.graph)
+    if args.full_chain:
+        return validate_trace_chain(args.project_root, cache, jobs=jobs, issues=issues,
+                                    suggester=suggester, body_refs=args.body_refs,
+                                    suggest=args.suggest, graph_checks=args.graph,
+                                    index=index)
+    return validate_trace_chain(args.project_root, cache, args.from_layer,
+                                args.to_layer, jobs, issues, suggester, args.body_refs,
+                                args.suggest, args.graph, index)
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
 
-    # 输出结果
-    output_path = Path(args.output)
+    scoped = bool(args.changed_since or args.staged)
+    if not scoped and not args.full_chain and not (args.from_layer and args.to_layer):
+        print("Error: Must specify --full-chain or both --from and --to",
+              file=sys.stderr)
+        return 1
+    if scoped and (args.from_layer or args.to_layer or args.watch):
+        print("Error: --changed-since/--staged cannot be combined with --from/--to or --watch",
+              file=sys.stderr)
+        return 1
+    if args.body_refs and args.watch:
+        print("Error: --body-refs cannot be combined with --watch", file=sys.stderr)
+        return 1
+    if args.max_issues is not None and args.max_issues < 0:
+        print("Error: --max-issues must be non-negative", file=sys.stderr)
+        return 1
+
+    if args.profile or args.profile_output:
+        metrics.enable()
+    profiler = metrics.start_profiler(args.profile_output)
+
+    # 加载元数据缓存
+    cache = None
+    if not args.no_cache:
+        cache = MetadataCache(args.cache, args.project_root).load()
+
+    changed = None
+    if scoped:
+        try:
+            changed = changed_files(args.project_root, args.changed_since, args.staged)
+        except GitError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+
+    # 执行验证：单次运行只登记追溯文档（*.md），监听模式使用共享的完整索引
+    jobs = resolve_jobs(args.jobs)
+    index = None
+    if changed is None and not args.watch:
+        index = scan_project(args.project_root, pattern="*.md")
+    output_path = Path(args.output or (DEFAULT_STREAM_OUTPUT if args.stream else DEFAULT_OUTPUT))
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
+    if args.stream:
+        # 问题记录边验证边写出，最后追加一条汇总记录
+        with open(output_path, 'w', encoding='utf-8') as f:
+            writer = NdjsonIssueWriter(f, args.max_issues)
+            result = run_validation(args, cache, changed, jobs, writer, index=index)
+            save_cache(cache)
+            output = build_output(args, result, profiler)
+            del output["issues"]
+            summary = {"record": "summary"}
+            summary.update(output)
+            f.write(json.dumps(summary, ensure_ascii=False) + "\n")
+    else:
+        result = run_validation(args, cache, changed, jobs,
+                                IssueCollector(args.max_issues), index=index)
+        save_cache(cache)
+        output = build_output(args, result, profiler)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(output, f, indent=2, ensure_ascii=False)
 
     print(f"Validation completed. Results written to: {output_path}")
     print(f"Status: {result['status']}")
     print(f"Completeness: {result['completeness']}%")
+    if "coverage" in result:
+        coverage = result["coverage"]
+        print(f"Coverage {coverage['from']} -> {coverage['to']}: "
+              f"{coverage['covered']}/{coverage['total']} ({coverage['percentage']}%)")
+
+    if args.watch:
+        return watch_trace(args.project_root, cache, args.poll, args.suggest)
 
     if result["status"] == "failed":
         return 3
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+文件监听模块
+
+功能：为检查脚本的 --watch 模式提供文件变更监听，常驻进程保持索引与
+追溯图在内存中，每次变更只重新检查受影响的文件/文档
+
+监听实现：
+    - Linux：inotify（通过 ctypes 调用 libc，无第三方依赖）
+    - 其他平台或 inotify 不可用：轮询 mtime/size 快照
+    监听根目录可以尚未存在：根目录在启动后创建（或删除后重建）时自动开始监听，
+    并报告其中已有的文件；根目录被删除时报告根目录路径本身
+
+Usage:
+    from watch_mode import run_watch
+
+    def on_change(paths):
+        ...  # paths 为变更文件的绝对路径集合
+
+    run_watch(roots, on_change)
+
+Author: ArchPilot Core Framework
+Date: 2026-10-18
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import sys
+import time
+
+
+# ============ 配置常量 ============
+
+# 轮询间隔（秒）
+POLL_INTERVAL = 0.5
+
+# 收到首个事件后合并后续事件的等待时间（秒）
+DEBOUNCE_INTERVAL = 0.05
+
+# inotify 事件掩码
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+
+# 根目录父目录的监听掩码（只关注子目录的创建、删除与移动）
+PARENT_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+
+EVENT_HEADER = struct.Struct("iIII")
+
+
+# ============ 轮询监听 ============
+
+class PollingWatcher:
+    """基于 mtime/size 快照比对的轮询监听"""
+
+    def __init__(self, roots: list, interval: float = POLL_INTERVAL):
+        # 不存在的根目录同样保留：每次快照重新遍历，创建后自动纳入
+        self.roots = list(roots)
+        self.interval = interval
+        self.snapshot = self._take_snapshot()
+
+    def _take_snapshot(self) -> dict:
+        snapshot = {}
+        stack = list(self.roots)
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    for item in it:
+                        try:
+                            if item.is_dir(follow_symlinks=False):
+                                stack.append(item.path)
+                            elif item.is_file():
+                                st = item.stat()
+                                snapshot[item.path] = (st.st_mtime, st.st_size)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        return snapshot
+
+    def wait(self) -> set:
+        """阻塞直到检测到变更，返回变更文件路径集合"""
+        while True:
+            time.sleep(self.interval)
+            current = self._take_snapshot()
+            changed = {path for path, stat in current.items()
+                       if self.snapshot.get(path) != stat}
+            changed.update(path for path in self.snapshot if path not in current)
+            self.snapshot = current
+            if changed:
+                return changed
+
+    def close(self) -> None:
+        pass
+
+
+# ============ inotify 监听 ============
+
+class InotifyWatcher:
+    """Linux inotify 递归目录监听
+
+    根目录的父目录另以非递归方式监听，只处理根目录本身的创建与删除。
+    """
+
+    def __init__(self, roots: list):
+        libc_name = ctypes.util.find_library("c")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}
+        self.parents = {}   # 父目录 wd -> 父目录路径
+        self.roots = {os.path.normpath(root): root for root in roots}
+        try:
+            for root in roots:
+                parent = os.path.dirname(root) or os.curdir
+                if os.path.isdir(parent):
+                    self.parents[self._inotify_watch(parent, PARENT_MASK)] = parent
+                if os.path.isdir(root):
+                    self._add_tree(root)
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def _inotify_watch(self, directory: str, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed: {directory}")
+        return wd
+
+    def _add_watch(self, directory: str) -> None:
+        self.watches[self._inotify_watch(directory, WATCH_MASK)] = directory
+
+    def _add_tree(self, root: str) -> set:
+        """递归监听目录，返回其中已存在的文件（用于处理新建目录）"""
+        files = set()
+        for current, dirs, filenames in os.walk(root):
+            self._add_watch(current)
+            files.update(os.path.join(current, name) for name in filenames)
+        return files
+
+    def _read_events(self) -> set:
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+
+                parent = self.parents.get(wd)
+                if parent is not None:
+                    changed.update(self._root_event(parent, name, mask))
+                directory = self.watches.get(wd)
+                if directory is None:
+                    continue
+                if mask & IN_DELETE_SELF:
+                    self.watches.pop(wd, None)
+                    continue
+                path = os.path.join(directory, os.fsdecode(name))
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        changed.update(self._add_tree(path))
+                    elif mask & (IN_DELETE | IN_MOVED_FROM):
+                        # 目录被移走/删除：交由调用方按目录前缀清理
+                        changed.add(path)
+                    continue
+                changed.add(path)
+        return changed
+
+    def _root_event(self, parent: str, name: bytes, mask: int) -> set:
+        """父目录事件：根目录创建时开始监听并返回其中的文件，删除时返回根目录"""
+        if not mask & IN_ISDIR:
+            return set()
+        root = self.roots.get(os.path.normpath(os.path.join(parent, os.fsdecode(name))))
+        if root is None:
+            return set()
+        if mask & (IN_CREATE | IN_MOVED_TO):
+            return self._add_tree(root)
+        return {root}
+
+    def wait(self) -> set:
+        """阻塞直到检测到变更，合并短时间内的连续事件"""
+        while True:
+            select.select([self.fd], [], [])
+            changed = self._read_events()
+            while select.select([self.fd], [], [], DEBOUNCE_INTERVAL)[0]:
+                changed.update(self._read_events())
+            if changed:
+                return changed
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+# ============ 入口 ============
+
+def create_watcher(roots: list, polling: bool = False):
+    """创建监听器；inotify 不可用时回退为轮询"""
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(roots)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(roots)
+
+
+def emit_event(event: dict) -> None:
+    """以单行 JSON 输出一次增量检查结果"""
+    print(json.dumps(event, ensure_ascii=False), flush=True)
+
+
+def run_watch(roots: list, on_change, polling: bool = False) -> int:
+    """监听循环：每批变更回调 on_change(paths)，Ctrl+C 退出"""
+    watcher = create_watcher(roots, polling)
+    mode = "polling" if isinstance(watcher, PollingWatcher) else "inotify"
+    print(f"Watching {len(roots)} directories ({mode}). Press Ctrl+C to stop.",
+          file=sys.stderr)
+    try:
+        while True:
+            changed = watcher.wait()
+            on_change(changed)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        watcher.close()